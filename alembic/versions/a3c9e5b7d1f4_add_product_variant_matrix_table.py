@@ -0,0 +1,37 @@
+"""add product variant matrix table
+
+Revision ID: a3c9e5b7d1f4
+Revises: f2b8d4e6a1c3
+Create Date: 2026-10-19 17:12:54.530861
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c9e5b7d1f4'
+down_revision: Union[str, Sequence[str], None] = 'f2b8d4e6a1c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_variant_matrix',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('axes', sa.String(), nullable=False),
+        sa.Column('cells', sa.String(), nullable=False),
+        sa.Column('common_attributes', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.PrimaryKeyConstraint('product_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_variant_matrix')
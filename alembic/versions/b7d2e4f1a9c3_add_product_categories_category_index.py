@@ -0,0 +1,33 @@
+"""add product categories category index
+
+Revision ID: b7d2e4f1a9c3
+Revises: c1a5b2b059fc
+Create Date: 2026-10-19 10:12:31.482915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e4f1a9c3'
+down_revision: Union[str, Sequence[str], None] = 'c1a5b2b059fc'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The (product_id, category_id) primary key already covers lookups by product
+    op.create_index(
+        'idx_product_categories_category_product',
+        'product_categories',
+        ['category_id', 'product_id']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_product_categories_category_product', table_name='product_categories')
@@ -0,0 +1,43 @@
+"""add category closure table
+
+Revision ID: d4a8c6e2f0b5
+Revises: b7d2e4f1a9c3
+Create Date: 2026-10-19 11:03:47.215604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4a8c6e2f0b5'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e4f1a9c3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'category_closure',
+        sa.Column('ancestor_id', sa.Integer(), nullable=False),
+        sa.Column('descendant_id', sa.Integer(), nullable=False),
+        sa.Column('depth', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['ancestor_id'], ['categories.id'], ),
+        sa.ForeignKeyConstraint(['descendant_id'], ['categories.id'], ),
+        sa.PrimaryKeyConstraint('ancestor_id', 'descendant_id')
+    )
+    
+    op.create_index(
+        'idx_category_closure_descendant_ancestor',
+        'category_closure',
+        ['descendant_id', 'ancestor_id', 'depth']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_category_closure_descendant_ancestor', table_name='category_closure')
+    op.drop_table('category_closure')
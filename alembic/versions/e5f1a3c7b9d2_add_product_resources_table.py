@@ -0,0 +1,36 @@
+"""add product resources table
+
+Revision ID: e5f1a3c7b9d2
+Revises: d4a8c6e2f0b5
+Create Date: 2026-10-19 14:22:09.381547
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5f1a3c7b9d2'
+down_revision: Union[str, Sequence[str], None] = 'd4a8c6e2f0b5'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_resources',
+        sa.Column('kind', sa.String(), nullable=False),
+        sa.Column('resource_key', sa.String(), nullable=False),
+        sa.Column('payload', sa.String(), nullable=False),
+        sa.Column('fetched_at', sa.DateTime(), nullable=False),
+        sa.Column('expires_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('kind', 'resource_key')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('product_resources')
@@ -0,0 +1,45 @@
+"""add product relations table
+
+Revision ID: f2b8d4e6a1c3
+Revises: e5f1a3c7b9d2
+Create Date: 2026-10-19 15:48:31.704219
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b8d4e6a1c3'
+down_revision: Union[str, Sequence[str], None] = 'e5f1a3c7b9d2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table(
+        'product_relations',
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('related_variant_id', sa.Integer(), nullable=False),
+        sa.Column('rank', sa.Integer(), nullable=False),
+        sa.Column('source', sa.String(), nullable=False),
+        sa.Column('score', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ),
+        sa.ForeignKeyConstraint(['related_variant_id'], ['product_variants.id'], ),
+        sa.PrimaryKeyConstraint('product_id', 'related_variant_id')
+    )
+    
+    op.create_index(
+        'idx_product_relations_product_rank',
+        'product_relations',
+        ['product_id', 'rank']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('idx_product_relations_product_rank', table_name='product_relations')
+    op.drop_table('product_relations')
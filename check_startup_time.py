@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Check MCP server cold start time
+
+Imports server.py in fresh interpreters, reports the slowest imports and
+exits with an error if the median import time exceeds the budget or if a
+module that must stay lazy was imported.
+"""
+
+import os
+import sys
+import time
+import statistics
+import subprocess
+from rich.console import Console
+from rich.table import Table
+from rich import box
+
+
+console = Console()
+
+# Median seconds allowed for `import server` (override with STARTUP_BUDGET)
+STARTUP_BUDGET = float(os.getenv("STARTUP_BUDGET", "2.0"))
+
+# Modules that should only be imported once a request is made
+LAZY_MODULES = ["aiohttp"]
+
+RUNS = 5
+
+
+def measure_import(collect_modules: bool = False):
+    """Import server.py in a fresh interpreter and return (total seconds, per-module timings, loaded lazy modules)"""
+    probe = (
+        "import sys, server; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    args = [sys.executable, "-X", "importtime", "-c", probe] if collect_modules else [sys.executable, "-c", probe]
+    
+    env = dict(os.environ)
+    # The server must start without API tokens; clients are only built on first use
+    env.pop("WAKE_API_TOKEN", None)
+    env.pop("STOREFRONT_API_TOKEN", None)
+    
+    start = time.perf_counter()
+    result = subprocess.run(args, capture_output=True, text=True, env=env, cwd=os.path.dirname(os.path.abspath(__file__)))
+    elapsed = time.perf_counter() - start
+    
+    if result.returncode != 0:
+        console.print(result.stderr)
+        raise SystemExit("[ERROR] Failed to import server.py")
+    
+    timings = []
+    if collect_modules:
+        for line in result.stderr.splitlines():
+            if not line.startswith("import time:") or "|" not in line:
+                continue
+            _, cumulative, name = [part.strip() for part in line[len("import time:"):].split("|")]
+            if cumulative.isdigit():
+                timings.append((name, int(cumulative) / 1_000_000))
+    
+    loaded_lazy = [m for m in result.stdout.strip().split(",") if m]
+    return elapsed, timings, loaded_lazy
+
+
+def main():
+    console.print(f"\n[bold]Measuring server.py cold start ({RUNS} runs)...[/bold]\n")
+    
+    totals = [measure_import()[0] for _ in range(RUNS)]
+    _, timings, loaded_lazy = measure_import(collect_modules=True)
+    
+    table = Table(title="Slowest imports", box=box.ROUNDED)
+    table.add_column("Module", style="cyan")
+    table.add_column("Cumulative", justify="right", style="yellow")
+    for name, seconds in sorted(timings, key=lambda t: t[1], reverse=True)[:15]:
+        table.add_row(name, f"{seconds:.3f}s")
+    console.print(table)
+    
+    median = statistics.median(totals)
+    console.print(f"\nMedian: [bold]{median:.3f}s[/bold] (min {min(totals):.3f}s, max {max(totals):.3f}s), budget {STARTUP_BUDGET:.3f}s")
+    
+    failed = False
+    if median > STARTUP_BUDGET:
+        console.print("[red]✗ Cold start is over budget[/red]")
+        failed = True
+    if loaded_lazy:
+        console.print(f"[red]✗ Imported at startup but should be lazy: {', '.join(loaded_lazy)}[/red]")
+        failed = True
+    if not failed:
+        console.print("[green]✓ Cold start within budget[/green]")
+    
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -1,7 +1,17 @@
 """Wake API client and types"""
 
-from .base import WakeAPIClient, wake_client
+from .base import WakeAPIClient, get_wake_client
 from .types import Usuario, TipoPessoa, TipoSexo
-from .storefront import StorefrontAPIClient, storefront_client
+from .storefront import StorefrontAPIClient, get_storefront_client
 
-__all__ = ["WakeAPIClient", "wake_client", "Usuario", "TipoPessoa", "TipoSexo", "StorefrontAPIClient", "storefront_client"]
\ No newline at end of file
+
+def __getattr__(name: str):
+    # The shared clients are built on first access, not when the package is imported
+    if name == "wake_client":
+        return get_wake_client()
+    if name == "storefront_client":
+        return get_storefront_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+__all__ = ["WakeAPIClient", "get_wake_client", "Usuario", "TipoPessoa", "TipoSexo", "StorefrontAPIClient", "get_storefront_client"]
\ No newline at end of file
@@ -6,13 +6,15 @@ Base connection module for Wake e-commerce API
 
 import os
 import json
-import time
-import asyncio
-from collections import defaultdict
-import aiohttp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+from .single_flight import single_flight, freeze
+from .rate_limit import get_rate_limiter
+
+if TYPE_CHECKING:
+    import aiohttp
+
 # Load environment variables
 load_dotenv()
 
@@ -20,11 +22,8 @@ load_dotenv()
 WAKE_API_BASE_URL = os.getenv("WAKE_API_BASE_URL", "https://api.fbits.net")
 WAKE_API_TOKEN = os.getenv("WAKE_API_TOKEN")
 
-if not WAKE_API_TOKEN:
-    raise ValueError("WAKE_API_TOKEN environment variable is required")
-
 # Create authorization header
-AUTH_HEADER = f"Basic {WAKE_API_TOKEN}"
+AUTH_HEADER = f"Basic {WAKE_API_TOKEN}" if WAKE_API_TOKEN else None
 
 
 class WakeAPIClient:
@@ -33,22 +32,25 @@ class WakeAPIClient:
     def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None):
         self.base_url = base_url or WAKE_API_BASE_URL
         self.token = token or WAKE_API_TOKEN
+        if not self.token:
+            raise ValueError("WAKE_API_TOKEN environment variable is required")
         self.headers = {
             "Authorization": f"Basic {self.token}",
             "accept": "application/json",
             "Content-Type": "application/json"
         }
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._session: Optional["aiohttp.ClientSession"] = None
         
-        # Rate limiting tracking
-        self._request_times = defaultdict(list)  # endpoint_group -> list of timestamps
+        # Rate limiting per client, or shared between clients (see rate_limit.RATE_LIMIT_BACKEND)
+        self._rate_limiter = get_rate_limiter()
         self._rate_limit_per_minute = 120
-        self._blocked_until = {}  # endpoint_group -> unblock timestamp
     
     @property
-    def session(self) -> aiohttp.ClientSession:
+    def session(self) -> "aiohttp.ClientSession":
         """Get or create session"""
         if self._session is None or self._session.closed:
+            # Imported here: aiohttp is slow to import and only needed once a request is made
+            import aiohttp
             self._session = aiohttp.ClientSession()
         return self._session
     
@@ -72,32 +74,7 @@ class WakeAPIClient:
     
     async def _check_rate_limit(self, endpoint_group: str):
         """Check and enforce rate limiting"""
-        current_time = time.time()
-        
-        # Check if blocked
-        if endpoint_group in self._blocked_until:
-            if current_time < self._blocked_until[endpoint_group]:
-                wait_time = self._blocked_until[endpoint_group] - current_time
-                await asyncio.sleep(wait_time)
-            else:
-                del self._blocked_until[endpoint_group]
-        
-        # Clean old requests (older than 1 minute)
-        minute_ago = current_time - 60
-        self._request_times[endpoint_group] = [
-            t for t in self._request_times[endpoint_group] if t > minute_ago
-        ]
-        
-        # Check if we're at the limit
-        if len(self._request_times[endpoint_group]) >= self._rate_limit_per_minute:
-            # Wait until the oldest request is more than a minute old
-            oldest_request = min(self._request_times[endpoint_group])
-            wait_time = 60 - (current_time - oldest_request) + 0.1  # Add small buffer
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-        
-        # Record this request
-        self._request_times[endpoint_group].append(current_time)
+        await self._rate_limiter.acquire(endpoint_group, self._rate_limit_per_minute)
     
     async def make_request(
         self,
@@ -123,6 +100,24 @@ class WakeAPIClient:
         Raises:
             Exception: If the API returns an error status
         """
+        # Concurrent identical GETs share one upstream call (and one rate limit slot)
+        if method.upper() == "GET" and json_data is None:
+            key = (self.base_url, self.token, endpoint, freeze(params), freeze(headers))
+            return await single_flight.do(
+                key, lambda: self._send_request(method, endpoint, params, json_data, headers)
+            )
+        
+        return await self._send_request(method, endpoint, params, json_data, headers)
+    
+    async def _send_request(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict[str, Any]] = None,
+        json_data: Optional[Dict[str, Any]] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> Any:
+        """Send an HTTP request to Wake API (see make_request)"""
         # Check rate limit before making request
         endpoint_group = self._get_endpoint_group(endpoint)
         await self._check_rate_limit(endpoint_group)
@@ -160,7 +155,7 @@ class WakeAPIClient:
                     retry_after = response.headers.get("Retry-After")
                     if retry_after:
                         retry_seconds = int(retry_after)
-                        self._blocked_until[endpoint_group] = time.time() + retry_seconds
+                        await self._rate_limiter.block(endpoint_group, retry_seconds)
                         raise Exception(f"Rate limit exceeded. Retry after {retry_seconds} seconds")
                 
                 try:
@@ -221,5 +216,21 @@ class WakeAPIClient:
         await self.close()
 
 
-# Singleton instance
-wake_client = WakeAPIClient()
\ No newline at end of file
+# Shared instance, created on first use
+_wake_client: Optional[WakeAPIClient] = None
+
+
+def get_wake_client() -> WakeAPIClient:
+    """Get the shared Wake API client, creating it on first use"""
+    global _wake_client
+    if _wake_client is None:
+        _wake_client = WakeAPIClient()
+    return _wake_client
+
+
+def __getattr__(name: str):
+    # Keeps the old wake_client attribute working; it builds the client when accessed, so
+    # modules that run without a token should call get_wake_client() when they need it
+    if name == "wake_client":
+        return get_wake_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
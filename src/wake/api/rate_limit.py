@@ -0,0 +1,142 @@
+"""
+Upstream rate limiters
+
+Wake allows 120 requests per minute per endpoint group. By default each client
+keeps its own budget ("client" backend). The budget can instead be shared by
+every client in the process ("memory" backend) or by every process on the host
+("sqlite" backend, for multi-worker web deployments).
+"""
+
+import os
+import time
+import asyncio
+from collections import defaultdict
+from contextlib import closing
+from typing import Dict, List, Optional
+
+from ..shared_state import SHARED_STATE_PATH, connect
+
+# "client" keeps a budget per client, "memory" shares it within a process,
+# "sqlite" across processes on the host
+RATE_LIMIT_BACKEND = os.getenv("RATE_LIMIT_BACKEND", "client").lower()
+
+
+class MemoryRateLimiter:
+    """Sliding one-minute window per endpoint group, kept in memory"""
+    
+    def __init__(self):
+        self._request_times: Dict[str, List[float]] = defaultdict(list)  # group -> timestamps
+        self._blocked_until: Dict[str, float] = {}  # group -> unblock timestamp
+    
+    def _reserve(self, group: str, limit_per_minute: int) -> float:
+        """Record a request if the budget allows it; otherwise return seconds to wait"""
+        current_time = time.time()
+        
+        blocked_until = self._blocked_until.get(group)
+        if blocked_until is not None:
+            if current_time < blocked_until:
+                return blocked_until - current_time
+            del self._blocked_until[group]
+        
+        # Clean old requests (older than 1 minute)
+        minute_ago = current_time - 60
+        times = [t for t in self._request_times[group] if t > minute_ago]
+        self._request_times[group] = times
+        
+        if len(times) >= limit_per_minute:
+            # Wait until the oldest request is more than a minute old
+            return 60 - (current_time - times[0]) + 0.1  # Add small buffer
+        
+        times.append(current_time)
+        return 0
+    
+    async def acquire(self, group: str, limit_per_minute: int):
+        """Wait until a request to the group fits in the budget, then record it"""
+        while True:
+            wait_time = self._reserve(group, limit_per_minute)
+            if wait_time <= 0:
+                return
+            await asyncio.sleep(wait_time)
+    
+    async def block(self, group: str, seconds: float):
+        """Stop requests to the group for a while (after a 429 response)"""
+        self._blocked_until[group] = time.time() + seconds
+
+
+class SQLiteRateLimiter:
+    """Sliding one-minute window per endpoint group, shared across processes"""
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or SHARED_STATE_PATH
+    
+    def _reserve(self, group: str, limit_per_minute: int) -> float:
+        """Record a request if the budget allows it; otherwise return seconds to wait"""
+        with closing(connect(self.path)) as conn:
+            # IMMEDIATE takes the write lock up front, so count-and-insert is atomic across workers
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                current_time = time.time()
+                
+                row = conn.execute(
+                    "SELECT blocked_until FROM rate_limit_blocks WHERE grp = ?", (group,)
+                ).fetchone()
+                if row and current_time < row[0]:
+                    conn.execute("COMMIT")
+                    return row[0] - current_time
+                
+                conn.execute(
+                    "DELETE FROM rate_limit_events WHERE grp = ? AND ts <= ?",
+                    (group, current_time - 60)
+                )
+                count, oldest = conn.execute(
+                    "SELECT COUNT(*), MIN(ts) FROM rate_limit_events WHERE grp = ?", (group,)
+                ).fetchone()
+                
+                if count >= limit_per_minute:
+                    conn.execute("COMMIT")
+                    return 60 - (current_time - oldest) + 0.1
+                
+                conn.execute(
+                    "INSERT INTO rate_limit_events (grp, ts) VALUES (?, ?)", (group, current_time)
+                )
+                conn.execute("COMMIT")
+                return 0
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+    
+    async def acquire(self, group: str, limit_per_minute: int):
+        """Wait until a request to the group fits in the budget, then record it"""
+        while True:
+            wait_time = await asyncio.to_thread(self._reserve, group, limit_per_minute)
+            if wait_time <= 0:
+                return
+            await asyncio.sleep(wait_time)
+    
+    def _block(self, group: str, seconds: float):
+        """Record a block for the group"""
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO rate_limit_blocks (grp, blocked_until) VALUES (?, ?)",
+                (group, time.time() + seconds)
+            )
+    
+    async def block(self, group: str, seconds: float):
+        """Stop requests to the group for a while (after a 429 response)"""
+        await asyncio.to_thread(self._block, group, seconds)
+
+
+_rate_limiter = None
+
+
+def get_rate_limiter():
+    """Get a rate limiter for a new client (a shared one unless the backend is "client")"""
+    global _rate_limiter
+    if RATE_LIMIT_BACKEND not in ("memory", "sqlite"):
+        return MemoryRateLimiter()
+    if _rate_limiter is None:
+        if RATE_LIMIT_BACKEND == "sqlite":
+            _rate_limiter = SQLiteRateLimiter()
+        else:
+            _rate_limiter = MemoryRateLimiter()
+    return _rate_limiter
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Request coalescing for upstream API calls
+
+Concurrent identical read requests share a single in-flight call; the caller
+that started it gets the result and every other caller gets its own copy.
+"""
+
+import json
+import copy
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+def freeze(value: Any) -> str:
+    """Turn request parameters into a stable hashable key component"""
+    return json.dumps(value, sort_keys=True, default=str)
+
+
+class SingleFlight:
+    """Merges concurrent calls with the same key into one in-flight call"""
+    
+    def __init__(self):
+        # (event loop id, key) -> future of the in-flight call
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        # (event loop id, key) -> number of callers waiting on the in-flight call
+        self._waiting: Dict[Hashable, int] = {}
+    
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Run call, or wait for an identical call already in flight
+        
+        Args:
+            key: Identity of the request (method, URL, parameters, credentials)
+            call: Coroutine factory performing the request
+        
+        Returns:
+            Result of the call (a deep copy for callers that joined an in-flight call)
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+        
+        future = self._calls.get(flight_key)
+        if future is not None:
+            self._waiting[flight_key] = self._waiting.get(flight_key, 0) + 1
+            try:
+                result = await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The leading caller was cancelled, not us: make the call ourselves
+                if future.cancelled():
+                    return await self.do(key, call)
+                raise
+            return copy.deepcopy(result)
+        
+        future = loop.create_future()
+        self._calls[flight_key] = future
+        try:
+            result = await call()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved so an unjoined future does not log a warning
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            # Waiting callers copy the shared result later, so hand ours out as a copy too
+            return copy.deepcopy(result) if self._waiting.get(flight_key) else result
+        finally:
+            self._calls.pop(flight_key, None)
+            self._waiting.pop(flight_key, None)
+    
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+# Singleton instance
+single_flight = SingleFlight()
\ No newline at end of file
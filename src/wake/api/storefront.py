@@ -6,12 +6,15 @@ Client for interacting with Wake's GraphQL storefront API
 
 import os
 import json
-import time
-import asyncio
-import aiohttp
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, TYPE_CHECKING
 from dotenv import load_dotenv
 
+from .single_flight import single_flight, freeze
+from .rate_limit import get_rate_limiter
+
+if TYPE_CHECKING:
+    import aiohttp
+
 # Load environment variables
 load_dotenv()
 
@@ -19,9 +22,6 @@ load_dotenv()
 STOREFRONT_API_BASE_URL = os.getenv("STOREFRONT_API_BASE_URL", "https://storefront-api.fbits.net")
 STOREFRONT_API_TOKEN = os.getenv("STOREFRONT_API_TOKEN")
 
-if not STOREFRONT_API_TOKEN:
-    raise ValueError("STOREFRONT_API_TOKEN environment variable is required")
-
 
 class StorefrontAPIClient:
     """Client for interacting with Wake's GraphQL storefront API"""
@@ -29,49 +29,31 @@ class StorefrontAPIClient:
     def __init__(self, base_url: Optional[str] = None, token: Optional[str] = None):
         self.base_url = base_url or STOREFRONT_API_BASE_URL
         self.token = token or STOREFRONT_API_TOKEN
+        if not self.token:
+            raise ValueError("STOREFRONT_API_TOKEN environment variable is required")
         self.headers = {
             "TCS-Access-Token": self.token,
             "accept": "application/json",
             "Content-Type": "application/json"
         }
-        self._session: Optional[aiohttp.ClientSession] = None
+        self._session: Optional["aiohttp.ClientSession"] = None
         
-        # Rate limiting tracking
-        self._request_times: List[float] = []
+        # Rate limiting per client, or shared between clients (see rate_limit.RATE_LIMIT_BACKEND)
+        self._rate_limiter = get_rate_limiter()
         self._rate_limit_per_minute = 120
-        self._blocked_until: Optional[float] = None
     
     @property
-    def session(self) -> aiohttp.ClientSession:
+    def session(self) -> "aiohttp.ClientSession":
         """Get or create session"""
         if self._session is None or self._session.closed:
+            # Imported here: aiohttp is slow to import and only needed once a request is made
+            import aiohttp
             self._session = aiohttp.ClientSession()
         return self._session
     
     async def _check_rate_limit(self):
         """Check and enforce rate limiting"""
-        current_time = time.time()
-        
-        # Check if blocked
-        if self._blocked_until and current_time < self._blocked_until:
-            wait_time = self._blocked_until - current_time
-            await asyncio.sleep(wait_time)
-            self._blocked_until = None
-        
-        # Clean old requests (older than 1 minute)
-        minute_ago = current_time - 60
-        self._request_times = [t for t in self._request_times if t > minute_ago]
-        
-        # Check if we're at the limit
-        if len(self._request_times) >= self._rate_limit_per_minute:
-            # Wait until the oldest request is more than a minute old
-            oldest_request = min(self._request_times)
-            wait_time = 60 - (current_time - oldest_request) + 0.1  # Add small buffer
-            if wait_time > 0:
-                await asyncio.sleep(wait_time)
-        
-        # Record this request
-        self._request_times.append(current_time)
+        await self._rate_limiter.acquire("storefront", self._rate_limit_per_minute)
     
     async def query(
         self,
@@ -93,6 +75,28 @@ class StorefrontAPIClient:
         Raises:
             Exception: If the API returns an error
         """
+        # Concurrent identical queries share one upstream call; mutations always run
+        if not self._is_mutation(query):
+            key = (self.base_url, self.token, query, freeze(variables), operation_name)
+            return await single_flight.do(
+                key, lambda: self._send_query(query, variables, operation_name)
+            )
+        
+        return await self._send_query(query, variables, operation_name)
+    
+    @staticmethod
+    def _is_mutation(query: str) -> bool:
+        """Check whether a GraphQL document is a mutation"""
+        lines = [line for line in query.splitlines() if not line.strip().startswith("#")]
+        return "\n".join(lines).lstrip().startswith("mutation")
+    
+    async def _send_query(
+        self,
+        query: str,
+        variables: Optional[Dict[str, Any]] = None,
+        operation_name: Optional[str] = None
+    ) -> Any:
+        """Send a GraphQL request (see query)"""
         # Check rate limit before making request
         await self._check_rate_limit()
         
@@ -119,7 +123,7 @@ class StorefrontAPIClient:
                     retry_after = response.headers.get("Retry-After")
                     if retry_after:
                         retry_seconds = int(retry_after)
-                        self._blocked_until = time.time() + retry_seconds
+                        await self._rate_limiter.block("storefront", retry_seconds)
                         raise Exception(f"Rate limit exceeded. Retry after {retry_seconds} seconds")
                 
                 try:
@@ -175,5 +179,21 @@ class StorefrontAPIClient:
         await self.close()
 
 
-# Singleton instance
-storefront_client = StorefrontAPIClient()
\ No newline at end of file
+# Shared instance, created on first use
+_storefront_client: Optional[StorefrontAPIClient] = None
+
+
+def get_storefront_client() -> StorefrontAPIClient:
+    """Get the shared Storefront API client, creating it on first use"""
+    global _storefront_client
+    if _storefront_client is None:
+        _storefront_client = StorefrontAPIClient()
+    return _storefront_client
+
+
+def __getattr__(name: str):
+    # Keeps the old storefront_client attribute working; it builds the client when accessed, so
+    # modules that run without a token should call get_storefront_client() when they need it
+    if name == "storefront_client":
+        return get_storefront_client()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+In-memory TTL cache used for slowly changing data
+"""
+
+import time
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+class TTLCache:
+    """Dictionary-like cache whose entries expire after a fixed number of seconds"""
+    
+    def __init__(self, ttl: float, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # key -> (value, expires_at); insertion order doubles as write order
+        self._entries: Dict[Hashable, Tuple[Any, float]] = {}
+    
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a cached value, or default if missing or expired"""
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        
+        value, expires_at = entry
+        if time.monotonic() >= expires_at:
+            self._entries.pop(key, None)
+            return default
+        
+        return value
+    
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        """Store a value for ttl seconds (the cache default if not given)"""
+        self._entries.pop(key, None)
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl))
+        
+        while len(self._entries) > self.max_entries:
+            self._entries.pop(next(iter(self._entries)))
+    
+    def invalidate(self, key: Hashable) -> None:
+        """Drop a single entry"""
+        self._entries.pop(key, None)
+    
+    def invalidate_where(self, predicate: Callable[[Hashable], bool]) -> int:
+        """
+        Drop every entry whose key matches the predicate
+        
+        Returns:
+            Number of entries dropped
+        """
+        keys = [key for key in self._entries if predicate(key)]
+        for key in keys:
+            del self._entries[key]
+        return len(keys)
+    
+    def clear(self) -> None:
+        """Drop every entry"""
+        self._entries.clear()
+    
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key, _MISSING) is not _MISSING
+    
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_MISSING = object()
\ No newline at end of file
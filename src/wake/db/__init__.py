@@ -1,6 +1,6 @@
 """Wake database module"""
 
-from .base import Base, engine, SessionLocal
+from .base import Base, engine, SessionLocal, run_sync
 from .models import (
     DistributionCenter,
     Product,
@@ -10,6 +10,10 @@ from .models import (
     ProductInfo,
     VariantStock,
     Category,
+    CategoryClosure,
+    ProductVariantMatrix,
+    ProductRelation,
+    ProductResource,
     SyncState,
     CustomerToken,
     product_categories
@@ -19,6 +23,7 @@ __all__ = [
     "Base",
     "engine",
     "SessionLocal",
+    "run_sync",
     "DistributionCenter",
     "Product",
     "ProductVariant",
@@ -27,6 +32,10 @@ __all__ = [
     "ProductInfo",
     "VariantStock",
     "Category",
+    "CategoryClosure",
+    "ProductVariantMatrix",
+    "ProductRelation",
+    "ProductResource",
     "SyncState",
     "CustomerToken",
     "product_categories"
@@ -1,6 +1,8 @@
 """Database base configuration"""
 
 import os
+import asyncio
+from typing import Any, Callable
 from sqlalchemy import create_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
@@ -12,4 +14,15 @@ DATABASE_URL = f"sqlite:///{database_path}"
 engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-Base = declarative_base()
\ No newline at end of file
+Base = declarative_base()
+
+
+async def run_sync(fn: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+    """
+    Run blocking database work in the default thread pool
+    
+    Keeps the event loop free while SQLite runs the query, so concurrent tool
+    calls and HTTP requests are not stalled by a slow read. The function must
+    open and close its own session (sessions are not shared across threads).
+    """
+    return await asyncio.to_thread(fn, *args, **kwargs)
\ No newline at end of file
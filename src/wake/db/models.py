@@ -130,7 +130,9 @@ product_categories = Table(
     "product_categories",
     Base.metadata,
     Column("product_id", Integer, ForeignKey("products.id"), primary_key=True),
-    Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True)
+    Column("category_id", Integer, ForeignKey("categories.id"), primary_key=True),
+    # The primary key covers product -> categories; this covers category -> products
+    Index("idx_product_categories_category_product", "category_id", "product_id")
 )
 
 
@@ -147,6 +149,57 @@ class Category(Base):
     parent = relationship("Category", remote_side=[id])
 
 
+# Every (ancestor, descendant) pair of the category tree, including each category with itself
+class CategoryClosure(Base):
+    __tablename__ = "category_closure"
+    
+    ancestor_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    descendant_id = Column(Integer, ForeignKey("categories.id"), primary_key=True)
+    depth = Column(Integer, nullable=False)  # 0 for the category itself, 1 for children, ...
+    
+    # The primary key serves subtree lookups; this index serves ancestor lookups
+    __table_args__ = (
+        Index('idx_category_closure_descendant_ancestor', 'descendant_id', 'ancestor_id', 'depth'),
+    )
+
+
+# Variant grid of each product (attribute axes such as size and colour), rebuilt by ProductSync
+class ProductVariantMatrix(Base):
+    __tablename__ = "product_variant_matrix"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    axes = Column(String, nullable=False)  # JSON [{"name": ..., "values": [...]}], attributes that vary
+    cells = Column(String, nullable=False)  # JSON [{"variant_id": ..., "values": [...]}], one value per axis
+    common_attributes = Column(String, nullable=False)  # JSON {name: value}, attributes shared by all variants
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow, nullable=False)
+
+
+# Related variants of each product, from Wake or, when Wake has none, from local similarity
+class ProductRelation(Base):
+    __tablename__ = "product_relations"
+    
+    product_id = Column(Integer, ForeignKey("products.id"), primary_key=True)
+    related_variant_id = Column(Integer, ForeignKey("product_variants.id"), primary_key=True)
+    rank = Column(Integer, nullable=False)  # 1 = most related
+    source = Column(String, nullable=False)  # 'wake', 'similarity'
+    score = Column(Float, nullable=True)  # Similarity score (None for Wake relations)
+    
+    __table_args__ = (
+        Index('idx_product_relations_product_rank', 'product_id', 'rank'),
+    )
+
+
+# API responses that are not part of the synced catalogue (images, related products), kept with a TTL
+class ProductResource(Base):
+    __tablename__ = "product_resources"
+    
+    kind = Column(String, primary_key=True)  # 'images', 'related'
+    resource_key = Column(String, primary_key=True)  # SKU for images, product ID for related products
+    payload = Column(String, nullable=False)  # JSON response body
+    fetched_at = Column(DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = Column(DateTime, nullable=False)
+
+
 class SyncState(Base):
     __tablename__ = "sync_state"
     
@@ -3,5 +3,18 @@
 from .products import ProductsLoader
 from .stock_locations import StockLocationsLoader
 from .categories import CategoriesLoader
+from .local import LocalCatalogLoader, local_catalog
+from .reference_cache import reference_cache, invalidate_reference_data
+from .product_resources import ProductResourceCache, product_resource_cache
 
-__all__ = ["ProductsLoader", "StockLocationsLoader", "CategoriesLoader"]
\ No newline at end of file
+__all__ = [
+    "ProductsLoader",
+    "StockLocationsLoader",
+    "CategoriesLoader",
+    "LocalCatalogLoader",
+    "local_catalog",
+    "reference_cache",
+    "invalidate_reference_data",
+    "ProductResourceCache",
+    "product_resource_cache"
+]
\ No newline at end of file
@@ -3,21 +3,32 @@ Categories loader for Wake API
 """
 
 from typing import List, Dict, Any
-from ..api import wake_client
+from ..api import get_wake_client
+from .reference_cache import memoize
 
 
 class CategoriesLoader:
     """Service to load categories from Wake API"""
     
     def __init__(self, client=None):
-        self.client = client or wake_client
+        self.client = client or get_wake_client()
     
-    async def load_categories(self) -> List[Dict[str, Any]]:
+    async def load_categories(self, refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Load all categories
         
+        The list is shared by every loader in the process for REFERENCE_CACHE_TTL
+        seconds, so repeated lookups do not call the API again.
+        
+        Args:
+            refresh: Bypass the cached list and reload it from the API
+        
         Returns:
             List of categories
         """
-        result = await self.client.get("/categorias")
-        return result if result is not None else []
\ No newline at end of file
+        async def load():
+            result = await self.client.get("/categorias")
+            return result if result is not None else []
+        
+        key = ("categories", getattr(self.client, "base_url", None), getattr(self.client, "token", None))
+        return await memoize(key, load, refresh=refresh)
\ No newline at end of file
@@ -0,0 +1,360 @@
+"""
+Local catalog loader backed by the synced database
+
+Mirrors the read methods of the Wake API loaders, returning the same
+Wake-shaped dictionaries, so callers can serve reads without spending
+remote rate limit quota.
+"""
+
+from datetime import datetime
+from typing import Dict, Any, Optional, List, Iterable, Iterator
+from sqlalchemy import func, select, or_
+from sqlalchemy.orm import selectinload
+
+from ..db import (
+    SessionLocal,
+    DistributionCenter,
+    Product,
+    ProductVariant,
+    VariantStock,
+    Category,
+    CategoryClosure,
+    SyncState,
+    product_categories
+)
+
+
+def _format_datetime(value: Optional[datetime]) -> Optional[str]:
+    """Format a datetime the way the Wake API does"""
+    return value.isoformat() if value else None
+
+
+class LocalCatalogLoader:
+    """Service to load catalog data from the local database"""
+    
+    def last_synced_at(self, sync_types: Iterable[str]) -> Optional[datetime]:
+        """
+        Get the most recent completion time among the given sync types
+        
+        Args:
+            sync_types: Sync types that populate the data being read
+        
+        Returns:
+            Completion time of the latest finished sync, or None if none finished
+        """
+        with SessionLocal() as db:
+            return db.query(func.max(SyncState.completed_at)).filter(
+                SyncState.sync_type.in_(list(sync_types)),
+                SyncState.status == "completed"
+            ).scalar()
+    
+    def is_fresh(self, sync_types: Iterable[str], max_age: float) -> bool:
+        """
+        Check whether the local data is recent enough to be served
+        
+        Args:
+            sync_types: Sync types that populate the data being read
+            max_age: Maximum age in seconds (0 or less disables the bound)
+        
+        Returns:
+            True if a sync completed within max_age seconds
+        """
+        completed_at = self.last_synced_at(sync_types)
+        if completed_at is None:
+            return False
+        if max_age <= 0:
+            return True
+        # Sync states are stored in local time (datetime.now())
+        return (datetime.now() - completed_at).total_seconds() <= max_age
+    
+    def _variant_to_dict(self, variant: ProductVariant, include_stock: bool = False) -> Dict[str, Any]:
+        """Convert a variant row to the Wake product (variant) shape"""
+        product = variant.product
+        pricing = variant.pricing
+        
+        data = {
+            "produtoVarianteId": variant.id,
+            "produtoId": variant.product_id,
+            "sku": variant.sku,
+            "nome": variant.name,
+            "nomeProdutoPai": product.parent_name if product else None,
+            "fabricante": product.manufacturer if product else None,
+            "parentId": product.parent_product_id if product else None,
+            "precoCusto": pricing.cost_price if pricing else None,
+            "precoDe": pricing.original_price if pricing else None,
+            "precoPor": pricing.sale_price if pricing else None,
+            "valido": variant.is_valid,
+            "exibirSite": variant.show_on_site,
+            "peso": variant.weight,
+            "altura": variant.height,
+            "comprimento": variant.length,
+            "largura": variant.width,
+            "ean": variant.ean,
+            "atributos": [
+                {
+                    "tipoAtributo": attr.attribute_type,
+                    "isFiltro": attr.is_filter,
+                    "nome": attr.name,
+                    "valor": attr.value,
+                    "exibir": attr.display
+                }
+                for attr in variant.attributes
+            ],
+            "informacoes": [
+                {
+                    "informacaoId": info.info_id,
+                    "titulo": info.title,
+                    "texto": info.text,
+                    "tipoInformacao": info.info_type,
+                    "exibirSite": info.show_on_site
+                }
+                for info in (product.info if product else [])
+            ],
+            "dataCriacao": _format_datetime(variant.created_at),
+            "dataAtualizacao": _format_datetime(variant.updated_at)
+        }
+        
+        if include_stock:
+            data["estoque"] = [
+                {
+                    "centroDistribuicaoId": stock.distribution_center_id,
+                    "estoqueFisico": stock.physical_stock,
+                    "estoqueReservado": stock.reserved_stock
+                }
+                for stock in variant.stock
+            ]
+        
+        return data
+    
+    def _variant_query(self, db):
+        """Variant query with every relationship used by _variant_to_dict preloaded"""
+        return db.query(ProductVariant).options(
+            selectinload(ProductVariant.product).selectinload(Product.info),
+            selectinload(ProductVariant.pricing),
+            selectinload(ProductVariant.attributes),
+            selectinload(ProductVariant.stock)
+        )
+    
+    def load_products(self, page: int = 1, quantity: int = 50, only_valid: bool = True) -> List[Dict[str, Any]]:
+        """
+        Load a page of products (variants) ordered by variant ID
+        
+        Args:
+            page: Page number (default: 1)
+            quantity: Number of records per page
+            only_valid: Return only valid products
+        
+        Returns:
+            List of products in the Wake API shape
+        """
+        with SessionLocal() as db:
+            query = self._variant_query(db)
+            if only_valid:
+                query = query.filter(ProductVariant.is_valid == True)
+            variants = query.order_by(ProductVariant.id).offset((max(page, 1) - 1) * quantity).limit(quantity).all()
+            return [self._variant_to_dict(variant) for variant in variants]
+    
+    def load_category_products(self, category_id: int, page: int = 1, quantity: int = 50,
+                               only_valid: bool = True, include_subcategories: bool = True) -> List[Dict[str, Any]]:
+        """
+        Load a page of the products (variants) in a category, ordered by variant ID
+        
+        Args:
+            category_id: Category ID
+            page: Page number (default: 1)
+            quantity: Number of records per page
+            only_valid: Return only valid products
+            include_subcategories: Also include products of all subcategories
+        
+        Returns:
+            List of products in the Wake API shape
+        """
+        in_category = product_categories.c.category_id == category_id
+        if include_subcategories:
+            # The closure table lists the whole subtree, so no recursive walk is needed
+            subtree = select(CategoryClosure.descendant_id).where(CategoryClosure.ancestor_id == category_id)
+            in_category = or_(in_category, product_categories.c.category_id.in_(subtree))
+        members = select(product_categories.c.product_id).where(in_category)
+        with SessionLocal() as db:
+            query = self._variant_query(db).filter(ProductVariant.product_id.in_(members))
+            if only_valid:
+                query = query.filter(ProductVariant.is_valid == True)
+            variants = query.order_by(ProductVariant.id).offset((max(page, 1) - 1) * quantity).limit(quantity).all()
+            return [self._variant_to_dict(variant) for variant in variants]
+    
+    def load_products_after(self, after_id: Optional[int] = None, limit: int = 500,
+                            only_valid: bool = True) -> List[Dict[str, Any]]:
+        """
+        Load products (variants) by keyset pagination on the variant ID
+        
+        Unlike offset paging, each page is an index range scan that costs the
+        same no matter how deep into the catalog it is.
+        
+        Args:
+            after_id: Return variants with an ID greater than this (None for the first page)
+            limit: Maximum number of records
+            only_valid: Return only valid products
+        
+        Returns:
+            List of products in the Wake API shape, ordered by variant ID
+        """
+        with SessionLocal() as db:
+            query = self._variant_query(db)
+            if after_id is not None:
+                query = query.filter(ProductVariant.id > after_id)
+            if only_valid:
+                query = query.filter(ProductVariant.is_valid == True)
+            variants = query.order_by(ProductVariant.id).limit(limit).all()
+            return [self._variant_to_dict(variant, include_stock=True) for variant in variants]
+    
+    def iter_products(self, batch_size: int = 500, only_valid: bool = True) -> Iterator[Dict[str, Any]]:
+        """
+        Iterate over the whole catalog one keyset batch at a time
+        
+        Only one batch is held in memory; each batch uses its own session so
+        loaded rows are released as the iteration moves on.
+        
+        Args:
+            batch_size: Number of variants loaded per query
+            only_valid: Return only valid products
+        
+        Yields:
+            Products in the Wake API shape, ordered by variant ID
+        """
+        after_id = None
+        while True:
+            batch = self.load_products_after(after_id, limit=batch_size, only_valid=only_valid)
+            if not batch:
+                return
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            after_id = batch[-1]["produtoVarianteId"]
+    
+    def _find_variant(self, db, identifier: str, identifier_type: str) -> Optional[ProductVariant]:
+        """Find a variant by SKU, variant ID or product ID"""
+        query = self._variant_query(db)
+        if identifier_type == "Sku":
+            return query.filter(ProductVariant.sku == identifier).first()
+        if not str(identifier).isdigit():
+            return None
+        if identifier_type == "ProdutoVarianteId":
+            return query.filter(ProductVariant.id == int(identifier)).first()
+        if identifier_type == "ProdutoId":
+            return query.filter(ProductVariant.product_id == int(identifier)).order_by(ProductVariant.id).first()
+        return None
+    
+    def get_product(self, identifier: str, identifier_type: str = "Sku") -> Optional[Dict[str, Any]]:
+        """
+        Get a single product by its identifier
+        
+        Args:
+            identifier: Product identifier (SKU, product variant ID, or product ID)
+            identifier_type: Type of identifier (Sku, ProdutoVarianteId, ProdutoId)
+        
+        Returns:
+            Product details with stock, or None if not found locally
+        """
+        with SessionLocal() as db:
+            variant = self._find_variant(db, identifier, identifier_type)
+            return self._variant_to_dict(variant, include_stock=True) if variant else None
+    
+    def load_product_stock(self, identifier: str, identifier_type: str = "Sku") -> Optional[Dict[str, Any]]:
+        """
+        Load product stock information
+        
+        Args:
+            identifier: Product identifier
+            identifier_type: Type of identifier (Sku, ProdutoVarianteId, ProdutoId)
+        
+        Returns:
+            Total stock and stock by distribution center, or None if not found locally
+        """
+        with SessionLocal() as db:
+            variant = self._find_variant(db, identifier, identifier_type)
+            if not variant:
+                return None
+            
+            rows = db.query(VariantStock, DistributionCenter.name).outerjoin(
+                DistributionCenter, DistributionCenter.id == VariantStock.distribution_center_id
+            ).filter(VariantStock.variant_id == variant.id).all()
+            
+            return {
+                "estoqueFisico": sum(stock.physical_stock for stock, _ in rows),
+                "estoqueReservado": sum(stock.reserved_stock for stock, _ in rows),
+                "listProdutoVarianteCentroDistribuicaoEstoque": [
+                    {
+                        "centroDistribuicaoId": stock.distribution_center_id,
+                        "nome": dc_name,
+                        "estoqueFisico": stock.physical_stock,
+                        "estoqueReservado": stock.reserved_stock
+                    }
+                    for stock, dc_name in rows
+                ]
+            }
+    
+    def load_product_prices(self, identifier: str, identifier_type: str = "Sku") -> Optional[Dict[str, Any]]:
+        """
+        Load product prices
+        
+        Args:
+            identifier: Product identifier
+            identifier_type: Type of identifier (Sku, ProdutoVarianteId, ProdutoId)
+        
+        Returns:
+            Product prices, or None if the product or its pricing is not stored locally
+        """
+        with SessionLocal() as db:
+            variant = self._find_variant(db, identifier, identifier_type)
+            if not variant or not variant.pricing:
+                return None
+            
+            return {
+                "produtoVarianteId": variant.id,
+                "sku": variant.sku,
+                "precoDe": variant.pricing.original_price,
+                "precoPor": variant.pricing.sale_price,
+                "fatorMultiplicadorPreco": 1,
+                "precosTabelaPreco": []
+            }
+    
+    def load_categories(self) -> List[Dict[str, Any]]:
+        """
+        Load all categories
+        
+        Returns:
+            List of categories in the Wake API shape
+        """
+        with SessionLocal() as db:
+            return [
+                {
+                    "id": category.id,
+                    "nome": category.name,
+                    "categoriaPaiId": category.parent_category_id or 0,
+                    "ativo": category.is_active,
+                    "caminhoHierarquia": category.path
+                }
+                for category in db.query(Category).order_by(Category.id).all()
+            ]
+    
+    def load_distribution_centers(self) -> List[Dict[str, Any]]:
+        """
+        Load all distribution centers
+        
+        Returns:
+            List of distribution centers with id, name, zip code and default flag
+        """
+        with SessionLocal() as db:
+            return [
+                {
+                    "id": dc.id,
+                    "nome": dc.name,
+                    "cep": dc.zip_code,
+                    "padrao": dc.is_default
+                }
+                for dc in db.query(DistributionCenter).order_by(DistributionCenter.id).all()
+            ]
+
+
+# Singleton instance
+local_catalog = LocalCatalogLoader()
\ No newline at end of file
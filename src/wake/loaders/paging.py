@@ -0,0 +1,213 @@
+"""
+Paged streaming for Wake list endpoints
+
+Wake list endpoints (/produtos, /produtos/alteracoes, ...) are read one page
+at a time. stream_pages walks them with a single set of termination rules and
+keeps the next pages in flight while the caller processes the current one.
+stream_pages_parallel first finds the page count, then fetches many pages at
+once so a full download is bound by the rate limit rather than by latency.
+"""
+
+import asyncio
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+PageFetcher = Callable[[int], Awaitable[Optional[List[Any]]]]
+
+
+async def stream_pages(
+    fetch_page: PageFetcher,
+    page_size: Optional[int] = None,
+    start_page: int = 1,
+    prefetch: int = 1,
+    max_empty_pages: int = 1,
+    max_pages: Optional[int] = None
+) -> AsyncIterator[Tuple[int, List[Any]]]:
+    """
+    Stream the non-empty pages of a paged endpoint
+    
+    The stream ends after max_empty_pages consecutive empty pages, after a page
+    shorter than page_size (when given) or after max_pages pages. A failing
+    fetch raises when its page is reached and cancels the pages fetched ahead.
+    
+    Wrap the stream in contextlib.aclosing() when breaking out of it early, so
+    the pages fetched ahead are cancelled right away.
+    
+    Args:
+        fetch_page: Coroutine function loading a page by number
+        page_size: Requested page size; a shorter page is taken as the last one
+        start_page: First page number (e.g. to resume a sync)
+        prefetch: Number of pages to fetch ahead while the caller works (0 = none)
+        max_empty_pages: Consecutive empty pages that end the stream
+        max_pages: Maximum number of pages to fetch
+    
+    Yields:
+        Tuples of (page number, items)
+    """
+    pending: Deque[Tuple[int, asyncio.Future]] = deque()
+    next_page = start_page
+    last_page = start_page + max_pages - 1 if max_pages is not None else None
+    
+    def schedule(in_flight: int):
+        """Start fetching pages until in_flight of them are pending"""
+        nonlocal next_page
+        while len(pending) < in_flight and (last_page is None or next_page <= last_page):
+            pending.append((next_page, asyncio.ensure_future(fetch_page(next_page))))
+            next_page += 1
+    
+    empty_pages = 0
+    try:
+        schedule(prefetch + 1)
+        while pending:
+            page, future = pending.popleft()
+            items = await future
+            
+            if not items:
+                empty_pages += 1
+                if empty_pages >= max_empty_pages:
+                    return
+                schedule(prefetch + 1)
+                continue
+            empty_pages = 0
+            
+            if page_size is not None and len(items) < page_size:
+                yield page, items
+                return
+            
+            # Keep the following pages loading while the caller works on this one
+            schedule(prefetch)
+            yield page, items
+            schedule(prefetch + 1)
+    finally:
+        for _, future in pending:
+            future.cancel()
+        if pending:
+            await asyncio.gather(*(future for _, future in pending), return_exceptions=True)
+
+
+async def stream_items(fetch_page: PageFetcher, **options) -> AsyncIterator[Any]:
+    """
+    Stream the items of a paged endpoint one at a time
+    
+    Args:
+        fetch_page: Coroutine function loading a page by number
+        **options: Paging options of stream_pages
+    
+    Yields:
+        Items of every page, in order
+    """
+    async for _, items in stream_pages(fetch_page, **options):
+        for item in items:
+            yield item
+
+
+async def probe_page_count(fetch_page: PageFetcher, page_size: int) -> int:
+    """
+    Find the number of the last non-empty page of a paged endpoint
+    
+    Doubles the page number until a page comes back empty or short, then
+    binary searches between the last full page and the first empty one, so
+    it costs about 2 * log2(pages) requests. Every page before the last is
+    assumed full: an empty or short page in the middle of the endpoint can be
+    taken as the end, giving a lower count.
+    
+    Args:
+        fetch_page: Coroutine function loading a page by number
+        page_size: Requested page size (a shorter page is the last one)
+    
+    Returns:
+        Last non-empty page number (0 for an empty endpoint)
+    """
+    async def is_full(page: int) -> Optional[bool]:
+        """True for a full page, False for an empty one, None for the last (short) page"""
+        items = await fetch_page(page)
+        if not items:
+            return False
+        return True if len(items) >= page_size else None
+    
+    state = await is_full(1)
+    if state is not True:
+        return 1 if state is None else 0
+    
+    # low is a full page, high is past the end
+    low, high = 1, 2
+    while True:
+        state = await is_full(high)
+        if state is None:
+            return high
+        if state is False:
+            break
+        low, high = high, high * 2
+    
+    while high - low > 1:
+        middle = (low + high) // 2
+        state = await is_full(middle)
+        if state is None:
+            return middle
+        if state:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+async def stream_pages_parallel(
+    fetch_page: PageFetcher,
+    page_size: int,
+    start_page: int = 1,
+    concurrency: int = 8,
+    max_empty_pages: int = 3
+) -> AsyncIterator[Tuple[int, List[Any]]]:
+    """
+    Stream the pages of a paged endpoint, fetching up to concurrency pages at once
+    
+    The page count is probed first, so every page up to it is requested right
+    away (the rate limiter then sets the pace) instead of walking until empty
+    pages show up. Pages are yielded in order. The probe takes the first empty
+    or short page it lands on as the end, so reading then goes on one page at a
+    time past the probed end until max_empty_pages consecutive empty pages:
+    pages added while streaming, or hidden behind an empty page, are not lost.
+    
+    Args:
+        fetch_page: Coroutine function loading a page by number
+        page_size: Requested page size
+        start_page: First page number (e.g. to resume a sync)
+        concurrency: Maximum number of page requests in flight
+        max_empty_pages: Consecutive empty pages past the probed end that end the stream
+    
+    Yields:
+        Tuples of (page number, items)
+    """
+    # Probed pages are kept and reused instead of being fetched again
+    probed: Dict[int, List[Any]] = {}
+    
+    async def probe(page: int):
+        items = await fetch_page(page)
+        probed[page] = items
+        return items
+    
+    page_count = await probe_page_count(probe, page_size)
+    
+    async def fetch(page: int):
+        if page in probed:
+            return probed.pop(page)
+        return await fetch_page(page)
+    
+    if page_count >= start_page:
+        # Empty pages inside the probed range do not end the stream
+        async for page, items in stream_pages(
+            fetch,
+            start_page=start_page,
+            prefetch=max(concurrency - 1, 0),
+            max_empty_pages=page_count - start_page + 1,
+            max_pages=page_count - start_page + 1
+        ):
+            yield page, items
+    
+    async for page, items in stream_pages(
+        fetch,
+        start_page=max(page_count + 1, start_page),
+        prefetch=0,
+        max_empty_pages=max_empty_pages
+    ):
+        yield page, items
\ No newline at end of file
@@ -0,0 +1,230 @@
+"""
+Cached product images and related products
+
+Images and related products are not part of the /produtos listing, so they
+used to cost one live request per product on every tool call. Responses are
+kept in the product_resources table: fresh entries are served directly,
+expired ones are served while a background task fetches them again, and only
+products never seen before are fetched live. ProductResourceSync fills the
+table in bulk so tool calls rarely reach the API at all.
+"""
+
+import os
+import json
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Set, Tuple
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
+
+from ..api import WakeAPIClient
+from ..db import SessionLocal, ProductResource, run_sync
+from .products import ProductsLoader
+
+# Used from the MCP servers, which speak over stdout, so failures are logged (to stderr)
+logger = logging.getLogger(__name__)
+
+# Seconds a cached response is considered fresh
+PRODUCT_RESOURCE_TTL = float(os.getenv("PRODUCT_RESOURCE_TTL", "86400"))
+
+# Live requests in flight when fetching several products' resources at once
+PRODUCT_RESOURCE_CONCURRENCY = int(os.getenv("PRODUCT_RESOURCE_CONCURRENCY", "4"))
+
+# Share of failed fetches above which a bulk sync fails instead of completing
+PRODUCT_RESOURCE_MAX_FAILURE_RATIO = float(os.getenv("PRODUCT_RESOURCE_MAX_FAILURE_RATIO", "0.5"))
+
+# Resource kinds (values of product_resources.kind)
+IMAGES = "images"
+RELATED = "related"
+
+
+async def fetch_resource(loader: ProductsLoader, kind: str, key: str) -> List[Dict[str, Any]]:
+    """
+    Fetch one resource from the Wake API
+    
+    Args:
+        loader: Products loader with an open client
+        kind: IMAGES (key is a SKU, sibling images included) or RELATED (key is a product ID)
+        key: Resource key
+    
+    Returns:
+        The API response (a list, empty if nothing was found)
+    """
+    if kind == IMAGES:
+        return await loader.load_product_images(key, "Sku", include_siblings=True)
+    if kind == RELATED:
+        return await loader.load_related_products(key, "ProdutoId")
+    raise ValueError(f"Unknown product resource kind: {kind}")
+
+
+async def fetch_resources(
+    loader: ProductsLoader,
+    kind: str,
+    keys: Iterable[str],
+    concurrency: int = PRODUCT_RESOURCE_CONCURRENCY
+) -> Tuple[Dict[str, List[Dict[str, Any]]], List[str]]:
+    """
+    Fetch several resources from the Wake API, concurrency requests at a time
+    
+    Keys whose request fails are logged and left out of the fetched
+    responses, so a failure is never cached.
+    
+    Returns:
+        Tuple of (dictionary mapping each fetched key to its response, keys whose request failed)
+    """
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+    
+    async def fetch(key: str):
+        async with semaphore:
+            try:
+                return key, await fetch_resource(loader, kind, key)
+            except Exception as e:
+                logger.warning("Fetching %s for %s failed: %s", kind, key, e)
+                return key, None
+    
+    results = await asyncio.gather(*(fetch(key) for key in dict.fromkeys(keys)))
+    fetched = {key: payload for key, payload in results if payload is not None}
+    failed = [key for key, payload in results if payload is None]
+    return fetched, failed
+
+
+def check_failures(failed: int, requested: int) -> None:
+    """
+    Fail a bulk sync when most of its fetches failed
+    
+    Raises:
+        Exception: If more than PRODUCT_RESOURCE_MAX_FAILURE_RATIO of the requests failed
+    """
+    if requested and failed / requested > PRODUCT_RESOURCE_MAX_FAILURE_RATIO:
+        raise Exception(f"{failed} of {requested} requests failed")
+
+
+def read_resources(kind: str, keys: List[str]) -> Dict[str, Tuple[Any, bool]]:
+    """
+    Read cached resources
+    
+    Returns:
+        Dictionary mapping each cached key to (payload, is_fresh)
+    """
+    if not keys:
+        return {}
+    now = datetime.utcnow()
+    cached = {}
+    with SessionLocal() as db:
+        # Chunked to stay under SQLite's bound parameter limit
+        for start in range(0, len(keys), 500):
+            rows = db.execute(
+                select(ProductResource.resource_key, ProductResource.payload, ProductResource.expires_at)
+                .where(ProductResource.kind == kind, ProductResource.resource_key.in_(keys[start:start + 500]))
+            ).all()
+            for key, payload, expires_at in rows:
+                cached[key] = (json.loads(payload), expires_at > now)
+    return cached
+
+
+def store_resources(kind: str, payloads: Dict[str, Any], ttl: float = PRODUCT_RESOURCE_TTL) -> int:
+    """
+    Insert or replace cached resources in one statement
+    
+    Returns:
+        Number of entries stored
+    """
+    if not payloads:
+        return 0
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl)
+    statement = insert(ProductResource)
+    statement = statement.on_conflict_do_update(
+        index_elements=[ProductResource.kind, ProductResource.resource_key],
+        set_={
+            "payload": statement.excluded.payload,
+            "fetched_at": statement.excluded.fetched_at,
+            "expires_at": statement.excluded.expires_at
+        }
+    )
+    with SessionLocal() as db:
+        db.execute(statement, [
+            {
+                "kind": kind,
+                "resource_key": key,
+                "payload": json.dumps(payload),
+                "fetched_at": now,
+                "expires_at": expires_at
+            }
+            for key, payload in payloads.items()
+        ])
+        db.commit()
+    return len(payloads)
+
+
+class ProductResourceCache:
+    """Read-through cache of product images and related products with background revalidation"""
+    
+    def __init__(self, ttl: float = PRODUCT_RESOURCE_TTL, concurrency: int = PRODUCT_RESOURCE_CONCURRENCY):
+        self.ttl = ttl
+        self.concurrency = concurrency
+        # (kind, key) pairs being fetched again in the background
+        self._revalidating: Set[Tuple[str, str]] = set()
+        # Keep references so running tasks are not garbage collected
+        self._tasks: Set[asyncio.Task] = set()
+    
+    async def get_many(self, loader: ProductsLoader, kind: str, keys: Iterable[str]) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        Get resources for several keys
+        
+        Args:
+            loader: Products loader used for keys that are not cached yet
+            kind: IMAGES or RELATED
+            keys: SKUs (images) or product IDs (related products)
+        
+        Returns:
+            Dictionary mapping keys to responses (keys whose live fetch failed are missing)
+        """
+        keys = [str(key) for key in dict.fromkeys(keys) if key is not None]
+        cached = await run_sync(read_resources, kind, keys)
+        results = {key: payload for key, (payload, _) in cached.items()}
+        
+        missing = [key for key in keys if key not in cached]
+        if missing:
+            fetched, _ = await fetch_resources(loader, kind, missing, self.concurrency)
+            if fetched:
+                await run_sync(store_resources, kind, fetched, self.ttl)
+            results.update(fetched)
+        
+        stale = [key for key, (_, fresh) in cached.items() if not fresh]
+        if stale:
+            self._revalidate(kind, stale)
+        
+        return results
+    
+    async def get(self, loader: ProductsLoader, kind: str, key: str) -> List[Dict[str, Any]]:
+        """Get the resource of a single key (empty list if unavailable)"""
+        return (await self.get_many(loader, kind, [key])).get(str(key), [])
+    
+    def _revalidate(self, kind: str, keys: List[str]) -> None:
+        """Fetch expired entries again in the background, once per key"""
+        keys = [key for key in keys if (kind, key) not in self._revalidating]
+        if not keys:
+            return
+        self._revalidating.update((kind, key) for key in keys)
+        task = asyncio.create_task(self._refresh(kind, keys))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+    
+    async def _refresh(self, kind: str, keys: List[str]) -> None:
+        # Uses its own client: the caller's client is closed once its request is answered
+        try:
+            async with WakeAPIClient() as client:
+                fetched, _ = await fetch_resources(ProductsLoader(client), kind, keys, self.concurrency)
+            if fetched:
+                await run_sync(store_resources, kind, fetched, self.ttl)
+        except Exception as e:
+            # Stale entries keep being served; the next read tries again
+            logger.warning("Refreshing %s failed: %s", kind, e)
+        finally:
+            self._revalidating.difference_update((kind, key) for key in keys)
+
+
+# Singleton instance
+product_resource_cache = ProductResourceCache()
\ No newline at end of file
@@ -2,15 +2,16 @@
 Products loader service for Wake API
 """
 
-from typing import Dict, Any, Optional, List, AsyncGenerator
-from ..api import wake_client
+from typing import Dict, Any, Optional, List, AsyncGenerator, AsyncIterator, Tuple
+from ..api import get_wake_client
+from .paging import stream_pages, stream_items
 
 
 class ProductsLoader:
     """Service to load products data from Wake API"""
     
     def __init__(self, client=None):
-        self.client = client or wake_client
+        self.client = client or get_wake_client()
     
     async def load_products(
         self,
@@ -34,7 +35,8 @@ class ProductsLoader:
             distribution_centers: List of distribution center IDs to filter
             changed_since: Return only products changed after date (format: yyyy-mm-dd hh:mm:ss)
             only_valid: Return only valid products
-            additional_fields: Additional fields to include (Atacado, Estoque, Atributo, Informacao, TabelaPreco)
+            additional_fields: Additional fields to include (Atacado, Estoque, Atributo, Informacao, TabelaPreco);
+                defaults to Atributo and Informacao, an empty list requests none
         """
         params = {
             "pagina": page,
@@ -54,11 +56,11 @@ class ProductsLoader:
         if changed_since:
             params["alteradosPartirDe"] = changed_since
         
+        if additional_fields is None:
+            # Include attributes and info by default
+            additional_fields = ["Atributo", "Informacao"]
         if additional_fields:
             params["camposAdicionais"] = additional_fields
-        else:
-            # Always include attributes and info by default
-            params["camposAdicionais"] = ["Atributo", "Informacao"]
         
         result = await self.client.get("/produtos", params=params)
         return result if result is not None else []
@@ -100,49 +102,6 @@ class ProductsLoader:
         params = {"tipoIdentificador": identifier_type}
         return await self.client.get(f"/produtos/{identifier}/precos", params=params)
     
-    async def load_product_images(
-        self,
-        identifier: str,
-        identifier_type: str = "Sku",
-        include_siblings: bool = False
-    ) -> List[Dict[str, Any]]:
-        """
-        Load product images
-        
-        Args:
-            identifier: Product identifier
-            identifier_type: Type of identifier (Sku, ProdutoVarianteId, ProdutoId)
-            include_siblings: Include sibling products' images
-        
-        Returns:
-            List of product images
-        """
-        params = {
-            "tipoIdentificador": identifier_type,
-            "produtosIrmaos": include_siblings
-        }
-        result = await self.client.get(f"/produtos/{identifier}/imagens", params=params)
-        return result if result is not None else []
-    
-    async def load_related_products(
-        self,
-        identifier: str,
-        identifier_type: str = "Sku"
-    ) -> List[Dict[str, Any]]:
-        """
-        Load related products
-        
-        Args:
-            identifier: Product identifier
-            identifier_type: Type of identifier (Sku, ProdutoVarianteId, ProdutoId)
-        
-        Returns:
-            List of related product identifiers
-        """
-        params = {"tipoIdentificador": identifier_type}
-        result = await self.client.get(f"/produtos/{identifier}/relacionados", params=params)
-        return result if result is not None else []
-    
     async def load_product_categories(
         self,
         identifier: str,
@@ -165,7 +124,7 @@ class ProductsLoader:
         params = {
             "tipoIdentificador": identifier_type,
             "pagina": page,
-            "quantidadRegistros": min(quantity, 50)
+            "quantidadeRegistros": min(quantity, 50)
         }
         result = await self.client.get(f"/produtos/{identifier}/categorias", params=params)
         return result if result is not None else []
@@ -260,6 +219,86 @@ class ProductsLoader:
         result = await self.client.get(f"/produtos/{identifier}/imagens", params=params)
         return result if result is not None else []
     
+    def stream_products(
+        self,
+        batch_size: int = 50,
+        start_page: int = 1,
+        prefetch: int = 1,
+        max_empty_pages: int = 1,
+        **filters
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Stream pages of /produtos, fetching the next pages while the caller works
+        
+        Args:
+            batch_size: Number of products per page (max: 50)
+            start_page: First page number (e.g. to resume a sync)
+            prefetch: Number of pages fetched ahead
+            max_empty_pages: Consecutive empty pages that end the stream
+            **filters: Filters of load_products (categories, changed_since, only_valid, additional_fields, ...)
+        
+        Yields:
+            Tuples of (page number, products)
+        """
+        batch_size = min(batch_size, 50)
+        
+        async def fetch(page: int):
+            return await self.load_products(page=page, quantity=batch_size, **filters)
+        
+        return stream_pages(
+            fetch,
+            page_size=batch_size,
+            start_page=start_page,
+            prefetch=prefetch,
+            max_empty_pages=max_empty_pages
+        )
+    
+    def stream_product_updates(
+        self,
+        changed_since: Optional[str] = None,
+        batch_size: int = 50,
+        prefetch: int = 1
+    ) -> AsyncIterator[Tuple[int, List[Dict[str, Any]]]]:
+        """
+        Stream pages of /produtos/alteracoes
+        
+        Args:
+            changed_since: Return only products changed after date (format: yyyy-mm-dd hh:mm:ss, max 48h)
+            batch_size: Number of products per page (max: 50)
+            prefetch: Number of pages fetched ahead
+        
+        Yields:
+            Tuples of (page number, products)
+        """
+        batch_size = min(batch_size, 50)
+        
+        async def fetch(page: int):
+            return await self.load_product_updates(page=page, quantity=batch_size, changed_since=changed_since)
+        
+        return stream_pages(fetch, page_size=batch_size, prefetch=prefetch)
+    
+    def stream_product_categories(
+        self,
+        identifier: str,
+        identifier_type: str = "Sku",
+        prefetch: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Stream every category of a product across all pages
+        
+        Args:
+            identifier: Product identifier
+            identifier_type: Type of identifier (Sku, ProdutoVarianteId, ProdutoId)
+            prefetch: Number of pages fetched ahead (most products fit in one page)
+        
+        Yields:
+            Product categories
+        """
+        async def fetch(page: int):
+            return await self.load_product_categories(identifier, identifier_type, page=page, quantity=50)
+        
+        return stream_items(fetch, page_size=50, prefetch=prefetch)
+    
     async def load_all_products(
         self,
         batch_size: int = 50,
@@ -274,21 +313,12 @@ class ProductsLoader:
             only_valid: Return only valid products
             additional_fields: Additional fields to include
         """
-        page = 1
-        
-        while True:
-            result = await self.load_products(
-                page=page,
-                quantity=batch_size,
-                only_valid=only_valid,
-                additional_fields=additional_fields
-            )
-            
-            if not result:
-                break
-            
-            yield result
-            page += 1
+        async for _, products in self.stream_products(
+            batch_size=batch_size,
+            only_valid=only_valid,
+            additional_fields=additional_fields
+        ):
+            yield products
     
     async def get_product(
         self,
@@ -0,0 +1,59 @@
+"""
+Shared memoization for slowly changing reference data
+
+Distribution centers and categories change rarely but are looked up often,
+by many short-lived loader and sync instances. Entries are kept here, per
+process, and shared by all of them until the TTL expires or a sync
+invalidates them.
+"""
+
+import os
+import copy
+from typing import Any, Awaitable, Callable, Hashable, Optional
+
+from ..cache import TTLCache
+
+# Seconds reference data (distribution centers, categories) is reused
+REFERENCE_CACHE_TTL = float(os.getenv("REFERENCE_CACHE_TTL", "3600"))
+
+# Keys are tuples whose first element is the kind ("distribution_centers", "categories")
+reference_cache = TTLCache(ttl=REFERENCE_CACHE_TTL, max_entries=64)
+
+_MISSING = object()
+
+
+async def memoize(key: Hashable, load: Callable[[], Awaitable[Any]], refresh: bool = False) -> Any:
+    """
+    Get a reference value from the cache, loading and storing it on a miss
+    
+    Args:
+        key: Cache key (a tuple starting with the kind of data)
+        load: Coroutine factory loading the value
+        refresh: Skip the cached value and store a freshly loaded one
+    
+    Returns:
+        A copy of the value, so callers cannot change the shared entry
+    """
+    value = _MISSING if refresh else reference_cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = await load()
+        reference_cache.set(key, value)
+    return copy.deepcopy(value)
+
+
+def invalidate_reference_data(kind: Optional[str] = None) -> int:
+    """
+    Drop cached reference data
+    
+    Args:
+        kind: Only drop this kind ("distribution_centers", "categories", "local_distribution_centers");
+            None drops everything
+    
+    Returns:
+        Number of entries dropped
+    """
+    if kind is None:
+        count = len(reference_cache)
+        reference_cache.clear()
+        return count
+    return reference_cache.invalidate_where(lambda key: isinstance(key, tuple) and key[:1] == (kind,))
\ No newline at end of file
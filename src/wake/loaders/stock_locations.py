@@ -3,19 +3,26 @@ Stock locations (distribution centers) loader for Wake API
 """
 
 from typing import List, Dict, Any
-from ..api import wake_client
+from ..api import get_wake_client
+from .reference_cache import memoize
 
 
 class StockLocationsLoader:
     """Service to load stock locations/distribution centers from Wake API"""
     
     def __init__(self, client=None):
-        self.client = client or wake_client
+        self.client = client or get_wake_client()
     
-    async def load_distribution_centers(self) -> List[Dict[str, Any]]:
+    async def load_distribution_centers(self, refresh: bool = False) -> List[Dict[str, Any]]:
         """
         Load all distribution centers
         
+        The list is shared by every loader in the process for REFERENCE_CACHE_TTL
+        seconds, so repeated lookups do not call the API again.
+        
+        Args:
+            refresh: Bypass the cached list and reload it from the API
+        
         Returns:
             List of distribution centers with id, name, zip code and default flag
             
@@ -29,8 +36,12 @@ class StockLocationsLoader:
                 }
             ]
         """
-        result = await self.client.get("/centrosdistribuicao")
-        return result if result is not None else []
+        async def load():
+            result = await self.client.get("/centrosdistribuicao")
+            return result if result is not None else []
+        
+        key = ("distribution_centers", getattr(self.client, "base_url", None), getattr(self.client, "token", None))
+        return await memoize(key, load, refresh=refresh)
     
     async def get_default_distribution_center(self) -> Dict[str, Any] | None:
         """
@@ -0,0 +1,267 @@
+"""
+HTTP response cache for the FastAPI app
+
+ASGI middleware that keeps successful JSON GET responses served from the local
+mirror (X-Data-Source: db) in memory, keyed by path and query parameters.
+Live Wake API fallbacks are not cached, so they never outlive the miss.
+Responses carry strong ETags and Last-Modified headers, and conditional
+requests are answered with 304 Not Modified.
+Entries are dropped when a sync completes.
+"""
+
+import os
+import json
+import time
+import asyncio
+import hashlib
+from contextlib import closing
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode
+
+from .cache import TTLCache
+from .shared_state import connect
+from .sync_version import add_completion_listener, get_sync_version
+
+# Seconds a cached response is served before being rebuilt
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "300"))
+
+# Seconds between checks for syncs completed by other processes
+RESPONSE_CACHE_VERSION_CHECK = float(os.getenv("RESPONSE_CACHE_VERSION_CHECK", "5"))
+
+# Cache-Control sent with cacheable responses (clients and CDNs revalidate with the ETag)
+RESPONSE_CACHE_CONTROL = os.getenv("RESPONSE_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+
+# "memory" caches per process, "sqlite" shares entries between web workers
+RESPONSE_CACHE_BACKEND = os.getenv("RESPONSE_CACHE_BACKEND", "memory").lower()
+
+
+class CachedResponse:
+    """A buffered response with its validators"""
+    
+    __slots__ = ("status", "headers", "body", "etag", "last_modified")
+    
+    def __init__(self, status: int, headers: List[Tuple[bytes, bytes]], body: bytes):
+        self.status = status
+        self.body = body
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        self.last_modified = time.time()
+        
+        validators = {b"etag", b"last-modified", b"cache-control"}
+        self.headers = [(name, value) for name, value in headers if name.lower() not in validators]
+        self.headers += [
+            (b"etag", self.etag.encode()),
+            (b"last-modified", formatdate(self.last_modified, usegmt=True).encode()),
+            (b"cache-control", RESPONSE_CACHE_CONTROL.encode())
+        ]
+    
+    def is_not_modified(self, request_headers: Dict[bytes, bytes]) -> bool:
+        """Evaluate If-None-Match / If-Modified-Since against this response"""
+        if_none_match = request_headers.get(b"if-none-match")
+        if if_none_match is not None:
+            tags = [tag.strip() for tag in if_none_match.decode("latin-1").split(",")]
+            # If-None-Match uses weak comparison, so a W/ prefix still matches
+            return "*" in tags or any(tag.removeprefix("W/") == self.etag for tag in tags)
+        
+        if_modified_since = request_headers.get(b"if-modified-since")
+        if if_modified_since is not None:
+            try:
+                since = parsedate_to_datetime(if_modified_since.decode("latin-1")).timestamp()
+            except (TypeError, ValueError):
+                return False
+            return int(self.last_modified) <= since
+        
+        return False
+    
+    @classmethod
+    def restore(cls, status: int, headers: List[Tuple[bytes, bytes]], body: bytes,
+                etag: str, last_modified: float) -> "CachedResponse":
+        """Rebuild a response stored by another process, keeping its validators"""
+        response = cls.__new__(cls)
+        response.status = status
+        response.headers = headers
+        response.body = body
+        response.etag = etag
+        response.last_modified = last_modified
+        return response
+
+
+class SQLiteResponseStore:
+    """Response store in the shared state file, visible to every worker on the host"""
+    
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+    
+    def get(self, key: str) -> Optional[CachedResponse]:
+        with closing(connect()) as conn:
+            row = conn.execute(
+                "SELECT status, headers, body, etag, last_modified FROM response_cache "
+                "WHERE key = ? AND expires_at > ?",
+                (key, time.time())
+            ).fetchone()
+        if row is None:
+            return None
+        
+        status, headers, body, etag, last_modified = row
+        headers = [
+            (name.encode("latin-1"), value.encode("latin-1")) for name, value in json.loads(headers)
+        ]
+        return CachedResponse.restore(status, headers, body, etag, last_modified)
+    
+    def set(self, key: str, response: CachedResponse) -> None:
+        headers = [
+            (name.decode("latin-1"), value.decode("latin-1")) for name, value in response.headers
+        ]
+        now = time.time()
+        with closing(connect()) as conn:
+            conn.execute("DELETE FROM response_cache WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO response_cache "
+                "(key, status, headers, body, etag, last_modified, expires_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, response.status, json.dumps(headers), response.body, response.etag,
+                 response.last_modified, now + self.ttl)
+            )
+    
+    def clear(self) -> None:
+        with closing(connect()) as conn:
+            conn.execute("DELETE FROM response_cache")
+
+
+class ResponseCache:
+    """Store of cached responses, cleared whenever a sync completes"""
+    
+    def __init__(self, ttl: float = RESPONSE_CACHE_TTL, max_entries: int = 1024,
+                 backend: str = RESPONSE_CACHE_BACKEND):
+        if backend == "sqlite":
+            self._entries = SQLiteResponseStore(ttl=ttl)
+        else:
+            self._entries = TTLCache(ttl=ttl, max_entries=max_entries)
+        # SQLite calls run in a worker thread so they do not block the event loop
+        self._blocking = backend == "sqlite"
+        self._sync_version: Optional[str] = None
+        self._checked_at: Optional[float] = None
+    
+    async def _call(self, method, *args):
+        """Run a store operation, in a worker thread if it touches SQLite"""
+        if self._blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+    
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Get a cached response, or None"""
+        return await self._call(self._entries.get, key)
+    
+    async def set(self, key: str, response: CachedResponse) -> None:
+        """Store a response"""
+        await self._call(self._entries.set, key, response)
+    
+    def clear(self) -> None:
+        """Drop every cached response (blocking; used by sync completion listeners)"""
+        self._entries.clear()
+    
+    async def check_sync_version(self) -> None:
+        """Clear the cache if a sync completed since the last check (throttled)"""
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < RESPONSE_CACHE_VERSION_CHECK:
+            return
+        self._checked_at = now
+        
+        try:
+            version = await asyncio.to_thread(get_sync_version)
+        except Exception as e:
+            print(f"Could not read sync version: {e}")
+            return
+        
+        if version != self._sync_version:
+            self._sync_version = version
+            await self._call(self._entries.clear)
+
+
+def cache_key(path: str, query_string: bytes) -> str:
+    """Build a cache key from the path and the sorted query parameters"""
+    params = sorted(parse_qsl(query_string.decode("latin-1"), keep_blank_values=True))
+    return f"{path}?{urlencode(params)}" if params else path
+
+
+class ResponseCacheMiddleware:
+    """ASGI middleware serving cached JSON GET responses with ETag/304 support"""
+    
+    def __init__(self, app, cache: Optional["ResponseCache"] = None,
+                 exclude_paths: Iterable[str] = ("/health",)):
+        self.app = app
+        self.cache = cache or response_cache
+        self.exclude_paths = set(exclude_paths)
+    
+    async def __call__(self, scope, receive, send):
+        if (scope["type"] != "http" or scope["method"] != "GET"
+                or scope["path"] in self.exclude_paths):
+            await self.app(scope, receive, send)
+            return
+        
+        await self.cache.check_sync_version()
+        
+        key = cache_key(scope["path"], scope.get("query_string", b""))
+        request_headers = dict(scope.get("headers") or [])
+        
+        cached = await self.cache.get(key)
+        if cached is not None:
+            await self._send_cached(send, cached, request_headers, b"HIT")
+            return
+        
+        start: Dict[str, Any] = {}
+        chunks: List[bytes] = []
+        passthrough = False
+        
+        async def capture(message):
+            nonlocal passthrough
+            
+            if message["type"] == "http.response.start":
+                headers = dict(message.get("headers") or [])
+                content_type = headers.get(b"content-type", b"")
+                # Only buffer complete JSON bodies read from the mirror; streams, errors
+                # and live Wake API fallbacks go straight through
+                if (message["status"] != 200 or not content_type.startswith(b"application/json")
+                        or headers.get(b"x-data-source") != b"db"):
+                    passthrough = True
+                    await send(message)
+                else:
+                    start.update(message)
+                return
+            
+            if passthrough:
+                await send(message)
+                return
+            
+            if message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    response = CachedResponse(
+                        start["status"], list(start.get("headers") or []), b"".join(chunks)
+                    )
+                    await self.cache.set(key, response)
+                    await self._send_cached(send, response, request_headers, b"MISS")
+        
+        await self.app(scope, receive, capture)
+    
+    async def _send_cached(self, send, response: CachedResponse,
+                           request_headers: Dict[bytes, bytes], cache_status: bytes):
+        """Send a cached response, or 304 if the client already has it"""
+        if response.is_not_modified(request_headers):
+            headers = [(name, value) for name, value in response.headers
+                       if name in (b"etag", b"last-modified", b"cache-control")]
+            await send({"type": "http.response.start", "status": 304,
+                        "headers": headers + [(b"x-cache", cache_status)]})
+            await send({"type": "http.response.body", "body": b""})
+            return
+        
+        await send({"type": "http.response.start", "status": response.status,
+                    "headers": response.headers + [(b"x-cache", cache_status)]})
+        await send({"type": "http.response.body", "body": response.body})
+
+
+# Singleton instance
+response_cache = ResponseCache()
+
+# Drop cached responses as soon as a sync completes in this process
+add_completion_listener(lambda sync_type: response_cache.clear())
\ No newline at end of file
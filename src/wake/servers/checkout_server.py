@@ -11,7 +11,9 @@ from datetime import datetime
 from fastmcp import FastMCP
 from typing import List, Dict, Any, Optional
 from src.wake.services.checkout_service import CheckoutService
-from src.wake.db import SessionLocal, CustomerToken
+from src.wake.services.checkout_cache import checkout_cache
+from src.wake.services.availability import availability_index, CHECKOUT_PREFLIGHT
+from src.wake.db import SessionLocal, CustomerToken, run_sync
 
 
 # Create MCP server
@@ -44,11 +46,24 @@ def get_customer_token():
     return None
 
 
+async def get_optional_customer_token() -> Optional[str]:
+    """Get customer token if available, warning instead of failing when it is not"""
+    try:
+        return await run_sync(get_customer_token)
+    except Exception as e:
+        # Continue without token, but warn about the error
+        print(f"Aviso: {str(e)}")
+        return None
+
+
 def format_checkout_response(checkout_data: Dict[str, Any]) -> Dict[str, Any]:
     """Format checkout response consistently"""
     if not checkout_data:
         return {}
     
+    # Fill fields the mutation did not return from the fresh cached checkout state
+    checkout_data = checkout_cache.overlay(checkout_data)
+    
     return {
         "checkoutId": checkout_data.get("checkoutId"),
         "total": checkout_data.get("total", 0),
@@ -67,6 +82,79 @@ def format_checkout_response(checkout_data: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
+async def preflight_products(products: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Validate cart items against the local catalogue before calling Wake
+    
+    Args:
+        products: List of products with productVariantId and quantity
+    
+    Returns:
+        Validation report, or None when validation is off or the local data is unavailable
+    
+    Raises:
+        Exception: In strict mode, if any item is known to be unavailable
+    """
+    if CHECKOUT_PREFLIGHT == "off" or not products:
+        return None
+    
+    try:
+        # A stale index reloads from the database, so keep it off the event loop
+        report = await run_sync(availability_index.validate, products)
+    except Exception as e:
+        # Local data problems must never block the checkout
+        print(f"Aviso: validação local indisponível: {str(e)}")
+        return None
+    
+    if not report["ok"] and CHECKOUT_PREFLIGHT == "strict":
+        messages = "; ".join(
+            f"{error.get('sku') or error['productVariantId']}: {error['message']}"
+            for error in report["errors"]
+        )
+        raise Exception(f"Itens indisponíveis: {messages}")
+    
+    return report
+
+
+def parse_variant_quantities(spec: Optional[str], allow_missing_quantity: bool = False) -> Dict[int, Optional[int]]:
+    """
+    Parse a "variantId:quantity,variantId:quantity" list
+    
+    Args:
+        spec: Comma-separated list of variant IDs with quantities
+        allow_missing_quantity: Accept bare variant IDs, mapped to None
+    
+    Returns:
+        Dictionary of variant ID -> quantity (summed when a variant repeats)
+    """
+    result: Dict[int, Optional[int]] = {}
+    if not spec:
+        return result
+    
+    for item in spec.split(','):
+        item = item.strip()
+        if not item:
+            continue
+        
+        if ':' in item:
+            variant_id, quantity = (part.strip() for part in item.split(':', 1))
+            quantity_int = int(quantity)
+            if quantity_int < 0:
+                raise ValueError(f"Invalid quantity for variant {variant_id}: {quantity}")
+        elif allow_missing_quantity:
+            variant_id, quantity_int = item, None
+        else:
+            raise ValueError(f"Missing quantity for variant {item} (use variantId:quantity)")
+        
+        variant_key = int(variant_id)
+        if variant_key in result and result[variant_key] is not None and quantity_int is not None:
+            result[variant_key] += quantity_int
+        else:
+            result[variant_key] = quantity_int
+    
+    return result
+
+
 @mcp.tool()
 async def create_checkout(
     product_variant_ids: Optional[str] = None,
@@ -100,13 +188,46 @@ async def create_checkout(
                     "quantity": int(quantity)
                 })
         
+        validation = await preflight_products(products)
+        
         try:
             result = await service.create_checkout(products)
-            return format_checkout_response(result)
+            formatted = format_checkout_response(result)
+            if validation:
+                formatted["validation"] = validation
+            return formatted
         except Exception as e:
             raise Exception(f"Error creating checkout: {str(e)}")
 
 
+@mcp.tool()
+async def validate_cart_items(
+    product_variant_ids: str,
+    quantities: str
+) -> Dict[str, Any]:
+    """
+    Check availability and expected prices of items locally, without calling Wake
+    
+    Args:
+        product_variant_ids: Comma-separated list of product variant IDs (e.g., "265682,265683")
+        quantities: Comma-separated list of quantities (e.g., "2,1")
+    
+    Returns:
+        Validation report with ok flag, errors, warnings, per-item prices and expected subtotal
+    """
+    variant_ids = [id.strip() for id in product_variant_ids.split(',') if id.strip()]
+    qty_list = [q.strip() for q in quantities.split(',') if q.strip()]
+    
+    if len(variant_ids) != len(qty_list):
+        raise ValueError("product_variant_ids and quantities must have the same number of items")
+    
+    products = [
+        {"productVariantId": int(variant_id), "quantity": int(quantity)}
+        for variant_id, quantity in zip(variant_ids, qty_list)
+    ]
+    return await run_sync(availability_index.validate, products)
+
+
 @mcp.tool()
 async def add_to_checkout(
     checkout_id: str,
@@ -124,58 +245,22 @@ async def add_to_checkout(
     Returns:
         Updated checkout object
     """
-    async with StorefrontAPIClient() as client:
-        mutation = """
-        mutation AddToCheckout($input: CheckoutProductInput!, $customerAccessToken: String, $recaptchaToken: String) {
-            checkoutAddProduct(input: $input, customerAccessToken: $customerAccessToken, recaptchaToken: $recaptchaToken) {
-                checkoutId
-                total
-                subtotal
-                shippingFee
-                discount
-                products {
-                    productId
-                    productVariantId
-                    name
-                    sku
-                    quantity
-                    price
-                    ajustedPrice
-                    listPrice
-                    imageUrl
-                }
-            }
-        }
-        """
-        
+    async with CheckoutService() as service:
         product_input = {
             "productVariantId": int(product_variant_id),
             "quantity": int(quantity)
         }
         
-        variables = {
-            "input": {
-                "id": checkout_id,
-                "products": [product_input]
-            },
-            "recaptchaToken": None
-        }
-        
-        # Add customer token if available from database
-        try:
-            customer_token = get_customer_token()
-            if customer_token:
-                variables["customerAccessToken"] = customer_token
-        except Exception as e:
-            # Continue without token, but warn about the error
-            print(f"Aviso: {str(e)}")
+        validation = await preflight_products([product_input])
         
         try:
-            result = await client.query(mutation, variables)
-            if result and "checkoutAddProduct" in result:
-                return format_checkout_response(result["checkoutAddProduct"])
-            else:
-                raise Exception("Failed to add product to checkout")
+            result = await service.add_products(
+                checkout_id, [product_input], await get_optional_customer_token()
+            )
+            formatted = format_checkout_response(result)
+            if validation:
+                formatted["validation"] = validation
+            return formatted
         except Exception as e:
             raise Exception(f"Error adding to checkout: {str(e)}")
 
@@ -200,55 +285,17 @@ async def update_checkout_product(
     Returns:
         Updated checkout object
     """
-    async with StorefrontAPIClient() as client:
-        mutation = """
-        mutation UpdateCheckoutProduct($input: CheckoutProductUpdateInput!, $customerAccessToken: String) {
-            checkoutUpdateProduct(input: $input, customerAccessToken: $customerAccessToken) {
-                checkoutId
-                total
-                subtotal
-                shippingFee
-                discount
-                products {
-                    productId
-                    productVariantId
-                    name
-                    sku
-                    quantity
-                    price
-                    ajustedPrice
-                    listPrice
-                    imageUrl
-                }
-            }
-        }
-        """
-        
-        variables = {
-            "input": {
-                "id": checkout_id,
-                "product": {
-                    "productVariantId": int(product_variant_id),
-                    "quantity": int(quantity)
-                }
-            }
+    async with CheckoutService() as service:
+        product_input = {
+            "productVariantId": int(product_variant_id),
+            "quantity": int(quantity)
         }
         
-        # Add customer token if available from database
         try:
-            customer_token = get_customer_token()
-            if customer_token:
-                variables["customerAccessToken"] = customer_token
-        except Exception as e:
-            # Continue without token, but warn about the error
-            print(f"Aviso: {str(e)}")
-        
-        try:
-            result = await client.query(mutation, variables)
-            if result and "checkoutUpdateProduct" in result:
-                return format_checkout_response(result["checkoutUpdateProduct"])
-            else:
-                raise Exception("Failed to update product in checkout")
+            result = await service.update_product(
+                checkout_id, product_input, await get_optional_customer_token()
+            )
+            return format_checkout_response(result)
         except Exception as e:
             raise Exception(f"Error updating checkout product: {str(e)}")
 
@@ -270,30 +317,7 @@ async def remove_from_checkout(
     Returns:
         Updated checkout object
     """
-    async with StorefrontAPIClient() as client:
-        mutation = """
-        mutation RemoveFromCheckout($input: CheckoutProductInput!, $customerAccessToken: String) {
-            checkoutRemoveProduct(input: $input, customerAccessToken: $customerAccessToken) {
-                checkoutId
-                total
-                subtotal
-                shippingFee
-                discount
-                products {
-                    productId
-                    productVariantId
-                    name
-                    sku
-                    quantity
-                    price
-                    ajustedPrice
-                    listPrice
-                    imageUrl
-                }
-            }
-        }
-        """
-        
+    async with CheckoutService() as service:
         # If quantity not specified, assume we want to remove all
         # Since get_checkout might fail, we'll use a high number
         if quantity is None:
@@ -301,33 +325,79 @@ async def remove_from_checkout(
         else:
             quantity_int = int(quantity)
         
-        variables = {
-            "input": {
-                "id": checkout_id,
-                "products": [{
-                    "productVariantId": int(product_variant_id),
-                    "quantity": quantity_int
-                }]
-            }
+        product_input = {
+            "productVariantId": int(product_variant_id),
+            "quantity": quantity_int
         }
         
-        # Add customer token if available from database
         try:
-            customer_token = get_customer_token()
-            if customer_token:
-                variables["customerAccessToken"] = customer_token
+            result = await service.remove_products(
+                checkout_id, [product_input], await get_optional_customer_token()
+            )
+            return format_checkout_response(result)
         except Exception as e:
-            # Continue without token, but warn about the error
-            print(f"Aviso: {str(e)}")
+            raise Exception(f"Error removing from checkout: {str(e)}")
+
+
+@mcp.tool()
+async def edit_checkout_products(
+    checkout_id: str,
+    add: Optional[str] = None,
+    remove: Optional[str] = None,
+    set_quantities: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Apply several cart changes at once (one or two mutations instead of one per item)
+    
+    Args:
+        checkout_id: UUID of the checkout
+        add: Variants to add as "variantId:quantity" pairs (e.g., "265682:2,265683:1")
+        remove: Variants to remove as "variantId:quantity" pairs; a bare "variantId" removes all units
+        set_quantities: Final quantities as "variantId:quantity" pairs (0 removes the item)
+    
+    Returns:
+        Updated checkout object with an "applied" summary of the changes sent, and a
+        "failed" entry if the additions failed after the removals were applied
+    """
+    add_map = parse_variant_quantities(add)
+    remove_map = parse_variant_quantities(remove, allow_missing_quantity=True)
+    set_map = parse_variant_quantities(set_quantities)
+    
+    if not (add_map or remove_map or set_map):
+        raise ValueError("Informe ao menos uma alteração em add, remove ou set_quantities")
+    
+    async with CheckoutService() as service:
+        customer_token = await get_optional_customer_token()
+        
+        # Validate the quantities the cart will end up with: current + added, and the final ones set
+        resulting = dict(set_map)
+        if add_map:
+            current = await service.get_line_quantities(checkout_id, customer_token)
+            for variant_id, quantity in add_map.items():
+                resulting[variant_id] = current.get(variant_id, 0) + quantity
+        validation = await preflight_products([
+            {"productVariantId": variant_id, "quantity": quantity}
+            for variant_id, quantity in resulting.items()
+            if quantity
+        ])
         
         try:
-            result = await client.query(mutation, variables)
-            if result and "checkoutRemoveProduct" in result:
-                return format_checkout_response(result["checkoutRemoveProduct"])
-            else:
-                raise Exception("Failed to remove product from checkout")
+            result = await service.apply_cart_changes(
+                checkout_id,
+                add=add_map,
+                remove=remove_map,
+                set_quantities=set_map,
+                customer_token=customer_token
+            )
+            formatted = format_checkout_response(result)
+            formatted["applied"] = result["applied"]
+            if "failed" in result:
+                formatted["failed"] = result["failed"]
+            if validation:
+                formatted["validation"] = validation
+            return formatted
         except Exception as e:
-            raise Exception(f"Error removing from checkout: {str(e)}")
+            raise Exception(f"Error editing checkout products: {str(e)}")
 
 
 @mcp.tool()
@@ -345,124 +415,24 @@ async def get_checkout(
         include_available_payments: Include payment methods
     
     Returns:
-        Complete checkout object with all details
-    """
-    async with StorefrontAPIClient() as client:
-        # Build query based on requested includes
-        shipping_fragment = """
-            availableShippingMethods {
-                shippingQuoteId
-                name
-                type
-                value
-                deadline
-                shippingMethodId
-                distributionCenterName
-            }
-        """ if include_available_shipping else ""
-        
-        payment_fragment = """
-            availablePaymentMethods {
-                paymentMethodId
-                name
-                installments {
-                    installmentNumber
-                    value
-                    total
-                    fees
-                }
-            }
-        """ if include_available_payments else ""
-        
-        query = f"""
-        query GetCheckout($checkoutId: String!, $customerAccessToken: String) {{
-            checkout(checkoutId: $checkoutId, customerAccessToken: $customerAccessToken) {{
-                checkoutId
-                completed
-                total
-                subtotal
-                shippingFee
-                discount
-                couponDiscount
-                customer {{
-                    customerId
-                    customerName
-                    email
-                }}
-                products {{
-                    productId
-                    productVariantId
-                    name
-                    sku
-                    quantity
-                    price
-                    listPrice
-                    totalPrice
-                    imageUrl
-                    brand
-                    category
-                    gift
-                    productAttributes {{
-                        name
-                        value
-                    }}
-                }}
-                selectedAddress {{
-                    id
-                    street
-                    addressNumber
-                    complement
-                    neighborhood
-                    city
-                    state
-                    cep
-                    receiverName
-                    referencePoint
-                }}
-                selectedShipping {{
-                    shippingQuoteId
-                    name
-                    value
-                    deadline
-                }}
-                selectedPaymentMethod {{
-                    paymentMethodId
-                    name
-                    installments
-                }}
-                coupon
-                {shipping_fragment}
-                {payment_fragment}
-            }}
-        }}
-        """
-        
-        variables = {
-            "checkoutId": checkout_id
-        }
-        
-        # Add customer token if available from database
-        try:
-            customer_token = get_customer_token()
-            if customer_token:
-                variables["customerAccessToken"] = customer_token
-        except Exception as e:
-            # Continue without token, but warn about the error
-            print(f"Aviso: {str(e)}")
-        
+        Complete checkout object with all details (answered from the local checkout
+        cache when the previous checkout steps already returned fresh data)
+    """
+    async with CheckoutService() as service:
         try:
-            result = await client.query(query, variables)
-            if result and "checkout" in result:
-                checkout = result["checkout"]
-                # Add the available methods to the formatted response if requested
-                formatted = format_checkout_response(checkout)
-                if include_available_shipping:
-                    formatted["availableShippingMethods"] = checkout.get("availableShippingMethods", [])
-                if include_available_payments:
-                    formatted["availablePaymentMethods"] = checkout.get("availablePaymentMethods", [])
-                return formatted
-            else:
-                raise Exception("Failed to get checkout")
+            checkout = await service.get_checkout(
+                checkout_id,
+                include_available_shipping=include_available_shipping,
+                include_available_payments=include_available_payments,
+                customer_token=await get_optional_customer_token()
+            )
+            # Add the available methods to the formatted response if requested
+            formatted = format_checkout_response(checkout)
+            if include_available_shipping:
+                formatted["availableShippingMethods"] = checkout.get("availableShippingMethods", [])
+            if include_available_payments:
+                formatted["availablePaymentMethods"] = checkout.get("availablePaymentMethods", [])
+            return formatted
         except Exception as e:
             raise Exception(f"Error getting checkout: {str(e)}")
 
@@ -655,16 +625,19 @@ async def remove_coupon(
 
 
 @mcp.tool()
-async def list_customer_addresses() -> List[Dict[str, Any]]:
+async def list_customer_addresses(refresh: bool = False) -> List[Dict[str, Any]]:
     """
     Lista os endereços salvos do cliente
     
+    Args:
+        refresh: Ignora o cache e busca os endereços novamente na Wake
+    
     Returns:
         Lista de endereços do cliente
     """
     async with CheckoutService() as service:
         try:
-            addresses = await service.list_customer_addresses()
+            addresses = await service.list_customer_addresses(refresh=refresh)
             # Format addresses for better readability
             formatted_addresses = []
             for addr in addresses:
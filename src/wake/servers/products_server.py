@@ -6,18 +6,48 @@ Provides tools to search and interact with Wake e-commerce products locally.
 """
 
 from fastmcp import FastMCP
-from typing import List, Dict, Any, Optional
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy import or_, func
+from typing import List, Dict, Any, Optional, Union
 
-from src.wake.db import SessionLocal, Product, ProductVariant, VariantPricing, VariantStock, DistributionCenter, VariantAttribute, ProductInfo
+from src.wake.db import run_sync
 from src.wake.api import WakeAPIClient
 from src.wake.loaders import ProductsLoader
+from src.wake.loaders.product_resources import product_resource_cache, IMAGES, RELATED
+from src.wake.services.product_search import search_variants, load_variants_by_sku, load_related_variants
+from src.wake.services.catalog_snapshot import catalog_snapshot
+from src.wake.services.facets import facet_index
+from src.wake.services.dc_proximity import dc_proximity_index
+from src.wake.services.variant_matrix import load_variant_matrix
 
 
 # Create MCP server
 mcp = FastMCP("Wake Products Server")
 
+# Start loading the in-memory catalogue (only when CATALOG_SNAPSHOT=true)
+catalog_snapshot.start()
+
+
+async def _add_images(loader: ProductsLoader, results: List[Dict[str, Any]]) -> None:
+    """Attach product images to results from the image cache (fetched live only on a miss)"""
+    try:
+        images_by_sku = await product_resource_cache.get_many(
+            loader, IMAGES, [result["sku"] for result in results]
+        )
+    except Exception:
+        # If image loading fails (e.g. API or cache table unavailable), continue without images
+        return
+    for result in results:
+        images = images_by_sku.get(result["sku"])
+        if images:
+            result["images"] = [
+                {
+                    "url": img.get("url"),
+                    "ordem": img.get("ordem"),
+                    "nome": img.get("nomeArquivo")
+                }
+                for img in images
+                if img.get("url")
+            ]
+
 
 @mcp.tool()
 async def search_products(
@@ -40,142 +70,19 @@ async def search_products(
     Returns:
         List of matching products with details (always includes stock information)
     """
-    # Create API client for image loading if needed
-    api_client = None
-    loader = None
-    if include_images:
-        api_client = WakeAPIClient()
-        await api_client.__aenter__()
-        loader = ProductsLoader(api_client)
+    snapshot = catalog_snapshot.get()
+    if snapshot is not None:
+        results = snapshot.search(query, limit, include_pricing, include_out_of_stock)
+    else:
+        # The search runs in the thread pool so other tool calls keep being served meanwhile
+        results = await run_sync(search_variants, query, limit, include_pricing, include_out_of_stock)
     
-    try:
-        with SessionLocal() as db:
-            # Build base query
-            query_obj = db.query(ProductVariant).join(Product)
-            
-            # Add search filters
-            # Try to convert query to integer for ID searches
-            try:
-                query_as_int = int(query)
-                search_filter = or_(
-                    ProductVariant.name.ilike(f"%{query}%"),
-                    ProductVariant.sku.ilike(f"%{query}%"),
-                    Product.parent_name.ilike(f"%{query}%"),
-                    Product.manufacturer.ilike(f"%{query}%"),
-                    Product.id == query_as_int,  # Search by product ID
-                    Product.parent_product_id == query_as_int  # Search by parent product ID
-                )
-            except ValueError:
-                # Query is not a number, search only text fields
-                search_filter = or_(
-                    ProductVariant.name.ilike(f"%{query}%"),
-                    ProductVariant.sku.ilike(f"%{query}%"),
-                    Product.parent_name.ilike(f"%{query}%"),
-                    Product.manufacturer.ilike(f"%{query}%")
-                )
-            query_obj = query_obj.filter(search_filter)
-            
-            # Join with stock table to enable sorting by stock
-            query_obj = query_obj.outerjoin(VariantStock)
-            
-            # Filter out out-of-stock items by default
-            if not include_out_of_stock:
-                query_obj = query_obj.filter(
-                    VariantStock.physical_stock > 0
-                )
-            
-            # Sort by total stock (sum of all distribution centers) in descending order
-            query_obj = query_obj.group_by(ProductVariant.id, Product.id).order_by(
-                func.coalesce(func.sum(VariantStock.physical_stock), 0).desc()
-            )
-            
-            # Get results
-            variants = query_obj.limit(limit).all()
-            
-            results = []
-            for variant in variants:
-                result = {
-                    "product_id": variant.product.id,
-                    "variant_id": variant.id,
-                    "sku": variant.sku,
-                    "name": variant.name,
-                    "parent_name": variant.product.parent_name,
-                    "manufacturer": variant.product.manufacturer,
-                    "ean": variant.ean
-                }
-                
-                # Add pricing if requested
-                if include_pricing:
-                    pricing = db.query(VariantPricing).filter_by(variant_id=variant.id).first()
-                    if pricing:
-                        result["pricing"] = {
-                            "original_price": pricing.original_price,
-                            "sale_price": pricing.sale_price
-                        }
-                
-                # Always add stock information
-                stock_records = db.query(VariantStock).join(DistributionCenter).filter(
-                    VariantStock.variant_id == variant.id
-                ).all()
-                
-                total_stock = 0
-                stock_by_dc = []
-                
-                for stock in stock_records:
-                    total_stock += stock.physical_stock
-                    stock_by_dc.append({
-                        "distribution_center": stock.distribution_center.name,
-                        "available": stock.physical_stock
-                    })
-                
-                result["stock"] = {
-                    "total_available": total_stock,
-                    "by_location": stock_by_dc
-                }
-                
-                # Add attributes (size, color, etc.) - simplified to just name->value
-                attributes = db.query(VariantAttribute).filter_by(variant_id=variant.id).all()
-                result["attributes"] = {}
-                for attr in attributes:
-                    result["attributes"][attr.name] = attr.value
-                
-                # Add product information (descriptions, specs, etc.)
-                product_info = db.query(ProductInfo).filter_by(product_id=variant.product_id).all()
-                result["product_info"] = {}
-                for info in product_info:
-                    # Group by info type, but just store the text content
-                    if info.info_type not in result["product_info"]:
-                        result["product_info"][info.info_type] = []
-                    result["product_info"][info.info_type].append({
-                        "title": info.title,
-                        "text": info.text
-                    })
-                
-                # Add product images from API
-                if include_images and loader:
-                    try:
-                        images = await loader.load_product_images(variant.sku, "Sku", include_siblings=True)
-                        if images:
-                            result["images"] = [
-                                {
-                                    "url": img.get("url"),
-                                    "ordem": img.get("ordem"),
-                                    "nome": img.get("nomeArquivo")
-                                }
-                                for img in images
-                                if img.get("url")
-                            ]
-                    except Exception:
-                        # If image loading fails, continue without images
-                        pass
-                
-                results.append(result)
-        
-        return results
-    finally:
-        # Clean up API client if created
-        if api_client:
-            await api_client.__aexit__(None, None, None)
+    # Add product images (cached, see loaders.product_resources)
+    if include_images and results:
+        async with WakeAPIClient() as api_client:
+            await _add_images(ProductsLoader(api_client), results)
+    
+    return results
 
 
 @mcp.tool()
@@ -191,80 +98,130 @@ async def get_related_products(
         limit: Maximum number of related products to return (default: 10)
     
     Returns:
-        List of related products with details
+        List of related products with details (relation.source tells whether Wake
+        or local category/attribute similarity related them)
     """
-    # Always fetch from Wake API
+    # Precomputed relations (product_relations, filled by ProductRelationSync)
+    results = await run_sync(load_related_variants, product_id, limit)
+    
     async with WakeAPIClient() as client:
         loader = ProductsLoader(client)
-        # Get related products from API
-        related_ids = await loader.load_related_products(str(product_id), "ProdutoId")
         
-        if not related_ids:
-            return []
+        if not results:
+            # Relations not synced yet: ask the API (cached, fetched only on a miss)
+            related_ids = await product_resource_cache.get(loader, RELATED, str(product_id))
+            if not related_ids:
+                return []
+            
+            # Get details for each related product from local DB (in the thread pool)
+            skus = [related.get('sku') for related in related_ids[:limit]]
+            snapshot = catalog_snapshot.get()
+            if snapshot is not None:
+                results = snapshot.variants_by_sku(skus)
+            else:
+                results = await run_sync(load_variants_by_sku, skus)
         
-        # Get details for each related product from local DB
-        results = []
-        with SessionLocal() as db:
-            for related in related_ids[:limit]:
-                variant = db.query(ProductVariant).filter_by(
-                    sku=related.get('sku')
-                ).first()
-                
-                if variant:
-                    result = {
-                        "product_id": variant.product_id,
-                        "variant_id": variant.id,
-                        "sku": variant.sku,
-                        "name": variant.name,
-                        "parent_name": variant.product.parent_name,
-                        "manufacturer": variant.product.manufacturer
-                    }
-                    
-                    # Add attributes
-                    attributes = db.query(VariantAttribute).filter_by(
-                        variant_id=variant.id
-                    ).all()
-                    result["attributes"] = {}
-                    for attr in attributes:
-                        result["attributes"][attr.name] = attr.value
-                    
-                    # Add pricing
-                    pricing = db.query(VariantPricing).filter_by(
-                        variant_id=variant.id
-                    ).first()
-                    if pricing:
-                        result["pricing"] = {
-                            "original_price": pricing.original_price,
-                            "sale_price": pricing.sale_price
-                        }
-                    
-                    # Add stock info
-                    total_stock = db.query(func.sum(VariantStock.physical_stock)).filter_by(
-                        variant_id=variant.id
-                    ).scalar() or 0
-                    result["stock_available"] = total_stock
-                    
-                    # Add product images
-                    try:
-                        images = await loader.load_product_images(variant.sku, "Sku", include_siblings=True)
-                        if images:
-                            result["images"] = [
-                                {
-                                    "url": img.get("url"),
-                                    "ordem": img.get("ordem"),
-                                    "nome": img.get("nomeArquivo")
-                                }
-                                for img in images
-                                if img.get("url")
-                            ]
-                    except Exception:
-                        # If image loading fails, continue without images
-                        pass
-                    
-                    results.append(result)
+        # Add product images
+        await _add_images(loader, results)
         
         return results
 
 
+@mcp.tool()
+async def get_variant_matrix(product_id: int) -> Dict[str, Any]:
+    """
+    Get every size/colour (or other attribute) combination of a product and which are in stock
+    
+    Use this when the customer asks which sizes or colours a product comes in.
+    One call returns the whole grid; the product_id comes from search_products.
+    
+    Args:
+        product_id: The product ID (product_id of a search result)
+    
+    Returns:
+        Dictionary with:
+        - axes: Attributes that vary between variants (e.g. Tamanho, Cor), with all
+          values and in_stock_values
+        - common_attributes: Attributes shared by every variant
+        - variants: Every variant with its attributes, stock_available and pricing
+        - grid: Nested by axis value, e.g. grid["M"]["PRETO"] -> variant_id, sku, stock_available, sale_price
+    """
+    matrix = await run_sync(load_variant_matrix, product_id)
+    if matrix is None:
+        raise Exception(f"Produto {product_id} não encontrado no catálogo local")
+    return matrix
+
+
+@mcp.tool()
+async def filter_products(
+    query: Optional[str] = None,
+    attributes: Optional[Dict[str, Union[str, List[str]]]] = None,
+    category: Optional[str] = None,
+    min_price: Optional[float] = None,
+    max_price: Optional[float] = None,
+    include_out_of_stock: bool = False,
+    limit: int = 20
+) -> Dict[str, Any]:
+    """
+    Filter products by attributes, category and price, with facet counts
+    
+    Use this instead of several searches when the customer gives characteristics,
+    e.g. "camisetas tamanho M cor PRETO até R$100":
+    query="camiseta", attributes={"Tamanho": "M", "Cor": "PRETO"}, max_price=100
+    
+    Args:
+        query: Optional text searched in name, SKU, parent name and manufacturer
+        attributes: Attribute name -> value or list of accepted values (e.g. {"Cor": ["PRETO", "AZUL"]})
+        category: Category ID or name (includes its subcategories)
+        min_price: Minimum price in R$ (inclusive)
+        max_price: Maximum price in R$ (inclusive)
+        include_out_of_stock: Include products with no stock (default: False)
+        limit: Maximum number of variants to return (default: 20)
+    
+    Returns:
+        Dictionary with:
+        - total: Number of matching variants
+        - variants: Matching variants (most stock first) with price, stock and attributes
+        - facets: Counts per attribute value, category and price range, each computed
+          with the other filters applied, to suggest how to refine the search
+    """
+    return await run_sync(
+        facet_index.search,
+        query=query,
+        attributes=attributes,
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        include_out_of_stock=include_out_of_stock,
+        limit=limit
+    )
+
+
+@mcp.tool()
+async def find_stock_near_cep(
+    cep: str,
+    skus: List[str],
+    quantity: int = 1
+) -> Dict[str, Any]:
+    """
+    Find which distribution center can serve a CEP for the given SKUs (local data, instant)
+    
+    Use this before get_shipping_quotes to know whether and from where the items
+    can ship. Distribution centers are ranked by CEP proximity.
+    
+    Args:
+        cep: Destination CEP (e.g. "01310-100")
+        skus: SKUs the customer wants
+        quantity: Units needed of each SKU (default: 1)
+    
+    Returns:
+        Dictionary with:
+        - cep: Normalized CEP
+        - best_distribution_center: Nearest center with every SKU in stock (None if no single center has all)
+        - distribution_centers: All centers from nearest to farthest, with available (physical minus reserved), physical and reserved stock per SKU
+        - unknown_skus: SKUs not found in the local catalog
+    """
+    return await run_sync(dc_proximity_index.find_stock, cep, skus, quantity)
+
 if __name__ == "__main__":
     mcp.run()
\ No newline at end of file
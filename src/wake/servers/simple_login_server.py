@@ -14,6 +14,7 @@ from sqlalchemy import and_
 
 from ..api.storefront import StorefrontAPIClient
 from ..db import SessionLocal, CustomerToken
+from ..services.checkout_service import invalidate_customer_addresses
 
 # Load environment variables
 load_dotenv()
@@ -196,6 +197,9 @@ async def simple_login_verify(
                 response["customerAccessToken"] = token_data
                 response["message"] = "Login realizado com sucesso!"
                 
+                # A new login may come with a different address book
+                invalidate_customer_addresses()
+                
                 # Save token to database with CUSTOMER_PHONE
                 if CUSTOMER_PHONE:
                     try:
@@ -5,7 +5,7 @@ MCP server for user-related operations in Wake e-commerce API
 """
 
 from fastmcp import FastMCP
-from wake.api import wake_client
+from wake.api import get_wake_client
 
 # Initialize MCP server for users
 mcp = FastMCP("Wake Users API")
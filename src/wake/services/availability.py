@@ -0,0 +1,197 @@
+"""
+Local availability index for checkout pre-validation
+
+Answers "is this variant sellable, in stock, and for how much" from the synced
+database, so obviously bad cart items are caught before any storefront call.
+"""
+
+import os
+import time
+from typing import Dict, Any, List, Optional
+from sqlalchemy import func, case
+
+from ..db import SessionLocal, ProductVariant, VariantPricing, VariantStock
+
+# Seconds before the index is reloaded from the database
+AVAILABILITY_INDEX_TTL = float(os.getenv("AVAILABILITY_INDEX_TTL", "60"))
+
+# "strict" rejects unavailable items, "warn" only reports them, "off" skips validation
+CHECKOUT_PREFLIGHT = os.getenv("CHECKOUT_PREFLIGHT", "warn").lower()
+
+# Units of a variant_stock row that can be sold: physical minus reserved, none if flagged unavailable
+SELLABLE_STOCK = case(
+    (VariantStock.is_available, func.max(VariantStock.physical_stock - VariantStock.reserved_stock, 0)),
+    else_=0
+)
+
+
+class VariantAvailability:
+    """Availability and price of a single variant"""
+    
+    __slots__ = ("variant_id", "sku", "name", "is_valid", "sale_price", "original_price",
+                 "stock", "has_stock_data")
+    
+    def __init__(self, variant_id: int, sku: str, name: str, is_valid: bool,
+                 sale_price: Optional[float], original_price: Optional[float],
+                 stock: int, has_stock_data: bool):
+        self.variant_id = variant_id
+        self.sku = sku
+        self.name = name
+        self.is_valid = is_valid
+        self.sale_price = sale_price
+        self.original_price = original_price
+        self.stock = stock
+        self.has_stock_data = has_stock_data
+
+
+class AvailabilityIndex:
+    """In-memory index of variant availability loaded from the local database"""
+    
+    def __init__(self, ttl: float = AVAILABILITY_INDEX_TTL):
+        self.ttl = ttl
+        self._variants: Dict[int, VariantAvailability] = {}
+        self._loaded_at: Optional[float] = None
+    
+    def refresh(self) -> int:
+        """
+        Reload the index from the database
+        
+        Returns:
+            Number of variants indexed
+        """
+        with SessionLocal() as db:
+            rows = db.query(
+                ProductVariant.id,
+                ProductVariant.sku,
+                ProductVariant.name,
+                ProductVariant.is_valid,
+                VariantPricing.sale_price,
+                VariantPricing.original_price,
+                func.coalesce(func.sum(SELLABLE_STOCK), 0),
+                func.count(VariantStock.variant_id)
+            ).outerjoin(
+                VariantPricing, VariantPricing.variant_id == ProductVariant.id
+            ).outerjoin(
+                VariantStock, VariantStock.variant_id == ProductVariant.id
+            ).group_by(ProductVariant.id).all()
+        
+        variants = {
+            row[0]: VariantAvailability(
+                variant_id=row[0],
+                sku=row[1],
+                name=row[2],
+                is_valid=row[3],
+                sale_price=row[4],
+                original_price=row[5],
+                stock=int(row[6]),
+                has_stock_data=row[7] > 0
+            )
+            for row in rows
+        }
+        
+        # Swap in one assignment so readers never see a half-built index
+        self._variants = variants
+        self._loaded_at = time.monotonic()
+        return len(variants)
+    
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup"""
+        self._loaded_at = None
+    
+    def get(self, variant_id: int) -> Optional[VariantAvailability]:
+        """Get availability for a variant, reloading the index when stale"""
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh()
+        return self._variants.get(int(variant_id))
+    
+    def validate(self, products: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Validate cart items against local availability
+        
+        Args:
+            products: List of products with productVariantId and quantity
+        
+        Returns:
+            Dictionary with:
+            - ok: False if any item is known to be unavailable
+            - errors: Items that cannot be sold (invalid or without enough stock)
+            - warnings: Items that could not be fully checked locally
+            - items: Per-item expected unit and line price from local data
+            - expected_subtotal: Sum of line prices (None if any price is unknown)
+        """
+        errors = []
+        warnings = []
+        items = []
+        expected_subtotal: Optional[float] = 0.0
+        
+        for product in products:
+            variant_id = int(product["productVariantId"])
+            quantity = int(product.get("quantity", 1))
+            variant = self.get(variant_id)
+            
+            if variant is None:
+                warnings.append({
+                    "productVariantId": variant_id,
+                    "message": "Variante não encontrada no catálogo local; a Wake fará a validação"
+                })
+                expected_subtotal = None
+                continue
+            
+            item = {
+                "productVariantId": variant_id,
+                "sku": variant.sku,
+                "name": variant.name,
+                "quantity": quantity,
+                "stock_available": variant.stock if variant.has_stock_data else None,
+                "unit_price": variant.sale_price,
+                "original_price": variant.original_price,
+                "line_total": round(variant.sale_price * quantity, 2) if variant.sale_price is not None else None
+            }
+            items.append(item)
+            
+            if item["line_total"] is None:
+                expected_subtotal = None
+                warnings.append({
+                    "productVariantId": variant_id,
+                    "sku": variant.sku,
+                    "message": "Preço não disponível localmente"
+                })
+            elif expected_subtotal is not None:
+                expected_subtotal += item["line_total"]
+            
+            if not variant.is_valid:
+                errors.append({
+                    "productVariantId": variant_id,
+                    "sku": variant.sku,
+                    "message": "Produto inválido ou indisponível para venda"
+                })
+            elif not variant.has_stock_data:
+                warnings.append({
+                    "productVariantId": variant_id,
+                    "sku": variant.sku,
+                    "message": "Estoque não sincronizado localmente"
+                })
+            elif variant.stock <= 0:
+                errors.append({
+                    "productVariantId": variant_id,
+                    "sku": variant.sku,
+                    "message": "Produto sem estoque"
+                })
+            elif quantity > variant.stock:
+                errors.append({
+                    "productVariantId": variant_id,
+                    "sku": variant.sku,
+                    "message": f"Estoque insuficiente: {variant.stock} disponível(is), {quantity} solicitado(s)"
+                })
+        
+        return {
+            "ok": not errors,
+            "errors": errors,
+            "warnings": warnings,
+            "items": items,
+            "expected_subtotal": round(expected_subtotal, 2) if expected_subtotal is not None else None
+        }
+
+
+# Singleton instance
+availability_index = AvailabilityIndex()
\ No newline at end of file
@@ -0,0 +1,295 @@
+"""
+In-memory catalogue snapshot for product search
+
+Holds every variant with its pricing, stock, attributes and product info in
+compact slotted objects, indexed by SKU, variant ID and attribute, so the
+products server can answer searches without querying SQLite. The snapshot is
+built in a background thread and swapped in with a single assignment whenever
+a completed sync shows up in SyncState; until the first build finishes callers
+fall back to the database.
+"""
+
+import os
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple
+from sqlalchemy import select
+
+from ..db import (
+    SessionLocal,
+    Product,
+    ProductVariant,
+    VariantPricing,
+    VariantStock,
+    DistributionCenter,
+    VariantAttribute,
+    ProductInfo
+)
+from ..sync_version import VersionedIndex, add_completion_listener, get_sync_version
+
+# The products server speaks MCP over stdout, so problems are logged (to stderr)
+logger = logging.getLogger(__name__)
+
+# Serve search_products and get_related_products from the snapshot ("true" or "false")
+CATALOG_SNAPSHOT = os.getenv("CATALOG_SNAPSHOT", "false").lower() == "true"
+
+# Seconds between checks of SyncState for a newer completed sync
+CATALOG_SNAPSHOT_VERSION_CHECK = float(os.getenv("CATALOG_SNAPSHOT_VERSION_CHECK", "5"))
+
+
+class SnapshotVariant:
+    """A variant as held in the snapshot"""
+    
+    __slots__ = ("variant_id", "product_id", "parent_product_id", "sku", "name", "ean",
+                 "parent_name", "manufacturer", "pricing", "stock", "total_stock",
+                 "in_stock_total", "attributes", "search_text")
+    
+    def __init__(self, variant_id: int, product_id: int, parent_product_id: Optional[int],
+                 sku: str, name: str, ean: Optional[str], parent_name: Optional[str],
+                 manufacturer: Optional[str]):
+        self.variant_id = variant_id
+        self.product_id = product_id
+        self.parent_product_id = parent_product_id
+        self.sku = sku
+        self.name = name
+        self.ean = ean
+        self.parent_name = parent_name
+        self.manufacturer = manufacturer
+        self.pricing: Optional[Tuple[Optional[float], Optional[float]]] = None  # (original, sale)
+        self.stock: List[Tuple[str, int]] = []  # (distribution center name, physical stock)
+        self.total_stock = 0
+        self.in_stock_total = 0  # Sum over distribution centers with stock > 0
+        self.attributes: Dict[str, str] = {}
+        # Searched fields, lowercased and separated so a match cannot span two of them
+        self.search_text = "\x00".join(
+            (value or "").lower() for value in (name, sku, parent_name, manufacturer)
+        )
+    
+    def pricing_dict(self) -> Dict[str, Any]:
+        return {"original_price": self.pricing[0], "sale_price": self.pricing[1]}
+
+
+class CatalogSnapshot:
+    """Immutable catalogue snapshot with lookup indexes"""
+    
+    def __init__(self, variants: List[SnapshotVariant],
+                 product_info: Dict[int, Dict[str, List[Dict[str, str]]]], version: Optional[str]):
+        self.version = version
+        self.product_info = product_info
+        self.by_id: Dict[int, SnapshotVariant] = {v.variant_id: v for v in variants}
+        self.by_sku: Dict[str, SnapshotVariant] = {v.sku: v for v in variants}
+        
+        by_attribute: Dict[Tuple[str, str], List[int]] = defaultdict(list)
+        for variant in variants:
+            for name, value in variant.attributes.items():
+                by_attribute[(name.lower(), value.lower())].append(variant.variant_id)
+        self.by_attribute: Dict[Tuple[str, str], Tuple[int, ...]] = {
+            key: tuple(ids) for key, ids in by_attribute.items()
+        }
+        
+        # Search result orders, matching the database search: most stock first, then variant ID
+        self.order_all = sorted(variants, key=lambda v: (-v.total_stock, v.variant_id))
+        self.order_in_stock = sorted(
+            (v for v in variants if v.in_stock_total > 0),
+            key=lambda v: (-v.in_stock_total, v.variant_id)
+        )
+    
+    def __len__(self) -> int:
+        return len(self.by_id)
+    
+    def _copy_product_info(self, product_id: int) -> Dict[str, List[Dict[str, str]]]:
+        return {
+            info_type: [dict(entry) for entry in entries]
+            for info_type, entries in self.product_info.get(product_id, {}).items()
+        }
+    
+    def search(
+        self,
+        query: str,
+        limit: int = 10,
+        include_pricing: bool = True,
+        include_out_of_stock: bool = False
+    ) -> List[Dict[str, Any]]:
+        """Same results as product_search.search_variants, answered from memory"""
+        needle = query.lower()
+        try:
+            query_id: Optional[int] = int(query)
+        except ValueError:
+            query_id = None
+        
+        results = []
+        for variant in (self.order_all if include_out_of_stock else self.order_in_stock):
+            if len(results) >= limit:
+                break
+            if needle not in variant.search_text and (
+                query_id is None or query_id not in (variant.product_id, variant.parent_product_id)
+            ):
+                continue
+            
+            result = {
+                "product_id": variant.product_id,
+                "variant_id": variant.variant_id,
+                "sku": variant.sku,
+                "name": variant.name,
+                "parent_name": variant.parent_name,
+                "manufacturer": variant.manufacturer,
+                "ean": variant.ean
+            }
+            if include_pricing and variant.pricing is not None:
+                result["pricing"] = variant.pricing_dict()
+            result["stock"] = {
+                "total_available": variant.total_stock,
+                "by_location": [
+                    {"distribution_center": dc_name, "available": available}
+                    for dc_name, available in variant.stock
+                ]
+            }
+            result["attributes"] = dict(variant.attributes)
+            result["product_info"] = self._copy_product_info(variant.product_id)
+            results.append(result)
+        
+        return results
+    
+    def variants_by_sku(self, skus: List[str]) -> List[Dict[str, Any]]:
+        """Same results as product_search.load_variants_by_sku, answered from memory"""
+        results = []
+        for sku in skus:
+            variant = self.by_sku.get(sku) if sku else None
+            if variant is None:
+                continue
+            
+            result = {
+                "product_id": variant.product_id,
+                "variant_id": variant.variant_id,
+                "sku": variant.sku,
+                "name": variant.name,
+                "parent_name": variant.parent_name,
+                "manufacturer": variant.manufacturer,
+                "attributes": dict(variant.attributes)
+            }
+            if variant.pricing is not None:
+                result["pricing"] = variant.pricing_dict()
+            result["stock_available"] = variant.total_stock
+            results.append(result)
+        
+        return results
+    
+    def find_by_attribute(self, name: str, value: str) -> List[SnapshotVariant]:
+        """Variants having an attribute value (case-insensitive), e.g. ("Cor", "preto")"""
+        return [self.by_id[variant_id] for variant_id in self.by_attribute.get((name.lower(), value.lower()), ())]
+
+
+def build_snapshot() -> CatalogSnapshot:
+    """Load the whole catalogue from the database into a new snapshot"""
+    # Read the version first: a sync completing mid-build then triggers another build
+    version = get_sync_version()
+    
+    with SessionLocal() as db:
+        variants: Dict[int, SnapshotVariant] = {}
+        for row in db.execute(select(
+            ProductVariant.id,
+            ProductVariant.product_id,
+            Product.parent_product_id,
+            ProductVariant.sku,
+            ProductVariant.name,
+            ProductVariant.ean,
+            Product.parent_name,
+            Product.manufacturer
+        ).join(Product, Product.id == ProductVariant.product_id)):
+            variants[row[0]] = SnapshotVariant(*row)
+        
+        for variant_id, original_price, sale_price in db.execute(select(
+            VariantPricing.variant_id, VariantPricing.original_price, VariantPricing.sale_price
+        )):
+            if variant_id in variants:
+                variants[variant_id].pricing = (original_price, sale_price)
+        
+        for variant_id, dc_name, physical_stock in db.execute(select(
+            VariantStock.variant_id, DistributionCenter.name, VariantStock.physical_stock
+        ).join(
+            DistributionCenter, DistributionCenter.id == VariantStock.distribution_center_id
+        ).order_by(VariantStock.variant_id, VariantStock.distribution_center_id)):
+            variant = variants.get(variant_id)
+            if variant is None:
+                continue
+            variant.stock.append((dc_name, physical_stock))
+            variant.total_stock += physical_stock
+            if physical_stock > 0:
+                variant.in_stock_total += physical_stock
+        
+        for variant_id, name, value in db.execute(select(
+            VariantAttribute.variant_id, VariantAttribute.name, VariantAttribute.value
+        ).order_by(VariantAttribute.id)):
+            if variant_id in variants:
+                variants[variant_id].attributes[name] = value
+        
+        product_info: Dict[int, Dict[str, List[Dict[str, str]]]] = defaultdict(dict)
+        for product_id, info_type, title, text in db.execute(select(
+            ProductInfo.product_id, ProductInfo.info_type, ProductInfo.title, ProductInfo.text
+        ).order_by(ProductInfo.id)):
+            product_info[product_id].setdefault(info_type, []).append({
+                "title": title,
+                "text": text
+            })
+    
+    return CatalogSnapshot(list(variants.values()), dict(product_info), version)
+
+
+class CatalogSnapshotManager:
+    """Keeps the current snapshot and rebuilds it in the background after syncs"""
+    
+    def __init__(self, enabled: bool = CATALOG_SNAPSHOT,
+                 version_check_interval: float = CATALOG_SNAPSHOT_VERSION_CHECK):
+        self.enabled = enabled
+        self._snapshot = VersionedIndex(build_snapshot, version_check_interval)
+        self._refreshing = False
+    
+    def refresh(self, force: bool = False) -> Optional[CatalogSnapshot]:
+        """
+        Rebuild the snapshot if a newer sync completed (or always, with force)
+        
+        Args:
+            force: Rebuild even if the sync version did not change
+        
+        Returns:
+            The current snapshot after the refresh (None if the first build failed)
+        """
+        try:
+            self._snapshot.refresh(force)
+        except Exception as e:
+            logger.warning("Catalog snapshot refresh failed: %s", e)
+        finally:
+            self._refreshing = False
+        return self._snapshot.current
+    
+    def start(self) -> None:
+        """Build or check the snapshot in a background thread (no-op if one is running)"""
+        if not self.enabled or self._refreshing:
+            return
+        self._refreshing = True
+        threading.Thread(target=self.refresh, name="catalog-snapshot", daemon=True).start()
+    
+    def invalidate(self) -> None:
+        """Check for a newer sync on the next lookup"""
+        self._snapshot.invalidate()
+    
+    def get(self) -> Optional[CatalogSnapshot]:
+        """
+        Get the current snapshot without blocking
+        
+        Returns None while disabled or until the first build finishes. Starts
+        a background version check when the last one is older than the interval.
+        """
+        if not self.enabled:
+            return None
+        if self._snapshot.is_due():
+            self.start()
+        return self._snapshot.current
+
+
+# Singleton instance
+catalog_snapshot = CatalogSnapshotManager()
+
+# A sync finishing in this process is picked up on the next lookup
+add_completion_listener(lambda sync_type: catalog_snapshot.invalidate())
\ No newline at end of file
@@ -0,0 +1,188 @@
+"""
+Checkout state cache
+
+Keeps the last known state of each checkout, merged field by field from the
+snapshots returned by checkout mutations and queries.
+"""
+
+import os
+import copy
+import time
+from typing import Dict, Any, Optional, Iterable, List, Tuple
+
+# Seconds a cached checkout field is considered fresh
+CHECKOUT_CACHE_TTL = float(os.getenv("CHECKOUT_CACHE_TTL", "30"))
+
+# Fields returned by get_checkout (besides the optional available* lists)
+CHECKOUT_SNAPSHOT_FIELDS = (
+    "checkoutId",
+    "completed",
+    "total",
+    "subtotal",
+    "shippingFee",
+    "discount",
+    "couponDiscount",
+    "customer",
+    "products",
+    "selectedAddress",
+    "selectedShipping",
+    "selectedPaymentMethod",
+    "coupon"
+)
+
+# Product fields returned by get_checkout; products from other responses are cached with these only
+CHECKOUT_PRODUCT_FIELDS = (
+    "productId",
+    "productVariantId",
+    "name",
+    "sku",
+    "quantity",
+    "price",
+    "listPrice",
+    "totalPrice",
+    "imageUrl",
+    "brand",
+    "category",
+    "gift",
+    "productAttributes"
+)
+
+
+def normalize_products(products: Any) -> Optional[List[Dict[str, Any]]]:
+    """
+    Reduce a products list to the shape returned by get_checkout
+    
+    Returns:
+        The products with only the get_checkout fields, or None if any product
+        lacks one of them (e.g. createCheckout returns fewer fields)
+    """
+    if not isinstance(products, list):
+        return None
+    if not all(isinstance(product, dict) and all(field in product for field in CHECKOUT_PRODUCT_FIELDS)
+               for product in products):
+        return None
+    return [{field: product[field] for field in CHECKOUT_PRODUCT_FIELDS} for product in products]
+
+
+class CheckoutCache:
+    """Per-checkout snapshot cache with field-level merging and a short TTL"""
+    
+    def __init__(self, ttl: float = CHECKOUT_CACHE_TTL, max_checkouts: int = 500):
+        self.ttl = ttl
+        self.max_checkouts = max_checkouts
+        # checkout_id -> field -> (value, stored_at)
+        self._entries: Dict[str, Dict[str, Tuple[Any, float]]] = {}
+    
+    def merge(
+        self,
+        checkout_data: Optional[Dict[str, Any]],
+        invalidate: Iterable[str] = (),
+        invalidate_if_set: Iterable[str] = (),
+        defaults: Optional[Dict[str, Any]] = None
+    ) -> None:
+        """
+        Merge a checkout snapshot into the cache
+        
+        Args:
+            checkout_data: Checkout snapshot (must contain checkoutId)
+            invalidate: Fields affected by the operation but absent from the snapshot
+            invalidate_if_set: Fields only affected when they currently hold a value
+                               (e.g. a selected payment method after a cart change)
+            defaults: Field values known without being returned (e.g. for a new checkout)
+        """
+        if not checkout_data or not checkout_data.get("checkoutId"):
+            return
+        
+        checkout_id = str(checkout_data["checkoutId"])
+        now = time.monotonic()
+        
+        # Re-insert so the dict keeps least recently written checkouts first
+        entry = self._entries.pop(checkout_id, {})
+        for field in invalidate:
+            entry.pop(field, None)
+        for field in invalidate_if_set:
+            if field in entry and entry[field][0]:
+                del entry[field]
+        if defaults:
+            for field, value in defaults.items():
+                entry[field] = (copy.deepcopy(value), now)
+        for field, value in checkout_data.items():
+            if field == "products":
+                value = normalize_products(value)
+                if value is None:
+                    # Not in the get_checkout shape: fetched live next time
+                    entry.pop(field, None)
+                    continue
+            entry[field] = (copy.deepcopy(value), now)
+        self._entries[checkout_id] = entry
+        
+        while len(self._entries) > self.max_checkouts:
+            self._entries.pop(next(iter(self._entries)))
+    
+    def _fresh_fields(self, checkout_id: str) -> Dict[str, Any]:
+        """Get the fresh fields cached for a checkout, dropping expired ones"""
+        entry = self._entries.get(str(checkout_id))
+        if not entry:
+            return {}
+        
+        cutoff = time.monotonic() - self.ttl
+        expired = [field for field, (_, stored_at) in entry.items() if stored_at < cutoff]
+        for field in expired:
+            del entry[field]
+        
+        return {field: value for field, (value, _) in entry.items()}
+    
+    def get(self, checkout_id: str, fields: Iterable[str] = CHECKOUT_SNAPSHOT_FIELDS) -> Optional[Dict[str, Any]]:
+        """
+        Get a cached checkout if every requested field is fresh
+        
+        Args:
+            checkout_id: UUID of the checkout
+            fields: Fields the caller needs
+        
+        Returns:
+            Copy of the cached fields, or None if any of them is missing or stale
+        """
+        fresh = self._fresh_fields(checkout_id)
+        wanted: List[str] = list(fields)
+        if not all(field in fresh for field in wanted):
+            return None
+        return copy.deepcopy({field: fresh[field] for field in wanted})
+    
+    def overlay(self, checkout_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Complete a partial checkout snapshot with fresh cached fields
+        
+        Args:
+            checkout_data: Checkout snapshot, usually a mutation response
+        
+        Returns:
+            Cached fields updated with the given snapshot
+        """
+        checkout_id = checkout_data.get("checkoutId")
+        if not checkout_id:
+            return checkout_data
+        
+        merged = copy.deepcopy(self._fresh_fields(checkout_id))
+        merged.update(checkout_data)
+        return merged
+    
+    def invalidate(self, checkout_id: str, fields: Optional[Iterable[str]] = None) -> None:
+        """Drop cached fields for a checkout (all of them if fields is None)"""
+        checkout_id = str(checkout_id)
+        if fields is None:
+            self._entries.pop(checkout_id, None)
+            return
+        
+        entry = self._entries.get(checkout_id)
+        if entry:
+            for field in fields:
+                entry.pop(field, None)
+    
+    def clear(self) -> None:
+        """Drop every cached checkout"""
+        self._entries.clear()
+
+
+# Singleton instance
+checkout_cache = CheckoutCache()
\ No newline at end of file
@@ -1,11 +1,114 @@
 """Checkout service for managing the checkout flow"""
+import os
+import copy
 import time
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from ..api import StorefrontAPIClient
-from ..db import SessionLocal, CustomerToken
+from ..cache import TTLCache
+from ..db import SessionLocal, CustomerToken, run_sync
 from .auth_service import AuthService
+from .checkout_cache import checkout_cache, CHECKOUT_SNAPSHOT_FIELDS
+
+
+# Checkout fields returned by the cart mutations (add, update, remove)
+CART_CHECKOUT_FIELDS = """
+                checkoutId
+                total
+                subtotal
+                shippingFee
+                discount
+                couponDiscount
+                selectedShipping {
+                    shippingQuoteId
+                    name
+                    value
+                    deadline
+                }
+                products {
+                    productId
+                    productVariantId
+                    name
+                    sku
+                    quantity
+                    price
+                    ajustedPrice
+                    listPrice
+                    totalPrice
+                    imageUrl
+                    brand
+                    category
+                    gift
+                    productAttributes {
+                        name
+                        value
+                    }
+                }
+"""
+
+# What a freshly created checkout holds besides the createCheckout response
+NEW_CHECKOUT_DEFAULTS = {
+    "completed": False,
+    "shippingFee": 0,
+    "discount": 0,
+    "couponDiscount": 0,
+    "customer": None,
+    "selectedAddress": None,
+    "selectedShipping": None,
+    "selectedPaymentMethod": None,
+    "coupon": None
+}
+
+# Cached fields a cart change makes stale without returning them
+CART_CHANGE_INVALIDATES = ("availableShippingMethods", "availablePaymentMethods")
+
+# Shipping quotes keyed by (checkout ID, destination CEP, cart fingerprint)
+SHIPPING_QUOTE_CACHE_TTL = float(os.getenv("SHIPPING_QUOTE_CACHE_TTL", "300"))
+shipping_quote_cache = TTLCache(ttl=SHIPPING_QUOTE_CACHE_TTL, max_entries=500)
+
+
+def cart_fingerprint(products: List[Dict[str, Any]]) -> tuple:
+    """Normalize cart lines into a hashable (variant ID, quantity) tuple"""
+    quantities: Dict[int, int] = {}
+    for product in products or []:
+        variant_id = int(product["productVariantId"])
+        quantities[variant_id] = quantities.get(variant_id, 0) + int(product.get("quantity") or 0)
+    return tuple(sorted(quantities.items()))
+
+
+def invalidate_shipping_quotes(checkout_id: str) -> None:
+    """Drop cached shipping quotes of a checkout after its cart or address changed"""
+    shipping_quote_cache.invalidate_where(lambda key: key[0] == str(checkout_id))
+
+
+# Customer address books keyed by customer access token
+ADDRESS_CACHE_TTL = float(os.getenv("ADDRESS_CACHE_TTL", "600"))
+address_cache = TTLCache(ttl=ADDRESS_CACHE_TTL, max_entries=100)
+
+
+def invalidate_customer_addresses(customer_token: Optional[str] = None) -> None:
+    """Drop cached address books (all of them if no token is given, e.g. after a login)"""
+    if customer_token:
+        address_cache.invalidate(customer_token)
+    else:
+        address_cache.clear()
+
+
+def to_checkout_address(address: Dict[str, Any]) -> Dict[str, Any]:
+    """Map a customer address book entry to the checkout selectedAddress shape"""
+    return {
+        "id": address.get("id"),
+        "street": address.get("street"),
+        "addressNumber": address.get("addressNumber"),
+        "complement": address.get("addressDetails"),
+        "neighborhood": address.get("neighborhood"),
+        "city": address.get("city"),
+        "state": address.get("state"),
+        "cep": address.get("cep"),
+        "receiverName": address.get("receiverName"),
+        "referencePoint": address.get("referencePoint")
+    }
 
 
 class CheckoutService:
@@ -74,10 +177,373 @@ class CheckoutService:
         result = await self.client.query(mutation, {"products": products})
         
         if result and "createCheckout" in result:
+            checkout_cache.merge(result["createCheckout"], defaults=NEW_CHECKOUT_DEFAULTS)
             return result["createCheckout"]
         else:
             raise Exception("Failed to create checkout")
     
+    async def add_products(self, checkout_id: str, products: List[Dict[str, Any]],
+                           customer_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Add products to an existing checkout
+        
+        Args:
+            checkout_id: UUID of the checkout
+            products: List of products with productVariantId and quantity
+            customer_token: Optional customer token
+        
+        Returns:
+            Updated checkout data
+        """
+        mutation = f"""
+        mutation AddToCheckout($input: CheckoutProductInput!, $customerAccessToken: String, $recaptchaToken: String) {{
+            checkoutAddProduct(input: $input, customerAccessToken: $customerAccessToken, recaptchaToken: $recaptchaToken) {{
+                {CART_CHECKOUT_FIELDS}
+            }}
+        }}
+        """
+        
+        variables = {
+            "input": {
+                "id": checkout_id,
+                "products": products
+            },
+            "recaptchaToken": None
+        }
+        if customer_token:
+            variables["customerAccessToken"] = customer_token
+        
+        result = await self.client.query(mutation, variables)
+        
+        if result and "checkoutAddProduct" in result:
+            checkout_cache.merge(
+                result["checkoutAddProduct"],
+                invalidate=CART_CHANGE_INVALIDATES,
+                invalidate_if_set=("selectedPaymentMethod",)
+            )
+            invalidate_shipping_quotes(checkout_id)
+            return result["checkoutAddProduct"]
+        else:
+            raise Exception("Failed to add product to checkout")
+    
+    async def update_product(self, checkout_id: str, product: Dict[str, Any],
+                             customer_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Update a product quantity in checkout
+        
+        Args:
+            checkout_id: UUID of the checkout
+            product: Product with productVariantId and the new quantity
+            customer_token: Optional customer token
+        
+        Returns:
+            Updated checkout data
+        """
+        mutation = f"""
+        mutation UpdateCheckoutProduct($input: CheckoutProductUpdateInput!, $customerAccessToken: String) {{
+            checkoutUpdateProduct(input: $input, customerAccessToken: $customerAccessToken) {{
+                {CART_CHECKOUT_FIELDS}
+            }}
+        }}
+        """
+        
+        variables = {
+            "input": {
+                "id": checkout_id,
+                "product": product
+            }
+        }
+        if customer_token:
+            variables["customerAccessToken"] = customer_token
+        
+        result = await self.client.query(mutation, variables)
+        
+        if result and "checkoutUpdateProduct" in result:
+            checkout_cache.merge(
+                result["checkoutUpdateProduct"],
+                invalidate=CART_CHANGE_INVALIDATES,
+                invalidate_if_set=("selectedPaymentMethod",)
+            )
+            invalidate_shipping_quotes(checkout_id)
+            return result["checkoutUpdateProduct"]
+        else:
+            raise Exception("Failed to update product in checkout")
+    
+    async def remove_products(self, checkout_id: str, products: List[Dict[str, Any]],
+                              customer_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Remove products from checkout
+        
+        Args:
+            checkout_id: UUID of the checkout
+            products: List of products with productVariantId and quantity to remove
+            customer_token: Optional customer token
+        
+        Returns:
+            Updated checkout data
+        """
+        mutation = f"""
+        mutation RemoveFromCheckout($input: CheckoutProductInput!, $customerAccessToken: String) {{
+            checkoutRemoveProduct(input: $input, customerAccessToken: $customerAccessToken) {{
+                {CART_CHECKOUT_FIELDS}
+            }}
+        }}
+        """
+        
+        variables = {
+            "input": {
+                "id": checkout_id,
+                "products": products
+            }
+        }
+        if customer_token:
+            variables["customerAccessToken"] = customer_token
+        
+        result = await self.client.query(mutation, variables)
+        
+        if result and "checkoutRemoveProduct" in result:
+            checkout_cache.merge(
+                result["checkoutRemoveProduct"],
+                invalidate=CART_CHANGE_INVALIDATES,
+                invalidate_if_set=("selectedPaymentMethod",)
+            )
+            invalidate_shipping_quotes(checkout_id)
+            return result["checkoutRemoveProduct"]
+        else:
+            raise Exception("Failed to remove product from checkout")
+    
+    async def apply_cart_changes(
+        self,
+        checkout_id: str,
+        add: Optional[Dict[int, int]] = None,
+        remove: Optional[Dict[int, Optional[int]]] = None,
+        set_quantities: Optional[Dict[int, int]] = None,
+        customer_token: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """
+        Apply many cart line changes with the fewest possible mutations
+        
+        All changes are folded into one quantity delta per variant, so the whole
+        edit costs at most one checkoutRemoveProduct and one checkoutAddProduct.
+        Both mutations act on the same cart, so they run one after the other.
+        
+        Args:
+            checkout_id: UUID of the checkout
+            add: Variant ID -> quantity to add
+            remove: Variant ID -> quantity to remove (None = remove all)
+            set_quantities: Variant ID -> final quantity (0 to remove)
+            customer_token: Optional customer token
+        
+        Returns:
+            Updated checkout data with an "applied" summary of the mutations sent.
+            If the additions fail after the removals went through, the state
+            after the removals is returned with a "failed" entry (additions and
+            error) instead of raising, since the cart was already changed.
+        """
+        add = add or {}
+        remove = remove or {}
+        set_quantities = set_quantities or {}
+        
+        conflicting = set(set_quantities) & (set(add) | set(remove))
+        if conflicting:
+            raise ValueError(
+                f"Variants {sorted(conflicting)} have a final quantity and also an add/remove"
+            )
+        
+        # Current quantities are only needed for absolute targets and "remove all"
+        current: Dict[int, int] = {}
+        if set_quantities or any(quantity is None for quantity in remove.values()):
+            current = await self.get_line_quantities(checkout_id, customer_token)
+        
+        deltas: Dict[int, int] = {}
+        for variant_id, quantity in add.items():
+            deltas[variant_id] = deltas.get(variant_id, 0) + quantity
+        for variant_id, quantity in remove.items():
+            if quantity is None:
+                quantity = current.get(variant_id, 0)
+            deltas[variant_id] = deltas.get(variant_id, 0) - quantity
+        for variant_id, quantity in set_quantities.items():
+            deltas[variant_id] = quantity - current.get(variant_id, 0)
+        
+        to_remove = [
+            {"productVariantId": variant_id, "quantity": -delta}
+            for variant_id, delta in deltas.items() if delta < 0
+        ]
+        to_add = [
+            {"productVariantId": variant_id, "quantity": delta}
+            for variant_id, delta in deltas.items() if delta > 0
+        ]
+        
+        result = None
+        failed = None
+        if to_remove:
+            result = await self.remove_products(checkout_id, to_remove, customer_token)
+        if to_add:
+            try:
+                result = await self.add_products(checkout_id, to_add, customer_token)
+            except Exception as e:
+                if result is None:
+                    # Nothing was changed yet
+                    raise
+                # The removals already went through: report them with the failed additions
+                failed = {"added": to_add, "error": str(e)}
+                to_add = []
+        if result is None:
+            # Nothing to change, answer with the current state
+            result = await self.get_checkout(checkout_id, customer_token=customer_token)
+        
+        result = dict(result)
+        result["applied"] = {
+            "added": to_add,
+            "removed": to_remove,
+            "mutations": int(bool(to_add)) + int(bool(to_remove))
+        }
+        if failed:
+            result["failed"] = failed
+        return result
+    
+    async def get_line_quantities(self, checkout_id: str, customer_token: Optional[str] = None) -> Dict[int, int]:
+        """
+        Get the quantity of each variant in the cart (served from the checkout cache when fresh)
+        
+        Returns:
+            Variant ID -> quantity in the cart
+        """
+        checkout = await self.get_checkout(checkout_id, customer_token=customer_token)
+        quantities: Dict[int, int] = {}
+        for product in checkout.get("products") or []:
+            variant_id = int(product["productVariantId"])
+            quantities[variant_id] = quantities.get(variant_id, 0) + int(product.get("quantity") or 0)
+        return quantities
+    
+    async def get_checkout(self, checkout_id: str, include_available_shipping: bool = False,
+                           include_available_payments: bool = False,
+                           customer_token: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Get detailed checkout information, served from the checkout cache when fresh
+        
+        Args:
+            checkout_id: UUID of the checkout
+            include_available_shipping: Include shipping options
+            include_available_payments: Include payment methods
+            customer_token: Optional customer token
+        
+        Returns:
+            Checkout data
+        """
+        fields = list(CHECKOUT_SNAPSHOT_FIELDS)
+        if include_available_shipping:
+            fields.append("availableShippingMethods")
+        if include_available_payments:
+            fields.append("availablePaymentMethods")
+        
+        cached = checkout_cache.get(checkout_id, fields)
+        if cached is not None:
+            return cached
+        
+        # Build query based on requested includes
+        shipping_fragment = """
+            availableShippingMethods {
+                shippingQuoteId
+                name
+                type
+                value
+                deadline
+                shippingMethodId
+                distributionCenterName
+            }
+        """ if include_available_shipping else ""
+        
+        payment_fragment = """
+            availablePaymentMethods {
+                paymentMethodId
+                name
+                installments {
+                    installmentNumber
+                    value
+                    total
+                    fees
+                }
+            }
+        """ if include_available_payments else ""
+        
+        query = f"""
+        query GetCheckout($checkoutId: String!, $customerAccessToken: String) {{
+            checkout(checkoutId: $checkoutId, customerAccessToken: $customerAccessToken) {{
+                checkoutId
+                completed
+                total
+                subtotal
+                shippingFee
+                discount
+                couponDiscount
+                customer {{
+                    customerId
+                    customerName
+                    email
+                }}
+                products {{
+                    productId
+                    productVariantId
+                    name
+                    sku
+                    quantity
+                    price
+                    listPrice
+                    totalPrice
+                    imageUrl
+                    brand
+                    category
+                    gift
+                    productAttributes {{
+                        name
+                        value
+                    }}
+                }}
+                selectedAddress {{
+                    id
+                    street
+                    addressNumber
+                    complement
+                    neighborhood
+                    city
+                    state
+                    cep
+                    receiverName
+                    referencePoint
+                }}
+                selectedShipping {{
+                    shippingQuoteId
+                    name
+                    value
+                    deadline
+                }}
+                selectedPaymentMethod {{
+                    paymentMethodId
+                    name
+                    installments
+                }}
+                coupon
+                {shipping_fragment}
+                {payment_fragment}
+            }}
+        }}
+        """
+        
+        variables = {
+            "checkoutId": checkout_id
+        }
+        if customer_token:
+            variables["customerAccessToken"] = customer_token
+        
+        result = await self.client.query(query, variables)
+        
+        if result and "checkout" in result:
+            checkout_cache.merge(result["checkout"])
+            return result["checkout"]
+        else:
+            raise Exception("Failed to get checkout")
+    
     async def associate_customer(self, checkout_id: str, customer_token: Optional[str] = None) -> Dict[str, Any]:
         """
         Associate customer to checkout
@@ -90,7 +556,7 @@ class CheckoutService:
             Updated checkout data
         """
         if not customer_token:
-            customer_token = self.get_customer_token()
+            customer_token = await run_sync(self.get_customer_token)
             
         mutation = """
         mutation AssociateCustomer($customerAccessToken: String!, $checkoutId: Uuid!) {
@@ -133,22 +599,39 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutCustomerAssociate" in result:
-            return result["checkoutCustomerAssociate"]
+            checkout = result["checkoutCustomerAssociate"]
+            # The products here only carry variant and quantity, keep the cached ones
+            checkout_cache.merge(
+                {k: v for k, v in checkout.items() if k != "products"},
+                invalidate=("shippingFee", "availableShippingMethods", "availablePaymentMethods")
+            )
+            # Customer-specific shipping rules may change the quotes
+            invalidate_shipping_quotes(checkout_id)
+            return checkout
         else:
             raise Exception("Failed to associate customer")
     
-    async def list_customer_addresses(self, customer_token: Optional[str] = None) -> List[Dict[str, Any]]:
+    async def list_customer_addresses(self, customer_token: Optional[str] = None,
+                                      refresh: bool = False) -> List[Dict[str, Any]]:
         """
-        List customer saved addresses
+        List customer saved addresses, served from the address cache when possible
         
         Args:
             customer_token: Optional customer token (will get from DB if not provided)
+            refresh: Ignore the cached address book and query it again
             
         Returns:
             List of customer addresses
         """
         if not customer_token:
-            customer_token = self.get_customer_token()
+            customer_token = await run_sync(self.get_customer_token)
+            
+        if refresh:
+            invalidate_customer_addresses(customer_token)
+        else:
+            cached = address_cache.get(customer_token)
+            if cached is not None:
+                return copy.deepcopy(cached)
             
         query = """
         query GetCustomerAddresses($customerAccessToken: String!) {
@@ -173,7 +656,9 @@ class CheckoutService:
         result = await self.client.query(query, {"customerAccessToken": customer_token})
         
         if result and "customer" in result and "addresses" in result["customer"]:
-            return result["customer"]["addresses"]
+            addresses = result["customer"]["addresses"] or []
+            address_cache.set(customer_token, copy.deepcopy(addresses))
+            return addresses
         else:
             return []
     
@@ -191,7 +676,7 @@ class CheckoutService:
             Updated checkout data
         """
         if not customer_token:
-            customer_token = self.get_customer_token()
+            customer_token = await run_sync(self.get_customer_token)
             
         mutation = """
         mutation SetAddress($customerAccessToken: String!, $addressId: ID!, $checkoutId: Uuid!) {
@@ -217,13 +702,44 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutAddressAssociate" in result:
+            checkout = dict(result["checkoutAddressAssociate"])
+            
+            # Write the selected address through from the address book when we have it
+            addresses = address_cache.get(customer_token) or []
+            selected = next((a for a in addresses if str(a.get("id")) == str(address_id)), None)
+            if selected is not None:
+                checkout["selectedAddress"] = to_checkout_address(selected)
+            
+            checkout_cache.merge(
+                checkout,
+                invalidate=("selectedAddress", "selectedShipping", "shippingFee", "total",
+                            "availableShippingMethods", "availablePaymentMethods")
+            )
+            invalidate_shipping_quotes(checkout_id)
             return result["checkoutAddressAssociate"]
         else:
             raise Exception("Failed to set address")
     
+    def _shipping_quote_key(self, checkout_id: str) -> Optional[tuple]:
+        """
+        Build the shipping quote cache key from the cached checkout state
+        
+        Returns:
+            (checkout ID, CEP, cart fingerprint), or None if the cart or CEP is not fresh
+        """
+        state = checkout_cache.overlay({"checkoutId": checkout_id})
+        if "products" not in state:
+            return None
+        
+        cep = state.get("cep") or (state.get("selectedAddress") or {}).get("cep")
+        if not cep:
+            return None
+        
+        return (str(checkout_id), str(cep), cart_fingerprint(state["products"]))
+    
     async def get_shipping_quotes(self, checkout_id: str) -> List[Dict[str, Any]]:
         """
-        Get available shipping quotes
+        Get available shipping quotes, reusing recent quotes for the same CEP and cart
         
         Args:
             checkout_id: UUID of the checkout
@@ -231,6 +747,12 @@ class CheckoutService:
         Returns:
             List of shipping options
         """
+        key = self._shipping_quote_key(checkout_id)
+        if key is not None:
+            cached = shipping_quote_cache.get(key)
+            if cached is not None:
+                return copy.deepcopy(cached)
+        
         query = """
         query GetShippingQuotes($checkoutId: Uuid!) {
             shippingQuotes(checkoutId: $checkoutId, useSelectedAddress: true) {
@@ -246,6 +768,9 @@ class CheckoutService:
         result = await self.client.query(query, {"checkoutId": checkout_id})
         
         if result and "shippingQuotes" in result:
+            key = key or self._shipping_quote_key(checkout_id)
+            if key is not None and result["shippingQuotes"]:
+                shipping_quote_cache.set(key, copy.deepcopy(result["shippingQuotes"]))
             return result["shippingQuotes"]
         else:
             return []
@@ -286,6 +811,11 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutSelectShippingQuote" in result:
+            checkout_cache.merge(
+                result["checkoutSelectShippingQuote"],
+                invalidate=("selectedShipping", "availablePaymentMethods"),
+                invalidate_if_set=("selectedPaymentMethod",)
+            )
             return result["checkoutSelectShippingQuote"]
         else:
             raise Exception("Failed to select shipping")
@@ -317,6 +847,7 @@ class CheckoutService:
         result = await self.client.query(query, {"checkoutId": checkout_id})
         
         if result and "checkout" in result:
+            checkout_cache.merge(result["checkout"])
             return result["checkout"]
         else:
             return {}
@@ -333,7 +864,7 @@ class CheckoutService:
         """
         # Get customer email from token
         try:
-            customer_token = self.get_customer_token()
+            customer_token = await run_sync(self.get_customer_token)
         except Exception as e:
             raise Exception(f"Erro ao obter token do cliente: {str(e)}")
         
@@ -443,6 +974,10 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutSelectPaymentMethod" in result:
+            checkout_cache.merge(
+                result["checkoutSelectPaymentMethod"],
+                invalidate=("selectedPaymentMethod",)
+            )
             return result["checkoutSelectPaymentMethod"]
         else:
             raise Exception("Failed to select payment method")
@@ -488,7 +1023,13 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutSelectInstallment" in result:
-            return result["checkoutSelectInstallment"]
+            checkout = result["checkoutSelectInstallment"]
+            # Only the selected installment comes back, not the whole payment method
+            checkout_cache.merge(
+                {k: v for k, v in checkout.items() if k != "selectedPaymentMethod"},
+                invalidate=("selectedPaymentMethod",)
+            )
+            return checkout
         else:
             raise Exception("Failed to select installment")
     
@@ -506,7 +1047,7 @@ class CheckoutService:
             Updated checkout data
         """
         if not customer_token:
-            customer_token = self.get_customer_token()
+            customer_token = await run_sync(self.get_customer_token)
             
         mutation = """
         mutation ApplyCoupon($checkoutId: Uuid!, $coupon: String!, $customerAccessToken: String) {
@@ -532,6 +1073,14 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutAddCoupon" in result:
+            checkout_cache.merge(
+                result["checkoutAddCoupon"],
+                invalidate=("couponDiscount", "discount", "shippingFee", "products",
+                            "availablePaymentMethods"),
+                invalidate_if_set=("selectedPaymentMethod",)
+            )
+            # A free shipping coupon changes the quoted prices
+            invalidate_shipping_quotes(checkout_id)
             return result["checkoutAddCoupon"]
         else:
             raise Exception("Failed to apply coupon")
@@ -568,6 +1117,13 @@ class CheckoutService:
         result = await self.client.query(mutation, variables)
         
         if result and "checkoutRemoveCoupon" in result:
+            checkout_cache.merge(
+                result["checkoutRemoveCoupon"],
+                invalidate=("coupon", "couponDiscount", "discount", "shippingFee", "products",
+                            "availablePaymentMethods"),
+                invalidate_if_set=("selectedPaymentMethod",)
+            )
+            invalidate_shipping_quotes(checkout_id)
             return result["checkoutRemoveCoupon"]
         else:
             raise Exception("Failed to remove coupon")
@@ -637,6 +1193,7 @@ class CheckoutService:
         
         if result and "checkoutComplete" in result:
             checkout_data = result["checkoutComplete"]
+            checkout_cache.merge(checkout_data)
             
             # Add payment link to the response
             checkout_data["paymentLink"] = f"https://www.camys.com.br/checkout/confirmation?checkoutId={checkout_id}"
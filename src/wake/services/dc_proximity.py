@@ -0,0 +1,184 @@
+"""
+Distribution center proximity by CEP
+
+Ranks distribution centers for every 3-digit CEP prefix (the CEP sub-region)
+once, so "which center can serve this CEP for these SKUs" is answered from
+the local stock tables without a shipping quote call. Proximity is estimated
+from the CEP numbering: centers sharing more leading digits with the CEP come
+first, then the numerically closest ones.
+"""
+
+import os
+import re
+import time
+from typing import Dict, Any, List, Optional, Tuple
+
+from ..db import SessionLocal, DistributionCenter, ProductVariant, VariantStock
+from .availability import SELLABLE_STOCK
+
+# Seconds before the distribution center ranking is reloaded from the database
+DC_PROXIMITY_TTL = float(os.getenv("DC_PROXIMITY_TTL", "3600"))
+
+# Digits of the CEP used as index key (3 = sub-region)
+CEP_PREFIX_LENGTH = 3
+
+
+def normalize_cep(cep: Any) -> Optional[str]:
+    """
+    Normalize a CEP to 8 digits
+    
+    Accepts "01310-100", "01310100" or 1310100 (CEPs stored as integers lose the
+    leading zero). Returns None if it is not a valid CEP.
+    """
+    digits = re.sub(r"\D", "", str(cep or ""))
+    if not digits or len(digits) > 8:
+        return None
+    return digits.zfill(8)
+
+
+def _common_prefix_length(a: str, b: str) -> int:
+    length = 0
+    for x, y in zip(a, b):
+        if x != y:
+            break
+        length += 1
+    return length
+
+
+class DCProximityIndex:
+    """Distribution centers ranked by proximity for each CEP prefix"""
+    
+    def __init__(self, ttl: float = DC_PROXIMITY_TTL):
+        self.ttl = ttl
+        self._centers: Dict[int, Dict[str, Any]] = {}
+        self._by_prefix: Dict[str, Tuple[int, ...]] = {}
+        self._loaded_at: Optional[float] = None
+    
+    def refresh(self) -> int:
+        """
+        Reload distribution centers and rebuild the ranking for every CEP prefix
+        
+        Returns:
+            Number of distribution centers indexed
+        """
+        with SessionLocal() as db:
+            centers = {
+                dc.id: {
+                    "id": dc.id,
+                    "name": dc.name,
+                    "cep": normalize_cep(dc.zip_code),
+                    "is_default": dc.is_default
+                }
+                for dc in db.query(DistributionCenter).all()
+            }
+        
+        by_prefix = {}
+        for number in range(10 ** CEP_PREFIX_LENGTH):
+            prefix = str(number).zfill(CEP_PREFIX_LENGTH)
+            # Middle of the prefix range, for the numeric distance tie-break
+            middle = int(prefix.ljust(8, "0")) + 10 ** (8 - CEP_PREFIX_LENGTH) // 2
+            
+            def rank(center: Dict[str, Any]):
+                cep = center["cep"]
+                if cep is None:
+                    return (1, 0, float("inf"), not center["is_default"], center["id"])
+                return (0, -_common_prefix_length(prefix, cep), abs(int(cep) - middle),
+                        not center["is_default"], center["id"])
+            
+            by_prefix[prefix] = tuple(center["id"] for center in sorted(centers.values(), key=rank))
+        
+        # Swap in one assignment so readers never see a half-built index
+        self._centers, self._by_prefix = centers, by_prefix
+        self._loaded_at = time.monotonic()
+        return len(centers)
+    
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup"""
+        self._loaded_at = None
+    
+    def rank(self, cep: str) -> List[Dict[str, Any]]:
+        """
+        Get the distribution centers ordered from nearest to farthest from a CEP
+        
+        Raises:
+            Exception: If the CEP is invalid
+        """
+        normalized = normalize_cep(cep)
+        if normalized is None:
+            raise Exception(f"CEP inválido: {cep}")
+        if self._loaded_at is None or time.monotonic() - self._loaded_at > self.ttl:
+            self.refresh()
+        centers = self._centers
+        return [dict(centers[dc_id]) for dc_id in self._by_prefix.get(normalized[:CEP_PREFIX_LENGTH], ())]
+    
+    def find_stock(self, cep: str, skus: List[str], quantity: int = 1) -> Dict[str, Any]:
+        """
+        Check which distribution centers can serve a CEP for the given SKUs
+        
+        Args:
+            cep: Destination CEP
+            skus: SKUs wanted
+            quantity: Units needed of each SKU
+        
+        Returns:
+            Dictionary with:
+            - cep: Normalized CEP
+            - best_distribution_center: Nearest center with every SKU in stock (None if none has)
+            - distribution_centers: All centers from nearest to farthest, with stock per SKU
+              (available = physical minus reserved stock)
+            - unknown_skus: SKUs not found in the local catalog
+        """
+        centers = self.rank(cep)
+        skus = list(dict.fromkeys(sku for sku in skus if sku))
+        
+        with SessionLocal() as db:
+            known = {
+                sku for (sku,) in db.query(ProductVariant.sku).filter(ProductVariant.sku.in_(skus)).all()
+            }
+            stock_rows = db.query(
+                ProductVariant.sku,
+                VariantStock.distribution_center_id,
+                SELLABLE_STOCK,
+                VariantStock.physical_stock,
+                VariantStock.reserved_stock
+            ).join(
+                VariantStock, VariantStock.variant_id == ProductVariant.id
+            ).filter(ProductVariant.sku.in_(skus)).all()
+        
+        # (sku, distribution center) -> (available, physical, reserved)
+        stock: Dict[Tuple[str, int], Tuple[int, int, int]] = {
+            (sku, dc_id): (available, physical, reserved)
+            for sku, dc_id, available, physical, reserved in stock_rows
+        }
+        
+        best = None
+        for proximity, center in enumerate(centers, start=1):
+            center["proximity_rank"] = proximity
+            center["items"] = []
+            for sku in skus:
+                if sku not in known:
+                    continue
+                available, physical, reserved = stock.get((sku, center["id"]), (0, 0, 0))
+                center["items"].append({
+                    "sku": sku,
+                    "available": available,
+                    "physical_stock": physical,
+                    "reserved_stock": reserved,
+                    "enough": available >= quantity
+                })
+            center["can_fulfill_all"] = bool(known) and len(known) == len(skus) and all(
+                item["enough"] for item in center["items"]
+            )
+            if best is None and center["can_fulfill_all"]:
+                best = center
+        
+        return {
+            "cep": normalize_cep(cep),
+            "best_distribution_center": best,
+            "distribution_centers": centers,
+            "unknown_skus": [sku for sku in skus if sku not in known]
+        }
+
+
+# Singleton instance
+dc_proximity_index = DCProximityIndex()
\ No newline at end of file
@@ -0,0 +1,334 @@
+"""
+Faceted product filtering over the local database
+
+Every variant gets a position in a fixed order (most stock first, then variant
+ID, as in product search). Each attribute value, category, price bucket and
+the in-stock flag keeps a bitset of positions (a Python int), so filters are
+intersections and facet counts are popcounts. A query returns the matching
+variants and the counts for every facet in one pass.
+"""
+
+import os
+from collections import defaultdict
+from typing import Dict, Any, List, Optional, Tuple, Union
+from sqlalchemy import select, func, union
+
+from ..db import (
+    SessionLocal,
+    Product,
+    ProductVariant,
+    VariantPricing,
+    VariantStock,
+    VariantAttribute,
+    Category,
+    CategoryClosure,
+    product_categories
+)
+from ..sync_version import VersionedIndex, add_completion_listener, get_sync_version
+
+# Seconds between checks of SyncState for a newer completed sync
+FACET_INDEX_VERSION_CHECK = float(os.getenv("FACET_INDEX_VERSION_CHECK", "5"))
+
+# Upper bounds (exclusive) of the price buckets; the last bucket is open-ended
+PRICE_BUCKETS = [50, 100, 200, 500, 1000]
+
+
+def price_bucket_label(index: int) -> str:
+    """Label of a price bucket, e.g. "50-100" or "1000+" """
+    lower = PRICE_BUCKETS[index - 1] if index > 0 else 0
+    if index == len(PRICE_BUCKETS):
+        return f"{lower}+"
+    return f"{lower}-{PRICE_BUCKETS[index]}"
+
+
+def _positions(bits: int, limit: Optional[int] = None):
+    """Yield set bit positions from lowest to highest"""
+    count = 0
+    while bits and (limit is None or count < limit):
+        low = bits & -bits
+        yield low.bit_length() - 1
+        bits ^= low
+        count += 1
+
+
+class FacetVariant:
+    """A variant as held in the facet index"""
+    
+    __slots__ = ("variant_id", "product_id", "sku", "name", "parent_name", "manufacturer",
+                 "price", "stock", "attributes", "search_text")
+    
+    def __init__(self, variant_id: int, product_id: int, sku: str, name: str,
+                 parent_name: Optional[str], manufacturer: Optional[str],
+                 price: Optional[float], stock: int):
+        self.variant_id = variant_id
+        self.product_id = product_id
+        self.sku = sku
+        self.name = name
+        self.parent_name = parent_name
+        self.manufacturer = manufacturer
+        self.price = price
+        self.stock = stock
+        self.attributes: Dict[str, str] = {}
+        self.search_text = "\x00".join(
+            (value or "").lower() for value in (name, sku, parent_name, manufacturer)
+        )
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "product_id": self.product_id,
+            "variant_id": self.variant_id,
+            "sku": self.sku,
+            "name": self.name,
+            "parent_name": self.parent_name,
+            "manufacturer": self.manufacturer,
+            "price": self.price,
+            "stock_available": self.stock,
+            "attributes": dict(self.attributes)
+        }
+
+
+class FacetIndex:
+    """Posting bitsets per attribute value, category, price bucket and stock"""
+    
+    def __init__(self, variants: List[FacetVariant], categories: Dict[int, str],
+                 memberships: List[Tuple[int, int]], version: Optional[str]):
+        self.version = version
+        # Position order matches product search: most stock first, then variant ID
+        self.variants = sorted(variants, key=lambda v: (-v.stock, v.variant_id))
+        self.all_bits = (1 << len(self.variants)) - 1
+        self.in_stock = 0
+        
+        # attribute name (lowercase) -> value (lowercase) -> bitset
+        self.attributes: Dict[str, Dict[str, int]] = defaultdict(lambda: defaultdict(int))
+        # lowercase -> name as stored, for attribute names and values
+        self.labels: Dict[str, str] = {}
+        self.price_buckets = [0] * (len(PRICE_BUCKETS) + 1)
+        self.categories: Dict[int, int] = defaultdict(int)
+        self.category_names = categories
+        
+        by_product: Dict[int, int] = defaultdict(int)
+        for position, variant in enumerate(self.variants):
+            bit = 1 << position
+            by_product[variant.product_id] |= bit
+            if variant.stock > 0:
+                self.in_stock |= bit
+            if variant.price is not None:
+                self.price_buckets[self._bucket(variant.price)] |= bit
+            for name, value in variant.attributes.items():
+                self.attributes[name.lower()][value.lower()] |= bit
+                self.labels.setdefault(name.lower(), name)
+                self.labels.setdefault(value.lower(), value)
+        
+        for product_id, category_id in memberships:
+            self.categories[category_id] |= by_product.get(product_id, 0)
+    
+    @staticmethod
+    def _bucket(price: float) -> int:
+        for index, upper in enumerate(PRICE_BUCKETS):
+            if price < upper:
+                return index
+        return len(PRICE_BUCKETS)
+    
+    def _text_bits(self, query: str) -> int:
+        needle = query.lower()
+        bits = 0
+        for position, variant in enumerate(self.variants):
+            if needle in variant.search_text:
+                bits |= 1 << position
+        return bits
+    
+    def _price_bits(self, min_price: Optional[float], max_price: Optional[float]) -> int:
+        """Whole buckets inside the range, plus the matching variants of the edge buckets"""
+        low = min_price if min_price is not None else float("-inf")
+        high = max_price if max_price is not None else float("inf")
+        bits = 0
+        for index, bucket in enumerate(self.price_buckets):
+            bucket_low = PRICE_BUCKETS[index - 1] if index > 0 else float("-inf")
+            bucket_high = PRICE_BUCKETS[index] if index < len(PRICE_BUCKETS) else float("inf")
+            if bucket_high <= low or bucket_low > high:
+                continue
+            if low <= bucket_low and bucket_high <= high:
+                bits |= bucket
+                continue
+            for position in _positions(bucket):
+                if low <= self.variants[position].price <= high:
+                    bits |= 1 << position
+        return bits
+    
+    def _category_bits(self, category: Union[int, str]) -> int:
+        """Variants in a category (or its subcategories) given by ID or (case-insensitive) name"""
+        if isinstance(category, int) or str(category).isdigit():
+            return self.categories.get(int(category), 0)
+        name = str(category).lower()
+        bits = 0
+        for category_id, category_name in self.category_names.items():
+            if category_name.lower() == name:
+                bits |= self.categories.get(category_id, 0)
+        return bits
+    
+    def search(
+        self,
+        query: Optional[str] = None,
+        attributes: Optional[Dict[str, Union[str, List[str]]]] = None,
+        category: Optional[Union[int, str]] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        include_out_of_stock: bool = False,
+        limit: int = 20
+    ) -> Dict[str, Any]:
+        """
+        Filter variants and count facets in one pass
+        
+        Values of the same attribute are alternatives (OR); different filters
+        must all match (AND). Each facet is counted with every filter applied
+        except its own, so the counts show what choosing another value yields.
+        
+        Args:
+            query: Text matched against name, SKU, parent name and manufacturer
+            attributes: Attribute name -> value or list of values (case-insensitive)
+            category: Category ID or name (includes its subcategories)
+            min_price: Minimum price (inclusive)
+            max_price: Maximum price (inclusive)
+            include_out_of_stock: Include variants with no stock
+            limit: Maximum number of variants to return
+        
+        Returns:
+            Dictionary with total, variants and facets (attributes, categories, price)
+        """
+        # Filter name -> bitset; facets are counted against all filters but their own
+        filters: Dict[str, int] = {}
+        if query:
+            filters["query"] = self._text_bits(query)
+        if not include_out_of_stock:
+            filters["stock"] = self.in_stock
+        if min_price is not None or max_price is not None:
+            filters["price"] = self._price_bits(min_price, max_price)
+        if category is not None and category != "":
+            filters["category"] = self._category_bits(category)
+        for name, values in (attributes or {}).items():
+            if isinstance(values, str):
+                values = [values]
+            postings = self.attributes.get(name.lower(), {})
+            bits = 0
+            for value in values:
+                bits |= postings.get(str(value).lower(), 0)
+            filters[f"attribute:{name.lower()}"] = bits
+        
+        def matching(excluded: Optional[str] = None) -> int:
+            bits = self.all_bits
+            for name, filter_bits in filters.items():
+                if name != excluded:
+                    bits &= filter_bits
+            return bits
+        
+        result = matching()
+        
+        attribute_facets = {}
+        for name, postings in self.attributes.items():
+            base = matching(f"attribute:{name}")
+            counts = {
+                self.labels[value]: (base & bits).bit_count()
+                for value, bits in postings.items()
+            }
+            counts = {value: count for value, count in counts.items() if count}
+            if counts:
+                attribute_facets[self.labels[name]] = dict(sorted(counts.items(), key=lambda item: -item[1]))
+        
+        base = matching("category")
+        category_facets = sorted(
+            (
+                {"id": category_id, "name": self.category_names.get(category_id), "count": (base & bits).bit_count()}
+                for category_id, bits in self.categories.items()
+            ),
+            key=lambda facet: -facet["count"]
+        )
+        
+        base = matching("price")
+        price_facets = {
+            price_bucket_label(index): (base & bits).bit_count()
+            for index, bits in enumerate(self.price_buckets)
+        }
+        
+        return {
+            "total": result.bit_count(),
+            "variants": [self.variants[position].to_dict() for position in _positions(result, limit)],
+            "facets": {
+                "attributes": attribute_facets,
+                "categories": [facet for facet in category_facets if facet["count"]],
+                "price": {label: count for label, count in price_facets.items() if count}
+            }
+        }
+
+
+def build_facet_index() -> FacetIndex:
+    """Load variants, attributes and category memberships into a new index"""
+    version = get_sync_version()
+    
+    with SessionLocal() as db:
+        stock_totals = select(
+            VariantStock.variant_id,
+            func.sum(VariantStock.physical_stock).label("total")
+        ).group_by(VariantStock.variant_id).subquery()
+        
+        variants: Dict[int, FacetVariant] = {}
+        for row in db.execute(select(
+            ProductVariant.id,
+            ProductVariant.product_id,
+            ProductVariant.sku,
+            ProductVariant.name,
+            Product.parent_name,
+            Product.manufacturer,
+            func.coalesce(VariantPricing.sale_price, VariantPricing.original_price),
+            func.coalesce(stock_totals.c.total, 0)
+        ).join(
+            Product, Product.id == ProductVariant.product_id
+        ).outerjoin(
+            VariantPricing, VariantPricing.variant_id == ProductVariant.id
+        ).outerjoin(
+            stock_totals, stock_totals.c.variant_id == ProductVariant.id
+        )):
+            variants[row[0]] = FacetVariant(*row)
+        
+        for variant_id, name, value in db.execute(select(
+            VariantAttribute.variant_id, VariantAttribute.name, VariantAttribute.value
+        ).order_by(VariantAttribute.id)):
+            if variant_id in variants:
+                variants[variant_id].attributes[name] = value
+        
+        categories = dict(db.execute(select(Category.id, Category.name)).all())
+        # Products count towards their categories and every ancestor of them
+        direct = select(product_categories.c.product_id, product_categories.c.category_id)
+        inherited = select(product_categories.c.product_id, CategoryClosure.ancestor_id).join(
+            CategoryClosure, CategoryClosure.descendant_id == product_categories.c.category_id
+        )
+        memberships = db.execute(union(direct, inherited)).all()
+    
+    return FacetIndex(list(variants.values()), categories, memberships, version)
+
+
+class FacetIndexManager:
+    """Keeps the facet index and rebuilds it after completed syncs"""
+    
+    def __init__(self, version_check_interval: float = FACET_INDEX_VERSION_CHECK):
+        self._index = VersionedIndex(build_facet_index, version_check_interval)
+    
+    def invalidate(self) -> None:
+        """Check for a newer sync on the next lookup"""
+        self._index.invalidate()
+    
+    def get(self) -> FacetIndex:
+        """Get the index, building it or checking the sync version when due (blocking)"""
+        if self._index.current is None or self._index.is_due():
+            self._index.refresh()
+        return self._index.current
+    
+    def search(self, *args, **kwargs) -> Dict[str, Any]:
+        """Run FacetIndex.search on the current index"""
+        return self.get().search(*args, **kwargs)
+
+
+# Singleton instance
+facet_index = FacetIndexManager()
+
+# A sync finishing in this process is picked up on the next lookup
+add_completion_listener(lambda sync_type: facet_index.invalidate())
\ No newline at end of file
@@ -0,0 +1,328 @@
+"""
+Product search over the local database
+
+The search and detail lookups are Core statements built once with bound
+parameters and reused on every call, so SQLAlchemy serves them from its
+compiled cache and SQLite from its prepared statement cache. Details for a
+page of results are fetched with one IN query per table instead of one query
+per variant.
+"""
+
+from typing import Dict, Any, List, Tuple
+from sqlalchemy import select, bindparam, or_, func
+from sqlalchemy.sql import Select
+
+from ..db import (
+    SessionLocal,
+    Product,
+    ProductVariant,
+    VariantPricing,
+    VariantStock,
+    DistributionCenter,
+    VariantAttribute,
+    ProductInfo,
+    ProductRelation
+)
+
+# (numeric query, in-stock only) -> search statement
+_search_statements: Dict[Tuple[bool, bool], Select] = {}
+
+
+def _search_statement(numeric: bool, in_stock_only: bool) -> Select:
+    """Get the search statement for a query shape, building it on first use"""
+    key = (numeric, in_stock_only)
+    if key not in _search_statements:
+        pattern = bindparam("pattern")
+        conditions = [
+            ProductVariant.name.ilike(pattern),
+            ProductVariant.sku.ilike(pattern),
+            Product.parent_name.ilike(pattern),
+            Product.manufacturer.ilike(pattern)
+        ]
+        if numeric:
+            # Numeric queries also match product and parent product IDs
+            conditions += [
+                Product.id == bindparam("query_id"),
+                Product.parent_product_id == bindparam("query_id")
+            ]
+        
+        statement = select(
+            ProductVariant.id,
+            ProductVariant.product_id,
+            ProductVariant.sku,
+            ProductVariant.name,
+            ProductVariant.ean,
+            Product.parent_name,
+            Product.manufacturer
+        ).join(
+            Product, Product.id == ProductVariant.product_id
+        ).outerjoin(
+            VariantStock, VariantStock.variant_id == ProductVariant.id
+        ).where(or_(*conditions))
+        
+        if in_stock_only:
+            statement = statement.where(VariantStock.physical_stock > 0)
+        
+        # Sort by total stock (sum of all distribution centers) in descending order
+        _search_statements[key] = statement.group_by(ProductVariant.id, Product.id).order_by(
+            func.coalesce(func.sum(VariantStock.physical_stock), 0).desc(),
+            ProductVariant.id
+        ).limit(bindparam("limit"))
+    
+    return _search_statements[key]
+
+
+_variant_ids = bindparam("variant_ids", expanding=True)
+
+PRICING_STATEMENT = select(
+    VariantPricing.variant_id,
+    VariantPricing.original_price,
+    VariantPricing.sale_price
+).where(VariantPricing.variant_id.in_(_variant_ids))
+
+STOCK_BY_DC_STATEMENT = select(
+    VariantStock.variant_id,
+    DistributionCenter.name,
+    VariantStock.physical_stock
+).join(
+    DistributionCenter, DistributionCenter.id == VariantStock.distribution_center_id
+).where(VariantStock.variant_id.in_(_variant_ids)).order_by(
+    VariantStock.variant_id, VariantStock.distribution_center_id
+)
+
+STOCK_TOTAL_STATEMENT = select(
+    VariantStock.variant_id,
+    func.sum(VariantStock.physical_stock)
+).where(VariantStock.variant_id.in_(_variant_ids)).group_by(VariantStock.variant_id)
+
+ATTRIBUTES_STATEMENT = select(
+    VariantAttribute.variant_id,
+    VariantAttribute.name,
+    VariantAttribute.value
+).where(VariantAttribute.variant_id.in_(_variant_ids)).order_by(VariantAttribute.id)
+
+PRODUCT_INFO_STATEMENT = select(
+    ProductInfo.product_id,
+    ProductInfo.info_type,
+    ProductInfo.title,
+    ProductInfo.text
+).where(ProductInfo.product_id.in_(bindparam("product_ids", expanding=True))).order_by(ProductInfo.id)
+
+VARIANTS_BY_SKU_STATEMENT = select(
+    ProductVariant.id,
+    ProductVariant.product_id,
+    ProductVariant.sku,
+    ProductVariant.name,
+    Product.parent_name,
+    Product.manufacturer
+).join(
+    Product, Product.id == ProductVariant.product_id
+).where(ProductVariant.sku.in_(bindparam("skus", expanding=True)))
+
+# Related variants of a product in one indexed join (product_relations is keyed by product, then rank)
+RELATED_VARIANTS_STATEMENT = select(
+    ProductVariant.id,
+    ProductVariant.product_id,
+    ProductVariant.sku,
+    ProductVariant.name,
+    Product.parent_name,
+    Product.manufacturer,
+    VariantPricing.variant_id.label("pricing_variant_id"),
+    VariantPricing.original_price,
+    VariantPricing.sale_price,
+    select(func.coalesce(func.sum(VariantStock.physical_stock), 0)).where(
+        VariantStock.variant_id == ProductVariant.id
+    ).scalar_subquery().label("stock_available"),
+    ProductRelation.source,
+    ProductRelation.score
+).join(
+    ProductVariant, ProductVariant.id == ProductRelation.related_variant_id
+).join(
+    Product, Product.id == ProductVariant.product_id
+).outerjoin(
+    VariantPricing, VariantPricing.variant_id == ProductVariant.id
+).where(
+    ProductRelation.product_id == bindparam("product_id")
+).order_by(ProductRelation.rank).limit(bindparam("limit"))
+
+
+def _attributes_by_variant(db, variant_ids: List[int]) -> Dict[int, Dict[str, str]]:
+    """Attributes (name -> value) of each variant"""
+    attributes: Dict[int, Dict[str, str]] = {variant_id: {} for variant_id in variant_ids}
+    for variant_id, name, value in db.execute(ATTRIBUTES_STATEMENT, {"variant_ids": variant_ids}):
+        attributes[variant_id][name] = value
+    return attributes
+
+
+def _pricing_by_variant(db, variant_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    """Original and sale price of each variant that has pricing"""
+    return {
+        variant_id: {"original_price": original_price, "sale_price": sale_price}
+        for variant_id, original_price, sale_price in db.execute(PRICING_STATEMENT, {"variant_ids": variant_ids})
+    }
+
+
+def search_variants(
+    query: str,
+    limit: int = 10,
+    include_pricing: bool = True,
+    include_out_of_stock: bool = False
+) -> List[Dict[str, Any]]:
+    """
+    Search variants by name, SKU, parent name, manufacturer or product ID
+    
+    Args:
+        query: Search query
+        limit: Maximum number of results
+        include_pricing: Include pricing information
+        include_out_of_stock: Include variants with no stock
+    
+    Returns:
+        Matching variants ordered by total stock, with stock, attributes and product info
+    """
+    params: Dict[str, Any] = {"pattern": f"%{query}%", "limit": limit}
+    try:
+        params["query_id"] = int(query)
+    except ValueError:
+        pass
+    statement = _search_statement("query_id" in params, not include_out_of_stock)
+    
+    with SessionLocal() as db:
+        rows = db.execute(statement, params).all()
+        if not rows:
+            return []
+        
+        variant_ids = [row.id for row in rows]
+        product_ids = list({row.product_id for row in rows})
+        
+        pricing = _pricing_by_variant(db, variant_ids) if include_pricing else {}
+        attributes = _attributes_by_variant(db, variant_ids)
+        
+        stock: Dict[int, List[Dict[str, Any]]] = {variant_id: [] for variant_id in variant_ids}
+        for variant_id, dc_name, physical_stock in db.execute(STOCK_BY_DC_STATEMENT, {"variant_ids": variant_ids}):
+            stock[variant_id].append({
+                "distribution_center": dc_name,
+                "available": physical_stock
+            })
+        
+        product_info: Dict[int, Dict[str, List[Dict[str, str]]]] = {product_id: {} for product_id in product_ids}
+        for product_id, info_type, title, text in db.execute(PRODUCT_INFO_STATEMENT, {"product_ids": product_ids}):
+            # Group by info type, but just store the text content
+            product_info[product_id].setdefault(info_type, []).append({
+                "title": title,
+                "text": text
+            })
+    
+    results = []
+    for row in rows:
+        result = {
+            "product_id": row.product_id,
+            "variant_id": row.id,
+            "sku": row.sku,
+            "name": row.name,
+            "parent_name": row.parent_name,
+            "manufacturer": row.manufacturer,
+            "ean": row.ean
+        }
+        
+        if row.id in pricing:
+            result["pricing"] = pricing[row.id]
+        
+        result["stock"] = {
+            "total_available": sum(location["available"] for location in stock[row.id]),
+            "by_location": stock[row.id]
+        }
+        result["attributes"] = attributes[row.id]
+        result["product_info"] = product_info[row.product_id]
+        
+        results.append(result)
+    
+    return results
+
+
+def load_variants_by_sku(skus: List[str]) -> List[Dict[str, Any]]:
+    """
+    Load local details of variants by SKU
+    
+    Args:
+        skus: SKUs to load (unknown SKUs are skipped)
+    
+    Returns:
+        Variants in the order of the given SKUs, with attributes, pricing and total stock
+    """
+    skus = [sku for sku in skus if sku]
+    if not skus:
+        return []
+    
+    with SessionLocal() as db:
+        rows = {row.sku: row for row in db.execute(VARIANTS_BY_SKU_STATEMENT, {"skus": skus})}
+        variant_ids = [row.id for row in rows.values()]
+        if not variant_ids:
+            return []
+        
+        attributes = _attributes_by_variant(db, variant_ids)
+        pricing = _pricing_by_variant(db, variant_ids)
+        stock_totals = dict(db.execute(STOCK_TOTAL_STATEMENT, {"variant_ids": variant_ids}).all())
+    
+    results = []
+    for sku in skus:
+        row = rows.get(sku)
+        if row is None:
+            continue
+        
+        result = {
+            "product_id": row.product_id,
+            "variant_id": row.id,
+            "sku": row.sku,
+            "name": row.name,
+            "parent_name": row.parent_name,
+            "manufacturer": row.manufacturer,
+            "attributes": attributes[row.id]
+        }
+        if row.id in pricing:
+            result["pricing"] = pricing[row.id]
+        result["stock_available"] = stock_totals.get(row.id) or 0
+        
+        results.append(result)
+    
+    return results
+
+
+def load_related_variants(product_id: int, limit: int = 10) -> List[Dict[str, Any]]:
+    """
+    Load the precomputed related variants of a product
+    
+    Args:
+        product_id: Product to get related variants for
+        limit: Maximum number of variants
+    
+    Returns:
+        Related variants, most related first, shaped like load_variants_by_sku results
+        plus relation (source "wake" or "similarity", and the similarity score).
+        Empty if the product has no synced relations.
+    """
+    with SessionLocal() as db:
+        rows = db.execute(RELATED_VARIANTS_STATEMENT, {"product_id": product_id, "limit": limit}).all()
+        if not rows:
+            return []
+        attributes = _attributes_by_variant(db, [row.id for row in rows])
+    
+    results = []
+    for row in rows:
+        result = {
+            "product_id": row.product_id,
+            "variant_id": row.id,
+            "sku": row.sku,
+            "name": row.name,
+            "parent_name": row.parent_name,
+            "manufacturer": row.manufacturer,
+            "attributes": attributes[row.id]
+        }
+        if row.pricing_variant_id is not None:
+            result["pricing"] = {"original_price": row.original_price, "sale_price": row.sale_price}
+        result["stock_available"] = row.stock_available
+        result["relation"] = {"source": row.source, "score": row.score}
+        
+        results.append(result)
+    
+    return results
\ No newline at end of file
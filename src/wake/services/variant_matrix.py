@@ -0,0 +1,188 @@
+"""
+Variant matrix of a product
+
+Groups a product's variants by the attributes that vary between them (the
+axes, e.g. Tamanho and Cor), so "which sizes and colours exist and which are
+in stock" is one lookup. The grid structure is rebuilt by ProductSync and
+stored in product_variant_matrix; stock and prices are joined in when the
+matrix is read, so they are as fresh as the last stock or price sync.
+"""
+
+import json
+from datetime import datetime
+from typing import Dict, Any, Optional
+from sqlalchemy import select, bindparam, func
+from sqlalchemy.orm import Session
+
+from ..db import (
+    SessionLocal,
+    Product,
+    ProductVariant,
+    VariantPricing,
+    VariantStock,
+    VariantAttribute,
+    ProductVariantMatrix
+)
+
+MATRIX_VARIANTS_STATEMENT = select(
+    ProductVariant.id,
+    ProductVariant.sku,
+    ProductVariant.name,
+    VariantPricing.variant_id.label("pricing_variant_id"),
+    VariantPricing.original_price,
+    VariantPricing.sale_price,
+    select(func.coalesce(func.sum(VariantStock.physical_stock), 0)).where(
+        VariantStock.variant_id == ProductVariant.id
+    ).scalar_subquery().label("stock_available")
+).outerjoin(
+    VariantPricing, VariantPricing.variant_id == ProductVariant.id
+).where(ProductVariant.id.in_(bindparam("variant_ids", expanding=True)))
+
+
+def build_variant_matrix(db: Session, product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Build the variant matrix of a product from its variants' attributes
+    
+    Attributes whose value differs between variants become axes (in order of
+    first appearance, as are their values); the others are common attributes.
+    
+    Returns:
+        Dictionary with axes, cells and common_attributes, or None if the product has no variants
+    """
+    variant_ids = db.execute(
+        select(ProductVariant.id).where(ProductVariant.product_id == product_id).order_by(ProductVariant.id)
+    ).scalars().all()
+    if not variant_ids:
+        return None
+    
+    values: Dict[str, Dict[int, str]] = {}
+    for variant_id, name, value in db.execute(
+        select(VariantAttribute.variant_id, VariantAttribute.name, VariantAttribute.value)
+        .where(VariantAttribute.variant_id.in_(variant_ids))
+        .order_by(VariantAttribute.variant_id, VariantAttribute.id)
+    ):
+        values.setdefault(name, {})[variant_id] = value
+    
+    axes = []
+    common_attributes = {}
+    for name, by_variant in values.items():
+        distinct = list(dict.fromkeys(by_variant[variant_id] for variant_id in variant_ids if variant_id in by_variant))
+        if len(distinct) == 1 and len(by_variant) == len(variant_ids):
+            common_attributes[name] = distinct[0]
+        else:
+            axes.append({"name": name, "values": distinct})
+    
+    cells = [
+        {"variant_id": variant_id, "values": [values[axis["name"]].get(variant_id) for axis in axes]}
+        for variant_id in variant_ids
+    ]
+    return {"axes": axes, "cells": cells, "common_attributes": common_attributes}
+
+
+def store_variant_matrix(db: Session, product_id: int) -> None:
+    """Rebuild and store the variant matrix of a product (the caller commits)"""
+    matrix = build_variant_matrix(db, product_id)
+    if matrix is None:
+        db.query(ProductVariantMatrix).filter_by(product_id=product_id).delete()
+        return
+    
+    db.merge(ProductVariantMatrix(
+        product_id=product_id,
+        axes=json.dumps(matrix["axes"]),
+        cells=json.dumps(matrix["cells"]),
+        common_attributes=json.dumps(matrix["common_attributes"]),
+        updated_at=datetime.utcnow()
+    ))
+
+
+def load_variant_matrix(product_id: int) -> Optional[Dict[str, Any]]:
+    """
+    Load the variant matrix of a product with current stock and prices
+    
+    Products synced before the matrix existed get it built on the fly.
+    
+    Args:
+        product_id: Product ID
+    
+    Returns:
+        Dictionary with:
+        - product_id, parent_name
+        - axes: Varying attributes with their values and the values that have stock
+        - common_attributes: Attributes shared by every variant
+        - variants: Every variant with its axis values, stock and pricing
+        - grid: Nested by axis value (e.g. grid["M"]["PRETO"]) down to the variant
+        None if the product has no variants.
+    """
+    with SessionLocal() as db:
+        row = db.get(ProductVariantMatrix, product_id)
+        if row is not None:
+            matrix = {
+                "axes": json.loads(row.axes),
+                "cells": json.loads(row.cells),
+                "common_attributes": json.loads(row.common_attributes)
+            }
+        else:
+            matrix = build_variant_matrix(db, product_id)
+        if matrix is None:
+            return None
+        
+        variant_rows = {
+            variant.id: variant
+            for variant in db.execute(
+                MATRIX_VARIANTS_STATEMENT,
+                {"variant_ids": [cell["variant_id"] for cell in matrix["cells"]]}
+            )
+        }
+        parent_name = db.execute(select(Product.parent_name).where(Product.id == product_id)).scalar()
+    
+    axes = matrix["axes"]
+    in_stock_values = [set() for _ in axes]
+    variants = []
+    grid: Dict[str, Any] = {}
+    for cell in matrix["cells"]:
+        variant = variant_rows.get(cell["variant_id"])
+        if variant is None:
+            continue
+        
+        result = {
+            "variant_id": variant.id,
+            "sku": variant.sku,
+            "name": variant.name,
+            "attributes": {axis["name"]: value for axis, value in zip(axes, cell["values"])},
+            "stock_available": variant.stock_available
+        }
+        if variant.pricing_variant_id is not None:
+            result["pricing"] = {"original_price": variant.original_price, "sale_price": variant.sale_price}
+        variants.append(result)
+        
+        if variant.stock_available > 0:
+            for position, value in enumerate(cell["values"]):
+                in_stock_values[position].add(value)
+        
+        # Variants missing a value for some axis are only listed in variants
+        if axes and None not in cell["values"]:
+            level = grid
+            for value in cell["values"][:-1]:
+                level = level.setdefault(value, {})
+            level[cell["values"][-1]] = {
+                "variant_id": variant.id,
+                "sku": variant.sku,
+                "stock_available": variant.stock_available,
+                "sale_price": variant.sale_price
+            }
+    
+    return {
+        "product_id": product_id,
+        "parent_name": parent_name,
+        "axes": [
+            {
+                "name": axis["name"],
+                "values": axis["values"],
+                "in_stock_values": [value for value in axis["values"] if value in in_stock_values[position]]
+            }
+            for position, axis in enumerate(axes)
+        ],
+        "common_attributes": matrix["common_attributes"],
+        "variants": variants,
+        "grid": grid
+    }
\ No newline at end of file
@@ -0,0 +1,53 @@
+"""
+Process-shared state backed by a local SQLite file
+
+Lets several web workers on the same host share the upstream rate limit
+budget and the HTTP response cache. Kept apart from the catalog database
+since it only holds short-lived coordination data.
+"""
+
+import os
+import sqlite3
+
+# File holding the shared rate limiter and response cache tables
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH", "./wake_shared.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS rate_limit_events (
+    grp TEXT NOT NULL,
+    ts REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_rate_limit_events_grp_ts ON rate_limit_events (grp, ts);
+CREATE TABLE IF NOT EXISTS rate_limit_blocks (
+    grp TEXT PRIMARY KEY,
+    blocked_until REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS response_cache (
+    key TEXT PRIMARY KEY,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    body BLOB NOT NULL,
+    etag TEXT NOT NULL,
+    last_modified REAL NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_response_cache_expires_at ON response_cache (expires_at);
+"""
+
+_initialized = set()
+
+
+def connect(path: str = SHARED_STATE_PATH) -> sqlite3.Connection:
+    """
+    Open a connection to the shared state file, creating the tables on first use
+    
+    Connections run in autocommit mode; callers open explicit transactions
+    (BEGIN IMMEDIATE) where they need read-modify-write atomicity.
+    """
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    if path not in _initialized:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+        _initialized.add(path)
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
\ No newline at end of file
@@ -2,7 +2,10 @@
 
 from .distribution_centers import DistributionCenterSync
 from .categories import CategorySync
+from .category_products import CategoryProductSync
 from .products import ProductSync
+from .product_resources import ProductResourceSync
+from .product_relations import ProductRelationSync
 from .prices import PriceSync
 from .stock import StockSync
 from .state_manager import SyncStateManager
@@ -10,7 +13,10 @@ from .state_manager import SyncStateManager
 __all__ = [
     "DistributionCenterSync", 
     "CategorySync", 
+    "CategoryProductSync",
     "ProductSync",
+    "ProductResourceSync",
+    "ProductRelationSync",
     "PriceSync",
     "StockSync", 
     "SyncStateManager"
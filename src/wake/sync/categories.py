@@ -2,13 +2,40 @@
 Categories sync service
 """
 
-from typing import List, Dict
+from typing import List, Dict, Optional, Any
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from wake.api import WakeAPIClient
 from wake.loaders.categories import CategoriesLoader
-from wake.db import SessionLocal, Category
+from wake.db import SessionLocal, Category, CategoryClosure, product_categories
+from .state_manager import SyncStateManager
+from .table_diff import replace_table_rows
+
+
+def build_category_closure(parents: Dict[int, Optional[int]]) -> List[Dict[str, Any]]:
+    """
+    Build the closure of the category tree
+    
+    Args:
+        parents: Category ID -> parent category ID (None or 0 for root categories)
+    
+    Returns:
+        Rows (ancestor_id, descendant_id, depth) for every category and each of its
+        ancestors, including the category itself at depth 0
+    """
+    rows = []
+    for category_id in parents:
+        ancestor_id = category_id
+        depth = 0
+        seen = set()
+        # Stop at the root, at parents missing from the tree and at cycles
+        while ancestor_id in parents and ancestor_id not in seen:
+            seen.add(ancestor_id)
+            rows.append({"ancestor_id": ancestor_id, "descendant_id": category_id, "depth": depth})
+            ancestor_id = parents[ancestor_id]
+            depth += 1
+    return rows
 
 
 class CategorySync:
@@ -17,6 +44,8 @@ class CategorySync:
     def __init__(self, api_client: WakeAPIClient = None):
         self.api_client = api_client
         self.loader = None
+        # Inserted/updated/deleted category counts of the last sync
+        self.last_changes: Dict[str, int] = {}
     
     async def sync_all(self) -> int:
         """
@@ -37,25 +66,43 @@ class CategorySync:
     
     async def _perform_sync(self) -> int:
         """Perform the actual sync operation"""
-        # Load categories from API
-        categories = await self.loader.load_categories()
+        SyncStateManager.start_sync("categories", reset=True)
         
-        # Sync to database
-        with SessionLocal() as db:
-            # Clear existing data
-            db.query(Category).delete()
+        try:
+            # Load categories from API
+            categories = await self.loader.load_categories(refresh=True)
             
-            # Insert new data
-            for cat in categories:
-                db_category = Category(
-                    id=cat["id"],
-                    parent_category_id=cat.get("categoriaPaiId"),
-                    name=cat["nome"],
-                    path=cat.get("caminhoHierarquia", ""),
-                    is_active=cat.get("ativo", True)
-                )
-                db.add(db_category)
+            rows = [
+                {
+                    "id": cat["id"],
+                    "parent_category_id": cat.get("categoriaPaiId"),
+                    "name": cat["nome"],
+                    "path": cat.get("caminhoHierarquia", ""),
+                    "is_active": cat.get("ativo", True)
+                }
+                for cat in categories
+            ]
             
-            db.commit()
+            # Precompute the hierarchy so subtree queries are a single indexed join
+            parents = {cat["id"]: cat.get("categoriaPaiId") for cat in categories}
+            closure = build_category_closure(parents)
             
+            # Apply only the differences, in one transaction, so readers never see empty tables
+            with SessionLocal() as db:
+                changes = replace_table_rows(db, Category.__table__, ["id"], rows)
+                replace_table_rows(db, CategoryClosure.__table__, ["ancestor_id", "descendant_id"], closure)
+                
+                # Drop memberships of categories that no longer exist
+                removed_ids = [key[0] for key in changes["deleted_keys"]]
+                if removed_ids:
+                    db.execute(product_categories.delete().where(product_categories.c.category_id.in_(removed_ids)))
+                
+                db.commit()
+        except Exception as e:
+            SyncStateManager.fail_sync("categories", str(e))
+            raise
+        
+        self.last_changes = {name: changes[name] for name in ("inserted", "updated", "deleted")}
+        
+        SyncStateManager.complete_sync("categories", total_synced=len(categories))
         return len(categories)
\ No newline at end of file
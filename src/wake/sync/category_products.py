@@ -0,0 +1,87 @@
+"""
+Category membership sync service
+"""
+
+from typing import List, Set, Tuple
+from sqlalchemy import select
+
+from wake.api import WakeAPIClient
+from wake.loaders.products import ProductsLoader
+from wake.db import SessionLocal, Category, Product, product_categories
+from .state_manager import SyncStateManager
+
+
+class CategoryProductSync:
+    """Service to sync which products belong to each category into product_categories"""
+    
+    def __init__(self, api_client: WakeAPIClient = None, batch_size: int = 50):
+        self.api_client = api_client
+        self.batch_size = batch_size
+        self.loader = None
+    
+    async def sync_all(self) -> int:
+        """
+        Sync the products of every active category
+        
+        Uses the /produtos category filter, so the cost is one request per page
+        of each category instead of one request per product.
+        
+        Returns:
+            Number of (product, category) memberships stored
+        """
+        # Initialize loader
+        if self.api_client:
+            self.loader = ProductsLoader(self.api_client)
+        else:
+            async with WakeAPIClient() as client:
+                self.loader = ProductsLoader(client)
+                return await self._perform_sync()
+        
+        return await self._perform_sync()
+    
+    async def _load_category_product_ids(self, category_id: int) -> Set[int]:
+        """Load the IDs of all products in a category"""
+        product_ids = set()
+        # No additional fields: only the product IDs are needed
+        async for _, products in self.loader.stream_products(
+            batch_size=self.batch_size,
+            categories=[category_id],
+            additional_fields=[]
+        ):
+            product_ids.update(p["produtoId"] for p in products if p.get("produtoId"))
+        return product_ids
+    
+    async def _perform_sync(self) -> int:
+        """Perform the actual sync operation"""
+        SyncStateManager.start_sync("product_categories", reset=True)
+        
+        try:
+            with SessionLocal() as db:
+                category_ids = db.execute(
+                    select(Category.id).where(Category.is_active == True).order_by(Category.id)
+                ).scalars().all()
+                known_products = set(db.execute(select(Product.id)).scalars().all())
+            
+            memberships: List[Tuple[int, int]] = []
+            for count, category_id in enumerate(category_ids, start=1):
+                product_ids = await self._load_category_product_ids(category_id)
+                # Only link products that exist locally (they are synced separately)
+                linked = sorted(product_ids & known_products)
+                memberships.extend((product_id, category_id) for product_id in linked)
+                SyncStateManager.update_progress("product_categories", page=count, items_synced=len(linked))
+            
+            # Replace the table in one transaction with a single executemany
+            with SessionLocal() as db:
+                db.execute(product_categories.delete())
+                if memberships:
+                    db.execute(
+                        product_categories.insert(),
+                        [{"product_id": p, "category_id": c} for p, c in memberships]
+                    )
+                db.commit()
+        except Exception as e:
+            SyncStateManager.fail_sync("product_categories", str(e))
+            raise
+        
+        SyncStateManager.complete_sync("product_categories", total_synced=len(memberships))
+        return len(memberships)
\ No newline at end of file
@@ -2,12 +2,14 @@
 Distribution centers sync service
 """
 
-from typing import List
+from typing import List, Dict
 from sqlalchemy.orm import Session
 
 from wake.api import WakeAPIClient
-from wake.loaders import StockLocationsLoader
-from wake.db import SessionLocal, DistributionCenter
+from wake.loaders import StockLocationsLoader, invalidate_reference_data
+from wake.db import SessionLocal, DistributionCenter, VariantStock
+from .state_manager import SyncStateManager
+from .table_diff import replace_table_rows
 
 
 class DistributionCenterSync:
@@ -16,6 +18,8 @@ class DistributionCenterSync:
     def __init__(self, api_client: WakeAPIClient = None):
         self.api_client = api_client
         self.loader = None
+        # Inserted/updated/deleted distribution center counts of the last sync
+        self.last_changes: Dict[str, int] = {}
     
     async def sync_all(self) -> int:
         """
@@ -36,24 +40,43 @@ class DistributionCenterSync:
     
     async def _perform_sync(self) -> int:
         """Perform the actual sync operation"""
-        # Load distribution centers from API
-        centers = await self.loader.load_distribution_centers()
+        SyncStateManager.start_sync("distribution_centers", reset=True)
         
-        # Sync to database
-        with SessionLocal() as db:
-            # Clear existing data
-            db.query(DistributionCenter).delete()
+        try:
+            # Load distribution centers from API
+            centers = await self.loader.load_distribution_centers(refresh=True)
             
-            # Insert new data
-            for center in centers:
-                db_center = DistributionCenter(
-                    id=center["id"],
-                    name=center["nome"],
-                    zip_code=center["cep"],
-                    is_default=center["padrao"]
-                )
-                db.add(db_center)
-            
-            db.commit()
+            rows = [
+                {
+                    "id": center["id"],
+                    "name": center["nome"],
+                    "zip_code": center["cep"],
+                    "is_default": center["padrao"]
+                }
+                for center in centers
+            ]
             
+            # Apply only the differences, in one transaction, so stock rows of unchanged
+            # centers are untouched and readers never see an empty table
+            with SessionLocal() as db:
+                changes = replace_table_rows(db, DistributionCenter.__table__, ["id"], rows)
+                
+                # Drop stock of centers that no longer exist
+                removed_ids = [key[0] for key in changes["deleted_keys"]]
+                if removed_ids:
+                    db.query(VariantStock).filter(
+                        VariantStock.distribution_center_id.in_(removed_ids)
+                    ).delete(synchronize_session=False)
+                
+                db.commit()
+        except Exception as e:
+            SyncStateManager.fail_sync("distribution_centers", str(e))
+            raise
+        
+        # Drop cached IDs read from the database (the API list was just refreshed)
+        invalidate_reference_data("local_distribution_centers")
+        
+        self.last_changes = {name: changes[name] for name in ("inserted", "updated", "deleted")}
+        
+        SyncStateManager.complete_sync("distribution_centers", total_synced=len(centers))
         return len(centers)
\ No newline at end of file
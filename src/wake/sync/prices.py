@@ -38,19 +38,10 @@ class PriceSync:
     
     async def _perform_sync(self, batch_size: int) -> int:
         """Perform the actual price sync"""
-        page = 1
         total_updated = 0
         
-        while True:
-            # Get products from API
-            products = await self.loader.load_products(
-                page=page,
-                quantity=batch_size
-            )
-            
-            if not products:
-                break
-            
+        # The next page is fetched while this one is written
+        async for _, products in self.loader.stream_products(batch_size=batch_size):
             # Update prices for each product
             with SessionLocal() as db:
                 for product_data in products:
@@ -75,8 +66,6 @@ class PriceSync:
                     total_updated += 1
                 
                 db.commit()
-            
-            page += 1
         
         return total_updated
     
@@ -99,20 +88,9 @@ class PriceSync:
     
     async def _sync_changes(self, changed_since: str) -> int:
         """Sync products with changes"""
-        page = 1
         total_updated = 0
         
-        while True:
-            # Get changed products
-            products = await self.loader.load_product_updates(
-                page=page,
-                quantity=50,
-                changed_since=changed_since
-            )
-            
-            if not products:
-                break
-            
+        async for _, products in self.loader.stream_product_updates(changed_since=changed_since):
             with SessionLocal() as db:
                 for product_data in products:
                     # The updates endpoint returns full product data with embedded prices
@@ -142,7 +120,5 @@ class PriceSync:
                     total_updated += 1
                 
                 db.commit()
-            
-            page += 1
         
         return total_updated
\ No newline at end of file
@@ -0,0 +1,249 @@
+"""
+Product relations sync service
+"""
+
+import math
+import heapq
+from collections import defaultdict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import select, func
+
+from wake.api import WakeAPIClient
+from wake.loaders.products import ProductsLoader
+from wake.loaders.product_resources import (
+    RELATED,
+    PRODUCT_RESOURCE_CONCURRENCY,
+    check_failures,
+    fetch_resources,
+    read_resources,
+    store_resources
+)
+from wake.db import (
+    SessionLocal,
+    ProductVariant,
+    VariantStock,
+    VariantAttribute,
+    ProductRelation,
+    product_categories
+)
+from .state_manager import SyncStateManager
+from .table_diff import replace_table_rows
+
+# Weight of a shared feature before rarity weighting, by feature kind
+FEATURE_WEIGHTS = {"category": 2.0, "attribute": 1.0}
+
+
+def similar_products(
+    features: Dict[int, Set[Tuple[Hashable, ...]]],
+    product_ids: Iterable[int],
+    limit: int = 10,
+    max_feature_products: int = 500
+) -> Dict[int, List[Tuple[int, float]]]:
+    """
+    Rank products by the categories and attribute values they share
+    
+    Each shared feature adds its kind weight divided by log(1 + products with
+    the feature), so rare features count more than common ones. Features held
+    by more than max_feature_products products say little and are skipped,
+    which also bounds the work per product.
+    
+    Args:
+        features: Product ID -> features, tuples starting with the kind
+            (("category", id), ("attribute", name, value))
+        product_ids: Products to find similar products for
+        limit: Maximum similar products per product
+        max_feature_products: Features shared by more products are ignored
+    
+    Returns:
+        Product ID -> [(similar product ID, score)], best first (products with no match are left out)
+    """
+    products_by_feature: Dict[Tuple, List[int]] = defaultdict(list)
+    for product_id, product_features in features.items():
+        for feature in product_features:
+            products_by_feature[feature].append(product_id)
+    
+    weights = {
+        feature: FEATURE_WEIGHTS[feature[0]] / math.log(1 + len(members))
+        for feature, members in products_by_feature.items()
+        if 2 <= len(members) <= max_feature_products
+    }
+    
+    similar = {}
+    for product_id in product_ids:
+        scores: Dict[int, float] = defaultdict(float)
+        for feature in features.get(product_id, ()):
+            weight = weights.get(feature)
+            if weight is None:
+                continue
+            for other in products_by_feature[feature]:
+                if other != product_id:
+                    scores[other] += weight
+        if scores:
+            best = heapq.nlargest(limit, scores.items(), key=lambda item: (item[1], -item[0]))
+            similar[product_id] = [(other, round(score, 4)) for other, score in best]
+    return similar
+
+
+class ProductRelationSync:
+    """Service to sync related products into product_relations"""
+    
+    def __init__(self, api_client: WakeAPIClient = None, batch_size: int = 50,
+                 concurrency: int = PRODUCT_RESOURCE_CONCURRENCY, limit: int = 10,
+                 max_feature_products: int = 500):
+        self.api_client = api_client
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.limit = limit
+        self.max_feature_products = max_feature_products
+        self.loader = None
+        self.last_changes: Dict[str, int] = {}
+    
+    async def sync_all(self) -> int:
+        """
+        Sync the related products of every local product
+        
+        Relations come from Wake (/produtos/{id}/relacionados, reusing fresh
+        entries of the product_resources cache). Products Wake relates to
+        nothing get the products sharing the most categories and attribute
+        values instead. Only the rows that changed are written.
+        
+        Returns:
+            Number of relations stored
+        """
+        # Initialize loader
+        if self.api_client:
+            self.loader = ProductsLoader(self.api_client)
+        else:
+            async with WakeAPIClient() as client:
+                self.loader = ProductsLoader(client)
+                return await self._perform_sync()
+        
+        return await self._perform_sync()
+    
+    def _load_catalogue(self) -> Dict[str, Any]:
+        """Load the variant lookups and the similarity features of the local catalogue"""
+        with SessionLocal() as db:
+            variants = db.execute(
+                select(
+                    ProductVariant.id,
+                    ProductVariant.product_id,
+                    ProductVariant.sku,
+                    func.coalesce(func.sum(VariantStock.physical_stock), 0)
+                ).outerjoin(
+                    VariantStock, VariantStock.variant_id == ProductVariant.id
+                ).group_by(ProductVariant.id)
+            ).all()
+            memberships = db.execute(
+                select(product_categories.c.product_id, product_categories.c.category_id)
+            ).all()
+            attributes = db.execute(
+                select(ProductVariant.product_id, VariantAttribute.name, VariantAttribute.value).join(
+                    VariantAttribute, VariantAttribute.variant_id == ProductVariant.id
+                ).distinct()
+            ).all()
+        
+        # The variant with the most stock stands for its product
+        representative: Dict[int, Tuple[int, int]] = {}
+        for variant_id, product_id, _, stock in variants:
+            best = representative.get(product_id)
+            if best is None or (stock, -variant_id) > (best[1], -best[0]):
+                representative[product_id] = (variant_id, stock)
+        
+        features: Dict[int, Set[Tuple]] = defaultdict(set)
+        for product_id, category_id in memberships:
+            features[product_id].add(("category", category_id))
+        for product_id, name, value in attributes:
+            features[product_id].add(("attribute", name, value))
+        
+        return {
+            "variant_by_sku": {sku: variant_id for variant_id, _, sku, _ in variants},
+            "product_by_variant": {variant_id: product_id for variant_id, product_id, _, _ in variants},
+            "representative": {product_id: best[0] for product_id, best in representative.items()},
+            "features": {
+                product_id: product_features
+                for product_id, product_features in features.items()
+                if product_id in representative
+            }
+        }
+    
+    async def _load_wake_relations(self, product_ids: List[int]) -> Dict[int, List[Dict[str, Any]]]:
+        """Load Wake relations, fetching only the products without a fresh cache entry"""
+        keys = [str(product_id) for product_id in product_ids]
+        cached = read_resources(RELATED, keys)
+        relations = {key: payload for key, (payload, fresh) in cached.items() if fresh}
+        
+        missing = [key for key in keys if key not in relations]
+        failures = 0
+        for count, start in enumerate(range(0, len(missing), self.batch_size), start=1):
+            fetched, failed = await fetch_resources(self.loader, RELATED, missing[start:start + self.batch_size], self.concurrency)
+            store_resources(RELATED, fetched)
+            relations.update(fetched)
+            # Failed products with a stale entry still get their Wake relations (below)
+            failures += sum(1 for key in failed if key not in cached)
+            SyncStateManager.update_progress("product_relations", page=count, items_synced=len(fetched))
+        
+        # Relations would otherwise be rebuilt from similarity alone
+        check_failures(failures, len(missing))
+        
+        # Products whose fetch failed fall back to a stale entry, if any
+        for key, (payload, _) in cached.items():
+            relations.setdefault(key, payload)
+        
+        return {int(key): payload for key, payload in relations.items()}
+    
+    def _resolve(self, entry: Dict[str, Any], catalogue: Dict[str, Any]) -> Optional[int]:
+        """Find the local variant of a Wake relation entry (None if it is not synced)"""
+        variant_id = catalogue["variant_by_sku"].get(entry.get("sku"))
+        if variant_id is None and entry.get("produtoVarianteId") in catalogue["product_by_variant"]:
+            variant_id = entry["produtoVarianteId"]
+        if variant_id is None:
+            variant_id = catalogue["representative"].get(entry.get("produtoId"))
+        return variant_id
+    
+    async def _perform_sync(self) -> int:
+        """Perform the actual sync operation"""
+        SyncStateManager.start_sync("product_relations", reset=True)
+        
+        try:
+            catalogue = self._load_catalogue()
+            product_ids = sorted(catalogue["representative"])
+            wake_relations = await self._load_wake_relations(product_ids)
+            
+            rows = []
+            unrelated = []
+            for product_id in product_ids:
+                related = []
+                for entry in wake_relations.get(product_id) or []:
+                    variant_id = self._resolve(entry, catalogue)
+                    if (variant_id is not None and variant_id not in related
+                            and catalogue["product_by_variant"][variant_id] != product_id):
+                        related.append(variant_id)
+                if not related:
+                    unrelated.append(product_id)
+                rows.extend(
+                    {"product_id": product_id, "related_variant_id": variant_id,
+                     "rank": rank, "source": "wake", "score": None}
+                    for rank, variant_id in enumerate(related[:self.limit], start=1)
+                )
+            
+            similar = similar_products(catalogue["features"], unrelated, self.limit, self.max_feature_products)
+            for product_id, matches in similar.items():
+                rows.extend(
+                    {"product_id": product_id, "related_variant_id": catalogue["representative"][other],
+                     "rank": rank, "source": "similarity", "score": score}
+                    for rank, (other, score) in enumerate(matches, start=1)
+                )
+            
+            with SessionLocal() as db:
+                changes = replace_table_rows(
+                    db, ProductRelation.__table__, ("product_id", "related_variant_id"), rows
+                )
+                db.commit()
+            
+            self.last_changes = {name: changes[name] for name in ("inserted", "updated", "deleted")}
+        except Exception as e:
+            SyncStateManager.fail_sync("product_relations", str(e))
+            raise
+        
+        SyncStateManager.complete_sync("product_relations", total_synced=len(rows))
+        return len(rows)
\ No newline at end of file
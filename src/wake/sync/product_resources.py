@@ -0,0 +1,95 @@
+"""
+Product images and related products sync service
+"""
+
+from typing import Iterable, List
+from sqlalchemy import select
+
+from wake.api import WakeAPIClient
+from wake.loaders.products import ProductsLoader
+from wake.loaders.product_resources import (
+    IMAGES,
+    RELATED,
+    PRODUCT_RESOURCE_CONCURRENCY,
+    check_failures,
+    fetch_resources,
+    store_resources
+)
+from wake.db import SessionLocal, Product, ProductVariant
+from .state_manager import SyncStateManager
+
+
+class ProductResourceSync:
+    """Service to fill the product_resources cache for every local product"""
+    
+    def __init__(self, api_client: WakeAPIClient = None, batch_size: int = 50,
+                 concurrency: int = PRODUCT_RESOURCE_CONCURRENCY):
+        self.api_client = api_client
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.loader = None
+        # Keys whose request failed in the last sync
+        self.last_failures = 0
+    
+    async def sync_all(self, kinds: Iterable[str] = (IMAGES, RELATED)) -> int:
+        """
+        Fetch images (per SKU) and related products (per product) for the local catalogue
+        
+        Requests run concurrency at a time (paced by the rate limiter) and each
+        batch is stored with a single statement, so tool calls find the entries
+        already cached instead of fetching them one by one. The sync fails if
+        most requests fail (see PRODUCT_RESOURCE_MAX_FAILURE_RATIO).
+        
+        Args:
+            kinds: Resource kinds to sync (IMAGES, RELATED)
+        
+        Returns:
+            Number of cache entries stored
+        """
+        # Initialize loader
+        if self.api_client:
+            self.loader = ProductsLoader(self.api_client)
+        else:
+            async with WakeAPIClient() as client:
+                self.loader = ProductsLoader(client)
+                return await self._perform_sync(kinds)
+        
+        return await self._perform_sync(kinds)
+    
+    def _load_keys(self, kind: str) -> List[str]:
+        """Load the resource keys of the local catalogue"""
+        with SessionLocal() as db:
+            if kind == IMAGES:
+                keys = db.execute(select(ProductVariant.sku).order_by(ProductVariant.sku)).scalars().all()
+            else:
+                keys = db.execute(select(Product.id).order_by(Product.id)).scalars().all()
+        return [str(key) for key in keys if key]
+    
+    async def _perform_sync(self, kinds: Iterable[str]) -> int:
+        """Perform the actual sync operation"""
+        SyncStateManager.start_sync("product_resources", reset=True)
+        
+        stored = 0
+        requested = 0
+        failures = 0
+        page = 0
+        try:
+            for kind in kinds:
+                keys = self._load_keys(kind)
+                for start in range(0, len(keys), self.batch_size):
+                    batch = keys[start:start + self.batch_size]
+                    fetched, failed = await fetch_resources(self.loader, kind, batch, self.concurrency)
+                    stored += store_resources(kind, fetched)
+                    requested += len(batch)
+                    failures += len(failed)
+                    page += 1
+                    SyncStateManager.update_progress("product_resources", page=page, items_synced=len(fetched))
+            
+            self.last_failures = failures
+            check_failures(failures, requested)
+        except Exception as e:
+            SyncStateManager.fail_sync("product_resources", str(e))
+            raise
+        
+        SyncStateManager.complete_sync("product_resources", total_synced=stored)
+        return stored
\ No newline at end of file
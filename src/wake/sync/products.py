@@ -2,13 +2,14 @@
 Products sync service
 """
 
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Set
 from sqlalchemy.orm import Session
 from datetime import datetime
 
 from wake.api import WakeAPIClient
 from wake.loaders import ProductsLoader
 from wake.db import SessionLocal, Product, ProductVariant, VariantPricing, VariantStock, DistributionCenter, VariantAttribute, ProductInfo
+from wake.services.variant_matrix import store_variant_matrix
 
 
 class ProductSync:
@@ -19,6 +20,8 @@ class ProductSync:
         self.loader = ProductsLoader(api_client) if api_client else None
         self.sync_prices = sync_prices
         self.sync_stock = sync_stock
+        # Products whose variant matrix must be rebuilt (see rebuild_variant_matrices)
+        self._dirty_products: Set[int] = set()
     
     async def sync_all(self, limit: int = 100) -> int:
         """
@@ -58,6 +61,8 @@ class ProductSync:
             await self._sync_product(product_data, dc_ids)
             count += 1
         
+        self.rebuild_variant_matrices()
+        
         return count
     
     async def _sync_product(self, product_data: Dict, dc_ids: List[int]):
@@ -102,6 +107,31 @@ class ProductSync:
             await self._sync_variant(db, product.id, product_data, dc_ids)
             
             db.commit()
+        
+        # The size/colour grid is rebuilt once its variants are synced, not per variant
+        self._dirty_products.add(product_id)
+    
+    def rebuild_variant_matrices(self) -> int:
+        """
+        Rebuild the variant matrix of every product synced since the last rebuild
+        
+        Call after each page (or batch) of products, so a product's matrix is
+        built once for all its variants on the page instead of once per variant.
+        
+        Returns:
+            Number of matrices rebuilt
+        """
+        product_ids = sorted(self._dirty_products)
+        if not product_ids:
+            return 0
+        
+        with SessionLocal() as db:
+            for product_id in product_ids:
+                store_variant_matrix(db, product_id)
+            db.commit()
+        
+        self._dirty_products.difference_update(product_ids)
+        return len(product_ids)
     
     async def _sync_variant(self, db: Session, product_id: int, variant_data: Dict, dc_ids: List[int]):
         """Sync a single product variant"""
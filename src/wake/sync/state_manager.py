@@ -4,14 +4,20 @@ Sync state management for tracking sync progress
 
 import json
 from datetime import datetime
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable
 
 from wake.db import SessionLocal, SyncState
+from wake import sync_version
 
 
 class SyncStateManager:
     """Manages sync state for resumable syncing"""
     
+    @staticmethod
+    def add_completion_listener(listener: Callable[[str], None]):
+        """Register a callback to run (in this process) when a sync completes"""
+        sync_version.add_completion_listener(listener)
+    
     @staticmethod
     def get_or_create(sync_type: str) -> SyncState:
         """Get or create sync state for a given type"""
@@ -75,6 +81,8 @@ class SyncStateManager:
                 if total_synced is not None:
                     state.total_synced = total_synced
                 db.commit()
+        
+        sync_version.notify_sync_completed(sync_type)
     
     @staticmethod
     def fail_sync(sync_type: str, error_message: str):
@@ -110,6 +118,15 @@ class SyncStateManager:
                 "extra_data": json.loads(state.extra_data) if state.extra_data else {}
             }
     
+    @staticmethod
+    def get_sync_version() -> Optional[str]:
+        """
+        Get a marker that changes whenever any sync completes
+        
+        Lets other processes (e.g. the web server) notice completed syncs.
+        """
+        return sync_version.get_sync_version()
+    
     @staticmethod
     def get_all_states() -> Dict[str, Dict[str, Any]]:
         """Get all sync states"""
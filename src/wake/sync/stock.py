@@ -7,7 +7,7 @@ from sqlalchemy.orm import Session
 from datetime import datetime
 
 from wake.api import WakeAPIClient
-from wake.loaders import ProductsLoader
+from wake.loaders import ProductsLoader, reference_cache
 from wake.db import SessionLocal, ProductVariant, VariantStock, DistributionCenter
 
 
@@ -21,11 +21,16 @@ class StockSync:
     
     @property
     def dc_ids(self):
-        """Get distribution center IDs"""
+        """Get distribution center IDs (shared by all instances until a distribution center sync)"""
         if self._dc_ids is None:
-            with SessionLocal() as db:
-                dcs = db.query(DistributionCenter).all()
-                self._dc_ids = [dc.id for dc in dcs]
+            key = ("local_distribution_centers", "ids")
+            dc_ids = reference_cache.get(key)
+            if dc_ids is None:
+                with SessionLocal() as db:
+                    dcs = db.query(DistributionCenter).all()
+                    dc_ids = [dc.id for dc in dcs]
+                reference_cache.set(key, dc_ids)
+            self._dc_ids = list(dc_ids)
         return self._dc_ids
     
     async def sync_all_stock(self, batch_size: int = 50) -> int:
@@ -143,20 +148,9 @@ class StockSync:
     
     async def _sync_changes(self, changed_since: str) -> int:
         """Sync products with stock changes"""
-        page = 1
         total_updated = 0
         
-        while True:
-            # Get changed products
-            products = await self.loader.load_product_updates(
-                page=page,
-                quantity=50,
-                changed_since=changed_since
-            )
-            
-            if not products:
-                break
-            
+        async for _, products in self.loader.stream_product_updates(changed_since=changed_since):
             with SessionLocal() as db:
                 for product_data in products:
                     # Each product has embedded stock data
@@ -200,7 +194,5 @@ class StockSync:
                         total_updated += 1
                 
                 db.commit()
-            
-            page += 1
         
         return total_updated
\ No newline at end of file
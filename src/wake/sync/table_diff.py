@@ -0,0 +1,74 @@
+"""
+Diff-based table replacement for small reference tables
+"""
+
+from typing import Dict, Any, List, Sequence, Tuple
+from sqlalchemy import Table, select, update, delete, bindparam, and_, tuple_
+from sqlalchemy.orm import Session
+
+
+def replace_table_rows(db: Session, table: Table, key_columns: Sequence[str],
+                       rows: List[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Make a table hold exactly the given rows, writing only what changed
+    
+    Existing rows are compared with the new ones by key: new keys are bulk
+    inserted, rows with different values are bulk updated and missing keys are
+    deleted in one statement. Nothing is committed, so the caller applies the
+    whole diff in one transaction and readers never see a partly filled table.
+    
+    Args:
+        db: Database session
+        table: Table to update
+        key_columns: Names of the columns identifying a row
+        rows: Complete new contents (every row has the same columns, keys included)
+    
+    Returns:
+        Dictionary with inserted, updated and deleted counts, plus deleted_keys
+        (key tuples of the removed rows)
+    """
+    columns = list(rows[0]) if rows else list(key_columns)
+    
+    def key_of(row) -> Tuple:
+        return tuple(row[column] for column in key_columns)
+    
+    existing = {
+        key_of(row): dict(row)
+        for row in db.execute(select(*(table.c[column] for column in columns))).mappings()
+    }
+    wanted = {key_of(row): row for row in rows}
+    
+    inserts = [row for key, row in wanted.items() if key not in existing]
+    updates = [row for key, row in wanted.items() if key in existing and existing[key] != row]
+    deleted_keys = [key for key in existing if key not in wanted]
+    
+    if inserts:
+        db.execute(table.insert(), inserts)
+    
+    value_columns = [column for column in columns if column not in key_columns]
+    if updates and value_columns:
+        # Bind names must differ from column names in UPDATE statements
+        statement = update(table).where(and_(
+            *(table.c[column] == bindparam(f"key_{column}") for column in key_columns)
+        )).values({column: bindparam(f"new_{column}") for column in value_columns})
+        db.execute(statement, [
+            {
+                **{f"key_{column}": row[column] for column in key_columns},
+                **{f"new_{column}": row[column] for column in value_columns}
+            }
+            for row in updates
+        ])
+    
+    if deleted_keys:
+        if len(key_columns) == 1:
+            condition = table.c[key_columns[0]].in_([key[0] for key in deleted_keys])
+        else:
+            condition = tuple_(*(table.c[column] for column in key_columns)).in_(deleted_keys)
+        db.execute(delete(table).where(condition))
+    
+    return {
+        "inserted": len(inserts),
+        "updated": len(updates),
+        "deleted": len(deleted_keys),
+        "deleted_keys": deleted_keys
+    }
\ No newline at end of file
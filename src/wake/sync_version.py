@@ -0,0 +1,94 @@
+"""
+Sync completion tracking for the serving processes
+
+Syncs run in their own processes, so the servers notice them by polling the
+latest completion time in SyncState (see VersionedIndex). Completion
+listeners cover syncs run in the same process.
+
+Only relative imports are used here: the serving code must not load the sync
+package, and with both src/ and the repo root on sys.path an absolute wake.*
+import would load a second copy of the database models.
+"""
+
+import time
+import threading
+from typing import Any, Callable, List, Optional
+from sqlalchemy import func
+
+from .db import SessionLocal, SyncState
+
+# Callbacks run with the sync type whenever a sync completes in this process
+_completion_listeners: List[Callable[[str], None]] = []
+
+
+def add_completion_listener(listener: Callable[[str], None]) -> None:
+    """Register a callback to run (in this process) when a sync completes"""
+    _completion_listeners.append(listener)
+
+
+def notify_sync_completed(sync_type: str) -> None:
+    """Run the completion listeners; a failing listener does not stop the others"""
+    for listener in list(_completion_listeners):
+        try:
+            listener(sync_type)
+        except Exception as e:
+            print(f"Sync completion listener failed: {e}")
+
+
+def get_sync_version() -> Optional[str]:
+    """
+    Get a marker that changes whenever any sync completes
+    
+    Lets other processes (e.g. the web server) notice completed syncs.
+    """
+    with SessionLocal() as db:
+        completed_at = db.query(func.max(SyncState.completed_at)).filter(
+            SyncState.status == "completed"
+        ).scalar()
+        return completed_at.isoformat() if completed_at else None
+
+
+class VersionedIndex:
+    """
+    An in-memory structure rebuilt when a newer sync completed
+    
+    The built object must have a version attribute holding the sync version
+    read before it was loaded, so a sync completing mid-build triggers
+    another build. The version is checked at most once per interval.
+    """
+    
+    def __init__(self, build: Callable[[], Any], version_check_interval: float):
+        self.build = build
+        self.version_check_interval = version_check_interval
+        self.current: Any = None
+        self._checked_at: Optional[float] = None
+        self._lock = threading.Lock()
+    
+    def is_due(self) -> bool:
+        """Whether the version should be checked again"""
+        if self._checked_at is None:
+            return True
+        return time.monotonic() - self._checked_at > self.version_check_interval
+    
+    def invalidate(self) -> None:
+        """Check for a newer sync on the next lookup"""
+        self._checked_at = None
+    
+    def refresh(self, force: bool = False) -> Any:
+        """
+        Rebuild if a newer sync completed (or always, with force)
+        
+        Build errors are raised; the current structure is kept and the next
+        check waits for the interval.
+        
+        Returns:
+            The current structure after the refresh
+        """
+        with self._lock:
+            try:
+                if force or self.current is None or get_sync_version() != self.current.version:
+                    # Swap in one assignment so readers never see a half-built structure
+                    self.current = self.build()
+            finally:
+                self._checked_at = time.monotonic()
+        return self.current
\ No newline at end of file
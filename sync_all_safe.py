@@ -17,6 +17,7 @@ from rich import box
 from wake.api import WakeAPIClient
 from wake.db import SessionLocal, Product, ProductVariant, VariantStock, DistributionCenter
 from wake.sync import ProductSync, SyncStateManager
+from wake.loaders.paging import stream_pages_parallel
 
 
 console = Console()
@@ -30,6 +31,7 @@ class SafeSyncManager:
         self.rate_limit_hits = 0
         self.current_page = 1
         self.batch_size = 50
+        self.page_concurrency = 4  # Page requests in flight during the download
         self.dc_ids = []
         
     async def get_dc_ids(self):
@@ -89,6 +91,9 @@ class SafeSyncManager:
                     self.rate_limit_hits += 1
                     # Wait extra time on rate limit
                     await asyncio.sleep(5)
+        
+        # Rebuild the size/colour grids of the batch's products
+        sync.rebuild_variant_matrices()
     
     async def run_safe_sync(self):
         """Run the sync with safety measures"""
@@ -134,87 +139,86 @@ class SafeSyncManager:
                     total=self.batch_size
                 )
                 
-                consecutive_empty = 0
+                async def fetch_page(page: int):
+                    return await client.get("/produtos", params={
+                        "pagina": page,
+                        "quantidadeRegistros": self.batch_size
+                    })
                 
-                while consecutive_empty < 3:  # Stop after 3 empty pages
+                done = False
+                while not done:
                     try:
-                        # Update page description
-                        progress.update(page_task, description=f"[yellow]Page {self.current_page}")
-                        progress.reset(page_task)
-                        
-                        # Fetch page
-                        products = await client.get("/produtos", params={
-                            "pagina": self.current_page,
-                            "quantidadeRegistros": self.batch_size
-                        })
-                        
-                        if not products:
-                            consecutive_empty += 1
-                            console.print(f"[yellow]Page {self.current_page} empty ({consecutive_empty}/3)[/yellow]")
-                            self.current_page += 1
-                            await asyncio.sleep(1)
-                            continue
-                        
-                        consecutive_empty = 0
-                        
-                        # Update estimated total if we're still finding products
-                        if self.current_page * self.batch_size > estimated_total - 1000:
-                            estimated_total = (self.current_page + 10) * self.batch_size
-                            progress.update(main_task, total=estimated_total - initial_status['variants'])
-                        
-                        # Sync batch
-                        for i, product_data in enumerate(products):
-                            try:
-                                await sync._sync_product(product_data, self.dc_ids)
-                                self.products_synced += 1
-                                progress.advance(main_task)
-                                progress.advance(page_task)
-                                
-                                # Show sample every 10 products
-                                if self.products_synced % 10 == 0:
-                                    sku = product_data.get('sku', 'unknown')
-                                    name = product_data.get('nome', '')[:50]
-                                    progress.print(f"  [dim]✓ {sku}: {name}...[/dim]")
-                                    
-                            except Exception as e:
-                                error_msg = f"SKU {product_data.get('sku', 'unknown')}: {str(e)}"
-                                self.errors.append(error_msg)
-                                progress.print(f"[red]  ✗ {error_msg}[/red]")
-                                
-                                if "Rate limit" in str(e) or "429" in str(e):
-                                    self.rate_limit_hits += 1
-                                    wait_time = 60  # Default wait
-                                    
-                                    # Try to parse retry time
-                                    import re
-                                    match = re.search(r"Retry after (\d+) seconds", str(e))
-                                    if match:
-                                        wait_time = int(match.group(1))
+                        # Probes the page count, then fetches several pages at once (paced by the rate limiter)
+                        async for page, products in stream_pages_parallel(
+                            fetch_page,
+                            page_size=self.batch_size,
+                            start_page=self.current_page,
+                            concurrency=self.page_concurrency
+                        ):
+                            # Update page description
+                            progress.update(page_task, description=f"[yellow]Page {page}")
+                            progress.reset(page_task)
+                            
+                            # Update estimated total if we're still finding products
+                            if page * self.batch_size > estimated_total - 1000:
+                                estimated_total = (page + 10) * self.batch_size
+                                progress.update(main_task, total=estimated_total - initial_status['variants'])
+                            
+                            # Sync batch
+                            for i, product_data in enumerate(products):
+                                try:
+                                    await sync._sync_product(product_data, self.dc_ids)
+                                    self.products_synced += 1
+                                    progress.advance(main_task)
+                                    progress.advance(page_task)
                                     
-                                    progress.print(f"[yellow]Rate limited! Waiting {wait_time} seconds...[/yellow]")
+                                    # Show sample every 10 products
+                                    if self.products_synced % 10 == 0:
+                                        sku = product_data.get('sku', 'unknown')
+                                        name = product_data.get('nome', '')[:50]
+                                        progress.print(f"  [dim]✓ {sku}: {name}...[/dim]")
+                                        
+                                except Exception as e:
+                                    error_msg = f"SKU {product_data.get('sku', 'unknown')}: {str(e)}"
+                                    self.errors.append(error_msg)
+                                    progress.print(f"[red]  ✗ {error_msg}[/red]")
                                     
-                                    # Show countdown
-                                    for remaining in range(wait_time, 0, -1):
-                                        progress.update(
-                                            page_task, 
-                                            description=f"[red]Rate limited - {remaining}s remaining"
-                                        )
-                                        await asyncio.sleep(1)
-                        
-                        # Update sync state
-                        last_sku = products[-1]["sku"] if products else None
-                        SyncStateManager.update_progress(
-                            "products", 
-                            self.current_page, 
-                            last_sku=last_sku,
-                            items_synced=len(products)
-                        )
-                        
-                        # Page complete
-                        self.current_page += 1
+                                    if "Rate limit" in str(e) or "429" in str(e):
+                                        self.rate_limit_hits += 1
+                                        wait_time = 60  # Default wait
+                                        
+                                        # Try to parse retry time
+                                        import re
+                                        match = re.search(r"Retry after (\d+) seconds", str(e))
+                                        if match:
+                                            wait_time = int(match.group(1))
+                                        
+                                        progress.print(f"[yellow]Rate limited! Waiting {wait_time} seconds...[/yellow]")
+                                        
+                                        # Show countdown
+                                        for remaining in range(wait_time, 0, -1):
+                                            progress.update(
+                                                page_task, 
+                                                description=f"[red]Rate limited - {remaining}s remaining"
+                                            )
+                                            await asyncio.sleep(1)
+                            
+                            # Rebuild the size/colour grids of the page's products
+                            sync.rebuild_variant_matrices()
+                            
+                            # Update sync state
+                            last_sku = products[-1]["sku"] if products else None
+                            SyncStateManager.update_progress(
+                                "products", 
+                                page, 
+                                last_sku=last_sku,
+                                items_synced=len(products)
+                            )
+                            
+                            # Page complete
+                            self.current_page = page + 1
                         
-                        # Add small delay between pages
-                        await asyncio.sleep(1)
+                        done = True
                         
                     except KeyboardInterrupt:
                         progress.print("\n[yellow]Sync interrupted by user[/yellow]")
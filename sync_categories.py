@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Sync categories and the products in each category
+Run after a product sync so memberships can link to local products
+"""
+
+import asyncio
+import time
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn
+
+from wake.api import WakeAPIClient
+from wake.sync import CategorySync, CategoryProductSync
+
+
+console = Console()
+
+
+async def sync_categories():
+    """Sync the category tree and category memberships"""
+    console.print("[bold cyan]Wake Category Sync[/bold cyan]")
+    console.print("[yellow]This will replace categories and product memberships[/yellow]\n")
+    
+    start_time = time.time()
+    
+    async with WakeAPIClient() as client:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console
+        ) as progress:
+            task = progress.add_task("[cyan]Syncing categories...", total=None)
+            
+            try:
+                total_categories = await CategorySync(api_client=client).sync_all()
+            except Exception as e:
+                console.print(f"[red]Error: {e}[/red]")
+                return
+            
+            progress.update(task, description="[cyan]Syncing category products...")
+            try:
+                total_memberships = await CategoryProductSync(api_client=client).sync_all()
+            except Exception as e:
+                console.print(f"[red]Error: {e}[/red]")
+                return
+    
+    elapsed = time.time() - start_time
+    console.print(f"\n[green]✓ Synced {total_categories:,} categories and {total_memberships:,} product memberships in {elapsed:.1f} seconds[/green]")
+
+
+if __name__ == "__main__":
+    asyncio.run(sync_categories())
\ No newline at end of file
@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Sync product images and related products into the local cache,
+then rebuild the product_relations table from them
+Run after a product and category sync so every local product gets its entries
+"""
+
+import asyncio
+import time
+from rich.console import Console
+from rich.progress import Progress, SpinnerColumn, TextColumn
+
+from wake.api import WakeAPIClient
+from wake.sync import ProductResourceSync, ProductRelationSync
+
+
+console = Console()
+
+
+async def sync_product_resources():
+    """Sync images and related products of every local product"""
+    console.print("[bold cyan]Wake Product Images & Related Products Sync[/bold cyan]")
+    console.print("[yellow]This makes one request per SKU (images) and per product (related products)[/yellow]\n")
+    
+    start_time = time.time()
+    
+    async with WakeAPIClient() as client:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console
+        ) as progress:
+            task = progress.add_task("[cyan]Syncing images and related products...", total=None)
+            resource_sync = ProductResourceSync(api_client=client)
+            try:
+                total = await resource_sync.sync_all()
+            except Exception as e:
+                console.print(f"[red]Error: {e}[/red]")
+                return
+            if resource_sync.last_failures:
+                console.print(f"[yellow]{resource_sync.last_failures:,} requests failed; those products are fetched again on their next tool call[/yellow]")
+            
+            # Reuses the related products just cached, so this adds no API calls
+            progress.update(task, description="[cyan]Building product relations...")
+            try:
+                total_relations = await ProductRelationSync(api_client=client).sync_all()
+            except Exception as e:
+                console.print(f"[red]Error: {e}[/red]")
+                return
+    
+    elapsed = time.time() - start_time
+    console.print(f"\n[green]✓ Cached {total:,} image and related product entries and stored {total_relations:,} relations in {elapsed:.1f} seconds[/green]")
+
+
+if __name__ == "__main__":
+    asyncio.run(sync_product_resources())
\ No newline at end of file
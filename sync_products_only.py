@@ -12,6 +12,7 @@ from rich.progress import Progress, SpinnerColumn, BarColumn, TextColumn, TimeRe
 
 from wake.api import WakeAPIClient
 from wake.sync import ProductSync, SyncStateManager
+from wake.loaders.paging import stream_pages
 from wake.db import SessionLocal, Product, ProductVariant
 
 
@@ -63,24 +64,16 @@ async def sync_products_only():
             
             task = progress.add_task("[cyan]Syncing products...", total=None)
             
-            consecutive_empty = 0
+            async def fetch_page(page: int):
+                return await client.get("/produtos", params={
+                    "pagina": page,
+                    "quantidadeRegistros": 50,
+                    "camposAdicionais": ["Atributo", "Informacao"]
+                })
             
-            while consecutive_empty < 3:
-                try:
-                    # Get page
-                    products = await client.get("/produtos", params={
-                        "pagina": current_page,
-                        "quantidadeRegistros": 50,
-                        "camposAdicionais": ["Atributo", "Informacao"]
-                    })
-                    
-                    if not products:
-                        consecutive_empty += 1
-                        current_page += 1
-                        continue
-                    
-                    consecutive_empty = 0
-                    
+            try:
+                # Stops after 3 consecutive empty pages; the next page is fetched while this one syncs
+                async for current_page, products in stream_pages(fetch_page, start_page=current_page, max_empty_pages=3):
                     # Sync products
                     for product_data in products:
                         await sync._sync_product(product_data, [])  # Empty DC list since no stock
@@ -89,6 +82,9 @@ async def sync_products_only():
                         if total_synced % 10 == 0:
                             progress.update(task, description=f"[cyan]Syncing products... {total_synced:,} done")
                     
+                    # Rebuild the size/colour grids of the page's products
+                    sync.rebuild_variant_matrices()
+                    
                     # Update state
                     SyncStateManager.update_progress(
                         "products_only",
@@ -97,17 +93,14 @@ async def sync_products_only():
                         items_synced=len(products)
                     )
                     
-                    current_page += 1
                     await asyncio.sleep(0.5)  # Rate limit protection
                     
-                except KeyboardInterrupt:
-                    console.print("\n[yellow]Sync interrupted[/yellow]")
-                    SyncStateManager.fail_sync("products_only", "Interrupted by user")
-                    break
-                except Exception as e:
-                    console.print(f"\n[red]Error: {e}[/red]")
-                    SyncStateManager.fail_sync("products_only", str(e))
-                    break
+            except KeyboardInterrupt:
+                console.print("\n[yellow]Sync interrupted[/yellow]")
+                SyncStateManager.fail_sync("products_only", "Interrupted by user")
+            except Exception as e:
+                console.print(f"\n[red]Error: {e}[/red]")
+                SyncStateManager.fail_sync("products_only", str(e))
     
     # Complete
     SyncStateManager.complete_sync("products_only", total_synced=total_synced)
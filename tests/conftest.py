@@ -0,0 +1,23 @@
+"""
+Shared test setup
+
+Points the database at a temporary file before any src.wake module creates
+the engine, and gives tests an empty schema.
+"""
+
+import os
+import tempfile
+
+os.environ["DATABASE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="wake-tests-"), "wake.db")
+
+import pytest
+
+from src.wake.db import Base, engine
+
+
+@pytest.fixture
+def database():
+    """Create every table empty for the test, and drop them afterwards"""
+    Base.metadata.create_all(engine)
+    yield
+    Base.metadata.drop_all(engine)
\ No newline at end of file
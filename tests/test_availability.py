@@ -0,0 +1,84 @@
+"""
+Local availability index used by the checkout preflight
+"""
+
+import pytest
+
+from src.wake.db import SessionLocal, DistributionCenter, Product, ProductVariant, VariantPricing, VariantStock
+from src.wake.services.availability import AvailabilityIndex
+
+
+@pytest.fixture
+def catalogue(database):
+    with SessionLocal() as db:
+        db.add_all([
+            DistributionCenter(id=1, name="CD SP", zip_code=1310100, is_default=True),
+            DistributionCenter(id=2, name="CD BH", zip_code=30140170),
+            Product(id=1),
+            ProductVariant(id=10, product_id=1, sku="FREE", name="Free stock"),
+            ProductVariant(id=11, product_id=1, sku="RESERVED", name="All units reserved"),
+            ProductVariant(id=12, product_id=1, sku="UNAVAILABLE", name="Flagged unavailable"),
+            ProductVariant(id=13, product_id=1, sku="NOSTOCK", name="No stock rows"),
+            ProductVariant(id=14, product_id=1, sku="INVALID", name="Invalid", is_valid=False),
+            VariantPricing(variant_id=10, original_price=120.0, sale_price=99.9),
+            # 5 free at SP, 2 free at BH (3 of 5 reserved)
+            VariantStock(variant_id=10, distribution_center_id=1, physical_stock=5, is_available=True),
+            VariantStock(variant_id=10, distribution_center_id=2, physical_stock=5, reserved_stock=3, is_available=True),
+            VariantStock(variant_id=11, distribution_center_id=1, physical_stock=4, reserved_stock=4, is_available=True),
+            # Over-reserved rows count as 0, not negative
+            VariantStock(variant_id=11, distribution_center_id=2, physical_stock=1, reserved_stock=3, is_available=True),
+            VariantStock(variant_id=12, distribution_center_id=1, physical_stock=8, is_available=False),
+            VariantStock(variant_id=14, distribution_center_id=1, physical_stock=8, is_available=True)
+        ])
+        db.commit()
+
+
+def warned_variants(report):
+    return {warning["productVariantId"] for warning in report["warnings"]}
+
+
+def test_stock_counts_only_sellable_units(catalogue):
+    index = AvailabilityIndex()
+    
+    assert index.get(10).stock == 7
+    assert index.get(11).stock == 0
+    assert index.get(12).stock == 0
+    assert index.get(13).has_stock_data is False
+
+
+def test_validate_rejects_reserved_and_unavailable_stock(catalogue):
+    report = AvailabilityIndex().validate([
+        {"productVariantId": 10, "quantity": 7},
+        {"productVariantId": 11, "quantity": 1},
+        {"productVariantId": 12, "quantity": 1}
+    ])
+    
+    assert report["ok"] is False
+    assert [error["productVariantId"] for error in report["errors"]] == [11, 12]
+    assert report["items"][0]["stock_available"] == 7
+    assert report["expected_subtotal"] is None  # 11 and 12 have no local price
+
+
+def test_validate_rejects_quantities_above_sellable_stock(catalogue):
+    report = AvailabilityIndex().validate([{"productVariantId": 10, "quantity": 8}])
+    
+    assert report["ok"] is False
+    assert "7 disponível(is), 8 solicitado(s)" in report["errors"][0]["message"]
+
+
+def test_validate_warns_on_unknown_or_unsynced_variants(catalogue):
+    report = AvailabilityIndex().validate([
+        {"productVariantId": 10, "quantity": 2},
+        {"productVariantId": 13, "quantity": 1},
+        {"productVariantId": 99, "quantity": 1}
+    ])
+    
+    assert report["ok"] is True
+    assert warned_variants(report) == {13, 99}
+
+
+def test_validate_rejects_invalid_variants(catalogue):
+    report = AvailabilityIndex().validate([{"productVariantId": 14, "quantity": 1}])
+    
+    assert report["ok"] is False
+    assert report["errors"][0]["message"] == "Produto inválido ou indisponível para venda"
\ No newline at end of file
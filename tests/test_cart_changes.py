@@ -0,0 +1,87 @@
+"""
+Folding cart edits into the fewest mutations, and partial failures
+"""
+
+from typing import Any, Dict, List
+
+import pytest
+
+from src.wake.services.checkout_service import CheckoutService
+
+
+class FakeCheckoutService(CheckoutService):
+    """CheckoutService over an in-memory cart, recording the mutations sent"""
+    
+    def __init__(self, cart: Dict[int, int], fail_add: bool = False):
+        self.cart = dict(cart)
+        self.fail_add = fail_add
+        self.mutations: List[str] = []
+    
+    def _state(self) -> Dict[str, Any]:
+        return {"products": [
+            {"productVariantId": variant_id, "quantity": quantity}
+            for variant_id, quantity in self.cart.items() if quantity
+        ]}
+    
+    async def get_checkout(self, checkout_id, **kwargs):
+        return self._state()
+    
+    async def remove_products(self, checkout_id, products, customer_token=None):
+        self.mutations.append("remove")
+        for product in products:
+            variant_id = product["productVariantId"]
+            self.cart[variant_id] = max(self.cart.get(variant_id, 0) - product["quantity"], 0)
+        return self._state()
+    
+    async def add_products(self, checkout_id, products, customer_token=None):
+        self.mutations.append("add")
+        if self.fail_add:
+            raise Exception("Failed to add product to checkout")
+        for product in products:
+            variant_id = product["productVariantId"]
+            self.cart[variant_id] = self.cart.get(variant_id, 0) + product["quantity"]
+        return self._state()
+
+
+async def test_changes_are_folded_into_one_remove_and_one_add():
+    service = FakeCheckoutService({1: 2, 2: 1, 3: 5})
+    
+    result = await service.apply_cart_changes(
+        "checkout", add={4: 1, 5: 2}, remove={2: None}, set_quantities={3: 1, 1: 3}
+    )
+    
+    assert service.mutations == ["remove", "add"]
+    assert service.cart == {1: 3, 2: 0, 3: 1, 4: 1, 5: 2}
+    assert result["applied"]["mutations"] == 2
+    assert "failed" not in result
+
+
+async def test_failed_add_after_remove_reports_the_removal():
+    service = FakeCheckoutService({1: 2}, fail_add=True)
+    
+    result = await service.apply_cart_changes("checkout", add={2: 1}, remove={1: None})
+    
+    assert service.cart == {1: 0}
+    assert result["products"] == []
+    assert result["applied"] == {"added": [], "removed": [{"productVariantId": 1, "quantity": 2}], "mutations": 1}
+    assert result["failed"]["added"] == [{"productVariantId": 2, "quantity": 1}]
+
+
+async def test_failed_add_without_remove_raises():
+    service = FakeCheckoutService({1: 2}, fail_add=True)
+    
+    with pytest.raises(Exception, match="Failed to add"):
+        await service.apply_cart_changes("checkout", add={2: 1})
+
+
+async def test_line_quantities_sum_repeated_variants():
+    service = FakeCheckoutService({})
+    
+    async def get_checkout(checkout_id, **kwargs):
+        return {"products": [
+            {"productVariantId": "7", "quantity": 1},
+            {"productVariantId": 7, "quantity": 2}
+        ]}
+    service.get_checkout = get_checkout
+    
+    assert await service.get_line_quantities("checkout") == {7: 3}
\ No newline at end of file
@@ -0,0 +1,36 @@
+"""
+Closure rows of the category tree
+"""
+
+from wake.sync.categories import build_category_closure
+
+
+def closure_of(parents):
+    return sorted(
+        (row["ancestor_id"], row["descendant_id"], row["depth"])
+        for row in build_category_closure(parents)
+    )
+
+
+def test_every_category_is_its_own_ancestor():
+    assert closure_of({1: None, 2: 0}) == [(1, 1, 0), (2, 2, 0)]
+
+
+def test_descendants_link_to_every_ancestor():
+    # 1 > 2 > 3, and 1 > 4
+    parents = {1: None, 2: 1, 3: 2, 4: 1}
+    
+    assert closure_of(parents) == [
+        (1, 1, 0), (1, 2, 1), (1, 3, 2), (1, 4, 1),
+        (2, 2, 0), (2, 3, 1),
+        (3, 3, 0),
+        (4, 4, 0)
+    ]
+
+
+def test_parents_missing_from_the_tree_end_the_chain():
+    assert closure_of({2: 1, 3: 2}) == [(2, 2, 0), (2, 3, 1), (3, 3, 0)]
+
+
+def test_cycles_do_not_loop_forever():
+    assert closure_of({1: 2, 2: 1}) == [(1, 1, 0), (1, 2, 1), (2, 1, 1), (2, 2, 0)]
\ No newline at end of file
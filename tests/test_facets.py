@@ -0,0 +1,92 @@
+"""
+Faceted filtering and facet counts of the in-memory facet index
+"""
+
+import pytest
+
+from src.wake.services.facets import FacetIndex, FacetVariant
+
+
+def variant(variant_id, product_id, name, price, stock, **attributes):
+    facet_variant = FacetVariant(
+        variant_id, product_id, f"SKU-{variant_id}", name, None, "Marca", price, stock
+    )
+    facet_variant.attributes.update(attributes)
+    return facet_variant
+
+
+@pytest.fixture
+def index():
+    variants = [
+        variant(1, 1, "Camiseta Azul P", 40.0, 5, Cor="Azul", Tamanho="P"),
+        variant(2, 1, "Camiseta Azul M", 40.0, 0, Cor="Azul", Tamanho="M"),
+        variant(3, 2, "Camiseta Vermelha P", 120.0, 2, Cor="Vermelho", Tamanho="P"),
+        variant(4, 3, "Calça Preta", 600.0, 1, Cor="Preto"),
+        variant(5, 4, "Meia sem preço", None, 3)
+    ]
+    categories = {10: "Roupas", 11: "Camisetas"}
+    # Memberships already include the ancestors (Camisetas is under Roupas)
+    memberships = [(1, 10), (1, 11), (2, 10), (2, 11), (3, 10)]
+    return FacetIndex(variants, categories, memberships, version="v1")
+
+
+def variant_ids(result):
+    return [item["variant_id"] for item in result["variants"]]
+
+
+def test_out_of_stock_variants_are_excluded_by_default(index):
+    result = index.search()
+    
+    # Most stock first, then variant ID
+    assert variant_ids(result) == [1, 5, 3, 4]
+    assert result["total"] == 4
+    assert index.search(include_out_of_stock=True)["total"] == 5
+
+
+def test_attribute_counts_ignore_their_own_filter(index):
+    result = index.search(attributes={"cor": "azul"})
+    
+    assert variant_ids(result) == [1]
+    # Choosing another colour is counted as if Cor were not filtered
+    assert result["facets"]["attributes"]["Cor"] == {"Azul": 1, "Vermelho": 1, "Preto": 1}
+    # Other attributes are counted within the filter
+    assert result["facets"]["attributes"]["Tamanho"] == {"P": 1}
+
+
+def test_values_of_one_attribute_are_alternatives(index):
+    result = index.search(attributes={"Cor": ["Azul", "Vermelho"], "Tamanho": "P"})
+    
+    assert variant_ids(result) == [1, 3]
+    assert result["facets"]["attributes"]["Tamanho"] == {"P": 2}
+
+
+def test_category_filter_and_counts(index):
+    result = index.search(category="camisetas")
+    
+    assert variant_ids(result) == [1, 3]
+    assert index.search(category=11)["total"] == 2
+    assert result["facets"]["categories"] == [
+        {"id": 10, "name": "Roupas", "count": 3},
+        {"id": 11, "name": "Camisetas", "count": 2}
+    ]
+
+
+def test_price_filter_and_bucket_counts(index):
+    result = index.search(min_price=100, max_price=150)
+    
+    assert variant_ids(result) == [3]
+    # Variants without a price belong to no bucket
+    assert result["facets"]["price"] == {"0-50": 1, "100-200": 1, "500-1000": 1}
+
+
+def test_price_bounds_are_inclusive(index):
+    assert variant_ids(index.search(min_price=40, max_price=40)) == [1]
+    assert variant_ids(index.search(min_price=600)) == [4]
+
+
+def test_text_query_and_limit(index):
+    result = index.search(query="camiseta", include_out_of_stock=True, limit=2)
+    
+    assert result["total"] == 3
+    assert variant_ids(result) == [1, 3]
+    assert result["facets"]["attributes"]["Tamanho"] == {"P": 2, "M": 1}
\ No newline at end of file
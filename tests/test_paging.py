@@ -0,0 +1,196 @@
+"""
+Paged streaming termination, error and cancellation rules, and page count probing
+"""
+
+import asyncio
+from contextlib import aclosing
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from src.wake.loaders.paging import stream_pages, stream_items, probe_page_count, stream_pages_parallel
+
+
+class FakeEndpoint:
+    """Paged endpoint serving fixed pages and recording the requests"""
+    
+    def __init__(self, pages: Dict[int, List[Any]], fail_page: Optional[int] = None,
+                 block_after: Optional[int] = None):
+        self.pages = pages
+        self.fail_page = fail_page
+        # Pages after this one wait forever (until cancelled)
+        self.block_after = block_after
+        self.requested: List[int] = []
+        self.cancelled: List[int] = []
+    
+    async def fetch_page(self, page: int) -> List[Any]:
+        self.requested.append(page)
+        try:
+            await asyncio.sleep(0)
+            if self.block_after is not None and page > self.block_after:
+                await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.cancelled.append(page)
+            raise
+        if page == self.fail_page:
+            raise RuntimeError(f"page {page} failed")
+        return self.pages.get(page, [])
+
+
+async def collect(fetch_page, **options):
+    return [(page, items) async for page, items in stream_pages(fetch_page, **options)]
+
+
+async def test_stops_at_first_empty_page():
+    endpoint = FakeEndpoint({1: [1, 2], 2: [3, 4], 4: [5]})
+    
+    assert await collect(endpoint.fetch_page, prefetch=0) == [(1, [1, 2]), (2, [3, 4])]
+    assert endpoint.requested == [1, 2, 3]
+
+
+async def test_empty_pages_below_max_empty_pages_are_skipped():
+    endpoint = FakeEndpoint({1: [1], 3: [2]})
+    
+    pages = await collect(endpoint.fetch_page, prefetch=0, max_empty_pages=2)
+    
+    assert pages == [(1, [1]), (3, [2])]
+    assert endpoint.requested == [1, 2, 3, 4, 5]
+
+
+async def test_short_page_ends_stream():
+    endpoint = FakeEndpoint({1: [1, 2], 2: [3], 3: [4, 5]})
+    
+    pages = await collect(endpoint.fetch_page, page_size=2, prefetch=0)
+    
+    assert pages == [(1, [1, 2]), (2, [3])]
+    assert endpoint.requested == [1, 2]
+
+
+async def test_max_pages_bounds_the_requests():
+    endpoint = FakeEndpoint({page: [page] for page in range(1, 10)})
+    
+    pages = await collect(endpoint.fetch_page, start_page=3, prefetch=4, max_pages=2)
+    
+    assert pages == [(3, [3]), (4, [4])]
+    assert sorted(endpoint.requested) == [3, 4]
+
+
+async def test_prefetch_keeps_pages_in_flight():
+    endpoint = FakeEndpoint({page: [page] for page in range(1, 6)})
+    
+    async with aclosing(stream_pages(endpoint.fetch_page, prefetch=2)) as stream:
+        page, _ = await stream.__anext__()
+        assert page == 1
+        assert endpoint.requested == [1, 2, 3]
+
+
+async def test_error_raised_when_its_page_is_reached():
+    endpoint = FakeEndpoint({1: [1], 2: [2], 3: [3], 4: [4]}, fail_page=3)
+    pages = []
+    
+    with pytest.raises(RuntimeError, match="page 3 failed"):
+        async for page, _ in stream_pages(endpoint.fetch_page, prefetch=3):
+            pages.append(page)
+    
+    # Page 3 was fetched ahead, but its error waits until the pages before it are yielded
+    assert pages == [1, 2]
+
+
+async def test_closing_the_stream_cancels_prefetched_pages():
+    endpoint = FakeEndpoint({1: [1]}, block_after=1)
+    
+    async with aclosing(stream_pages(endpoint.fetch_page, prefetch=3)) as stream:
+        async for page, _ in stream:
+            break
+    
+    assert endpoint.requested == [1, 2, 3, 4]
+    assert sorted(endpoint.cancelled) == [2, 3, 4]
+
+
+async def test_stream_items_flattens_pages():
+    endpoint = FakeEndpoint({1: ["a", "b"], 2: ["c"]})
+    
+    items = [item async for item in stream_items(endpoint.fetch_page, page_size=2)]
+    
+    assert items == ["a", "b", "c"]
+
+
+def catalogue(items: int, page_size: int) -> Dict[int, List[int]]:
+    """Pages of a catalogue of items numbered from 0"""
+    return {
+        start // page_size + 1: list(range(start, min(start + page_size, items)))
+        for start in range(0, items, page_size)
+    }
+
+
+@pytest.mark.parametrize("items, expected", [
+    (0, 0),      # Empty endpoint
+    (3, 1),      # Single short page
+    (5, 1),      # Single full page
+    (40, 8),     # Exact multiple of the page size
+    (41, 9),     # One item on the last page
+    (49, 10),    # Short last page
+    (500, 100),
+])
+async def test_probe_page_count(items, expected):
+    endpoint = FakeEndpoint(catalogue(items, 5))
+    
+    assert await probe_page_count(endpoint.fetch_page, page_size=5) == expected
+
+
+async def test_probe_page_count_stops_at_an_empty_page():
+    # The probe lands on page 4 and cannot see past it
+    endpoint = FakeEndpoint({page: [page] * 2 for page in range(1, 9) if page != 4})
+    
+    assert await probe_page_count(endpoint.fetch_page, page_size=2) < 8
+
+
+async def parallel_items(endpoint: FakeEndpoint, page_size: int, **options) -> List[int]:
+    items = []
+    async for _, page_items in stream_pages_parallel(endpoint.fetch_page, page_size=page_size, **options):
+        items.extend(page_items)
+    return items
+
+
+@pytest.mark.parametrize("items", [0, 3, 40, 41, 123])
+async def test_parallel_stream_reads_whole_catalogue(items):
+    endpoint = FakeEndpoint(catalogue(items, 5))
+    
+    assert await parallel_items(endpoint, 5, concurrency=4) == list(range(items))
+
+
+async def test_parallel_stream_reuses_probed_pages():
+    endpoint = FakeEndpoint(catalogue(40, 5))
+    
+    await parallel_items(endpoint, 5, concurrency=4)
+    
+    # No page is requested twice (the probe's empty pages count towards the tail walk)
+    assert len(endpoint.requested) == len(set(endpoint.requested))
+    assert set(range(1, 9)) <= set(endpoint.requested)
+
+
+async def test_parallel_stream_reads_past_an_empty_page():
+    pages = catalogue(100, 5)
+    pages[4] = []
+    pages[12] = []
+    endpoint = FakeEndpoint(pages)
+    
+    items = await parallel_items(endpoint, 5, concurrency=4)
+    
+    assert items == [item for page in sorted(pages) for item in pages[page]]
+
+
+async def test_parallel_stream_reads_past_a_short_page():
+    pages = catalogue(100, 5)
+    pages[3] = pages[3][:2]
+    endpoint = FakeEndpoint(pages)
+    
+    items = await parallel_items(endpoint, 5, concurrency=4)
+    
+    assert items == [item for page in sorted(pages) for item in pages[page]]
+
+
+async def test_parallel_stream_resumes_from_start_page():
+    endpoint = FakeEndpoint(catalogue(50, 5))
+    
+    assert await parallel_items(endpoint, 5, start_page=7, concurrency=4) == list(range(30, 50))
\ No newline at end of file
@@ -0,0 +1,66 @@
+"""
+Upstream rate limiter budgets, blocks and backend selection
+"""
+
+import pytest
+
+from src.wake.api import rate_limit
+from src.wake.api.rate_limit import MemoryRateLimiter, SQLiteRateLimiter
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def limiter(request, tmp_path):
+    if request.param == "sqlite":
+        return SQLiteRateLimiter(path=str(tmp_path / "shared.db"))
+    return MemoryRateLimiter()
+
+
+async def test_requests_within_budget_do_not_wait(limiter):
+    for _ in range(3):
+        await limiter.acquire("produtos", 3)
+
+
+def test_request_over_budget_waits_for_the_window(limiter):
+    for _ in range(3):
+        assert limiter._reserve("produtos", 3) == 0
+    
+    wait_time = limiter._reserve("produtos", 3)
+    
+    assert 59 < wait_time <= 60.1
+
+
+def test_groups_have_separate_budgets(limiter):
+    assert limiter._reserve("produtos", 1) == 0
+    
+    assert limiter._reserve("pedidos", 1) == 0
+    assert limiter._reserve("produtos", 1) > 0
+
+
+async def test_block_holds_the_group(limiter):
+    await limiter.block("produtos", 30)
+    
+    assert 29 < limiter._reserve("produtos", 120) <= 30
+    assert limiter._reserve("pedidos", 120) == 0
+
+
+def test_sqlite_budget_is_shared_between_instances(tmp_path):
+    path = str(tmp_path / "shared.db")
+    
+    assert SQLiteRateLimiter(path=path)._reserve("produtos", 1) == 0
+    
+    assert SQLiteRateLimiter(path=path)._reserve("produtos", 1) > 0
+
+
+@pytest.mark.parametrize("backend, shared, limiter_type", [
+    ("client", False, MemoryRateLimiter),
+    ("memory", True, MemoryRateLimiter),
+    ("sqlite", True, SQLiteRateLimiter),
+])
+def test_backend_selection(monkeypatch, backend, shared, limiter_type):
+    monkeypatch.setattr(rate_limit, "RATE_LIMIT_BACKEND", backend)
+    monkeypatch.setattr(rate_limit, "_rate_limiter", None)
+    
+    first, second = rate_limit.get_rate_limiter(), rate_limit.get_rate_limiter()
+    
+    assert isinstance(first, limiter_type)
+    assert (first is second) == shared
\ No newline at end of file
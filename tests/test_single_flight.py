@@ -0,0 +1,122 @@
+"""
+Coalescing of concurrent identical upstream requests
+"""
+
+import asyncio
+
+import pytest
+
+from src.wake.api.single_flight import SingleFlight
+from src.wake.api.storefront import StorefrontAPIClient
+
+
+class FakeUpstream:
+    """Upstream call counting its requests, answering when released"""
+    
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.fail = fail
+        self.release = asyncio.Event()
+    
+    async def call(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream failed")
+        return {"items": [1, 2]}
+
+
+async def test_concurrent_calls_share_one_request():
+    flight = SingleFlight()
+    upstream = FakeUpstream()
+    
+    tasks = [asyncio.create_task(flight.do("key", upstream.call)) for _ in range(3)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*tasks)
+    
+    assert upstream.calls == 1
+    assert results == [{"items": [1, 2]}] * 3
+    # Each caller gets its own copy, so mutating one result does not affect the others
+    results[0]["items"].append(3)
+    assert results[1] == results[2] == {"items": [1, 2]}
+    assert len(flight) == 0
+
+
+async def test_different_keys_are_not_merged():
+    flight = SingleFlight()
+    upstream = FakeUpstream()
+    
+    tasks = [asyncio.create_task(flight.do(key, upstream.call)) for key in ("a", "b")]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    await asyncio.gather(*tasks)
+    
+    assert upstream.calls == 2
+
+
+async def test_errors_reach_every_caller():
+    flight = SingleFlight()
+    upstream = FakeUpstream(fail=True)
+    
+    tasks = [asyncio.create_task(flight.do("key", upstream.call)) for _ in range(2)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    
+    assert upstream.calls == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+async def test_cancelled_leader_does_not_cancel_waiters():
+    flight = SingleFlight()
+    upstream = FakeUpstream()
+    
+    leader = asyncio.create_task(flight.do("key", upstream.call))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", upstream.call))
+    await asyncio.sleep(0)
+    
+    leader.cancel()
+    await asyncio.sleep(0)
+    upstream.release.set()
+    
+    # The waiter makes the call itself instead of inheriting the cancellation
+    assert await waiter == {"items": [1, 2]}
+    assert leader.cancelled()
+    assert upstream.calls == 2
+
+
+async def test_cancelled_waiter_does_not_cancel_the_call():
+    flight = SingleFlight()
+    upstream = FakeUpstream()
+    
+    leader = asyncio.create_task(flight.do("key", upstream.call))
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(flight.do("key", upstream.call))
+    await asyncio.sleep(0)
+    
+    waiter.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await waiter
+    upstream.release.set()
+    
+    assert await leader == {"items": [1, 2]}
+    assert upstream.calls == 1
+
+
+@pytest.mark.parametrize("query, expected_calls", [
+    ("query { products { id } }", 1),
+    ("# comment\nmutation { addToCart { id } }", 2),
+])
+async def test_storefront_coalesces_queries_but_not_mutations(query, expected_calls):
+    client = StorefrontAPIClient(token="token")
+    upstream = FakeUpstream()
+    client._send_query = lambda query, variables, operation_name: upstream.call()
+    
+    tasks = [asyncio.create_task(client.query(query, {"id": 1})) for _ in range(2)]
+    await asyncio.sleep(0)
+    upstream.release.set()
+    await asyncio.gather(*tasks)
+    
+    assert upstream.calls == expected_calls
\ No newline at end of file
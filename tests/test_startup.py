@@ -0,0 +1,55 @@
+"""
+Cold start of the MCP and HTTP servers
+
+Imports each server in a fresh interpreter, as check_startup_time.py does,
+so an import error or a slow/eager import fails the suite.
+"""
+
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+import pytest
+
+from check_startup_time import STARTUP_BUDGET, LAZY_MODULES
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+RUNS = 3
+
+
+def import_in_subprocess(module: str, database_path: str):
+    """Import a module in a fresh interpreter and return (seconds, result)"""
+    probe = (
+        f"import sys, {module}; "
+        f"print(','.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    env = dict(os.environ)
+    # The servers must start without API tokens or src/ on the path
+    env.pop("WAKE_API_TOKEN", None)
+    env.pop("STOREFRONT_API_TOKEN", None)
+    env.pop("PYTHONPATH", None)
+    env["DATABASE_PATH"] = database_path
+    
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True, env=env, cwd=ROOT)
+    return time.perf_counter() - start, result
+
+
+@pytest.mark.parametrize("module", ["server", "web_server"])
+def test_server_imports_within_budget(module, tmp_path):
+    database_path = str(tmp_path / "wake.db")
+    
+    totals = []
+    for _ in range(RUNS):
+        elapsed, result = import_in_subprocess(module, database_path)
+        assert result.returncode == 0, f"import {module} failed:\n{result.stderr}"
+        totals.append(elapsed)
+    
+    loaded_lazy = [m for m in result.stdout.strip().split(",") if m]
+    assert not loaded_lazy, f"Imported at startup but should be lazy: {', '.join(loaded_lazy)}"
+    
+    median = statistics.median(totals)
+    assert median <= STARTUP_BUDGET, f"import {module} took {median:.3f}s (budget {STARTUP_BUDGET:.3f}s)"
\ No newline at end of file
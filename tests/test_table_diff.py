@@ -0,0 +1,111 @@
+"""
+Diff-based replacement of reference table rows
+"""
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, String, Table, create_engine, select
+from sqlalchemy.orm import Session
+
+from wake.sync.table_diff import replace_table_rows
+
+metadata = MetaData()
+
+centers = Table(
+    "centers", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("name", String),
+    Column("zip_code", String)
+)
+
+closure = Table(
+    "closure", metadata,
+    Column("ancestor_id", Integer, primary_key=True),
+    Column("descendant_id", Integer, primary_key=True),
+    Column("depth", Integer)
+)
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    metadata.create_all(engine)
+    with Session(engine) as session:
+        yield session
+
+
+def rows_of(db, table):
+    return [dict(row) for row in db.execute(select(table).order_by(*table.primary_key)).mappings()]
+
+
+def test_fills_an_empty_table(db):
+    rows = [
+        {"id": 1, "name": "CD 1", "zip_code": "01000"},
+        {"id": 2, "name": "CD 2", "zip_code": "02000"}
+    ]
+    
+    changes = replace_table_rows(db, centers, ["id"], rows)
+    
+    assert changes == {"inserted": 2, "updated": 0, "deleted": 0, "deleted_keys": []}
+    assert rows_of(db, centers) == rows
+
+
+def test_writes_only_the_differences(db):
+    db.execute(centers.insert(), [
+        {"id": 1, "name": "CD 1", "zip_code": "01000"},
+        {"id": 2, "name": "CD 2", "zip_code": "02000"},
+        {"id": 3, "name": "CD 3", "zip_code": "03000"}
+    ])
+    rows = [
+        {"id": 1, "name": "CD 1", "zip_code": "01000"},       # Unchanged
+        {"id": 2, "name": "CD Dois", "zip_code": "02000"},    # Updated
+        {"id": 4, "name": "CD 4", "zip_code": "04000"}        # Inserted (3 is deleted)
+    ]
+    
+    changes = replace_table_rows(db, centers, ["id"], rows)
+    
+    assert changes == {"inserted": 1, "updated": 1, "deleted": 1, "deleted_keys": [(3,)]}
+    assert rows_of(db, centers) == rows
+
+
+def test_unchanged_rows_report_no_changes(db):
+    rows = [{"id": 1, "name": "CD 1", "zip_code": "01000"}]
+    replace_table_rows(db, centers, ["id"], rows)
+    
+    changes = replace_table_rows(db, centers, ["id"], rows)
+    
+    assert changes == {"inserted": 0, "updated": 0, "deleted": 0, "deleted_keys": []}
+
+
+def test_no_rows_empties_the_table(db):
+    replace_table_rows(db, centers, ["id"], [{"id": 1, "name": "CD 1", "zip_code": "01000"}])
+    
+    changes = replace_table_rows(db, centers, ["id"], [])
+    
+    assert changes["deleted_keys"] == [(1,)]
+    assert rows_of(db, centers) == []
+
+
+def test_composite_keys(db):
+    replace_table_rows(db, closure, ["ancestor_id", "descendant_id"], [
+        {"ancestor_id": 1, "descendant_id": 1, "depth": 0},
+        {"ancestor_id": 1, "descendant_id": 2, "depth": 1},
+        {"ancestor_id": 2, "descendant_id": 2, "depth": 0}
+    ])
+    rows = [
+        {"ancestor_id": 1, "descendant_id": 1, "depth": 0},
+        {"ancestor_id": 1, "descendant_id": 2, "depth": 2},
+        {"ancestor_id": 3, "descendant_id": 3, "depth": 0}
+    ]
+    
+    changes = replace_table_rows(db, closure, ["ancestor_id", "descendant_id"], rows)
+    
+    assert changes == {"inserted": 1, "updated": 1, "deleted": 1, "deleted_keys": [(2, 2)]}
+    assert rows_of(db, closure) == rows
+
+
+def test_nothing_is_committed(db):
+    replace_table_rows(db, centers, ["id"], [{"id": 1, "name": "CD 1", "zip_code": "01000"}])
+    
+    db.rollback()
+    
+    assert rows_of(db, centers) == []
\ No newline at end of file
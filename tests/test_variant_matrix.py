@@ -0,0 +1,98 @@
+"""
+Variant matrix axes, common attributes and grid
+"""
+
+import pytest
+
+from src.wake.db import SessionLocal, Product, ProductVariant, VariantAttribute, VariantStock
+from src.wake.services.variant_matrix import (
+    build_variant_matrix,
+    load_variant_matrix,
+    store_variant_matrix
+)
+
+
+def attribute(variant_id, name, value):
+    return VariantAttribute(variant_id=variant_id, attribute_type="Selecao", name=name, value=value)
+
+
+@pytest.fixture
+def product(database):
+    # Sizes P and M in black, size P in white; variant 4 has no colour
+    with SessionLocal() as db:
+        db.add_all([
+            Product(id=1, parent_name="Camiseta"),
+            ProductVariant(id=1, product_id=1, sku="P-PRETO", name="P Preto"),
+            ProductVariant(id=2, product_id=1, sku="M-PRETO", name="M Preto"),
+            ProductVariant(id=3, product_id=1, sku="P-BRANCO", name="P Branco"),
+            ProductVariant(id=4, product_id=1, sku="G", name="G"),
+            attribute(1, "Tamanho", "P"), attribute(1, "Cor", "PRETO"),
+            attribute(1, "Tecido", "Algodão"),
+            attribute(2, "Tamanho", "M"), attribute(2, "Cor", "PRETO"),
+            attribute(2, "Tecido", "Algodão"),
+            attribute(3, "Tamanho", "P"), attribute(3, "Cor", "BRANCO"),
+            attribute(3, "Tecido", "Algodão"),
+            attribute(4, "Tamanho", "G"), attribute(4, "Tecido", "Algodão"),
+            VariantStock(variant_id=1, distribution_center_id=1, physical_stock=3),
+            VariantStock(variant_id=3, distribution_center_id=1, physical_stock=1)
+        ])
+        db.commit()
+
+
+def test_varying_attributes_become_axes(product):
+    with SessionLocal() as db:
+        matrix = build_variant_matrix(db, 1)
+    
+    # Axes and their values keep the order of first appearance
+    assert matrix["axes"] == [
+        {"name": "Tamanho", "values": ["P", "M", "G"]},
+        {"name": "Cor", "values": ["PRETO", "BRANCO"]}
+    ]
+    assert matrix["common_attributes"] == {"Tecido": "Algodão"}
+    assert matrix["cells"] == [
+        {"variant_id": 1, "values": ["P", "PRETO"]},
+        {"variant_id": 2, "values": ["M", "PRETO"]},
+        {"variant_id": 3, "values": ["P", "BRANCO"]},
+        {"variant_id": 4, "values": ["G", None]}
+    ]
+
+
+def test_attribute_missing_from_a_variant_is_an_axis(database):
+    with SessionLocal() as db:
+        db.add_all([
+            Product(id=1),
+            ProductVariant(id=1, product_id=1, sku="A", name="A"),
+            ProductVariant(id=2, product_id=1, sku="B", name="B"),
+            attribute(1, "Cor", "PRETO")
+        ])
+        db.commit()
+        
+        matrix = build_variant_matrix(db, 1)
+    
+    # Same value everywhere it is set, but not set on every variant
+    assert matrix["axes"] == [{"name": "Cor", "values": ["PRETO"]}]
+    assert matrix["common_attributes"] == {}
+
+
+def test_product_without_variants_has_no_matrix(database):
+    with SessionLocal() as db:
+        assert build_variant_matrix(db, 1) is None
+    assert load_variant_matrix(1) is None
+
+
+@pytest.mark.parametrize("stored", [False, True])
+def test_loaded_matrix_joins_stock(product, stored):
+    if stored:
+        with SessionLocal() as db:
+            store_variant_matrix(db, 1)
+            db.commit()
+    
+    matrix = load_variant_matrix(1)
+    
+    assert matrix["parent_name"] == "Camiseta"
+    assert [axis["in_stock_values"] for axis in matrix["axes"]] == [["P"], ["PRETO", "BRANCO"]]
+    assert matrix["grid"]["P"]["BRANCO"]["stock_available"] == 1
+    assert matrix["grid"]["M"]["PRETO"]["stock_available"] == 0
+    # Variants missing an axis value are listed but left out of the grid
+    assert "G" not in matrix["grid"]
+    assert matrix["variants"][3]["attributes"] == {"Tamanho": "G", "Cor": None}
\ No newline at end of file
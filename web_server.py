@@ -5,10 +5,10 @@ Wake HTTP Server for Render deployment
 HTTP wrapper around the Wake MCP server for web deployment.
 """
 import os
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, Response
+from fastapi.responses import JSONResponse, StreamingResponse
 import uvicorn
-from typing import Dict, Any
+from typing import Dict, Any, Callable, Iterable, Optional
 import asyncio
 import json
 
@@ -16,13 +16,31 @@ import json
 from src.wake.loaders.products import ProductsLoader
 from src.wake.loaders.categories import CategoriesLoader
 from src.wake.loaders.stock_locations import StockLocationsLoader
+from src.wake.loaders.local import local_catalog
+from src.wake.services.variant_matrix import load_variant_matrix
+from src.wake.db import run_sync
 from src.wake.api.base import WakeAPIClient
+from src.wake.response_cache import ResponseCacheMiddleware
+
+# "db" serves reads from the synced SQLite mirror, "live" always proxies Wake
+WEB_READ_MODE = os.getenv("WEB_READ_MODE", "db").lower()
+# Max age in seconds of the last completed sync before falling back to live reads (0 = no limit)
+WEB_MAX_STALENESS = float(os.getenv("WEB_MAX_STALENESS", "86400"))
+
+# Sync types that refresh the data behind each group of routes
+PRODUCT_SYNCS = ("products", "products_only")
+STOCK_SYNCS = PRODUCT_SYNCS + ("stock",)
+PRICE_SYNCS = PRODUCT_SYNCS + ("prices",)
+CATEGORY_SYNCS = ("product_categories",)
+CATEGORY_TREE_SYNCS = ("categories",)
+DISTRIBUTION_CENTER_SYNCS = ("distribution_centers",)
 
 app = FastAPI(
     title="Wake E-commerce API",
     description="HTTP API for Wake E-commerce integration",
     version="1.0.0"
 )
+app.add_middleware(ResponseCacheMiddleware)
 
 @app.get("/")
 async def root():
@@ -32,33 +50,94 @@ async def root():
 async def health_check():
     return {"status": "healthy", "service": "wake-api"}
 
+# Returned by read_local when the route should query Wake live
+LOCAL_MISS = object()
+
+async def read_local(response: Response, read: Callable[[], Any], sync_types: Iterable[str]) -> Any:
+    """
+    Serve a read from the local database when allowed
+    
+    Returns the local result as is (an empty list means the mirror has nothing
+    for the request), or LOCAL_MISS when the caller should query Wake live (live
+    mode, stale or never synced mirror, a database error, or None: an item missing
+    from the mirror may have been created in Wake after the last sync).
+    """
+    if WEB_READ_MODE != "db":
+        return LOCAL_MISS
+    def fresh_read():
+        if not local_catalog.is_fresh(sync_types, WEB_MAX_STALENESS):
+            return LOCAL_MISS
+        result = read()
+        return LOCAL_MISS if result is None else result
+    try:
+        # SQLite reads run in the thread pool so they do not block other requests
+        result = await run_sync(fresh_read)
+    except Exception as e:
+        print(f"Local read failed, falling back to Wake API: {e}")
+        return LOCAL_MISS
+    if result is not LOCAL_MISS:
+        response.headers["X-Data-Source"] = "db"
+    return result
+
 @app.get("/products")
-async def get_products(page: int = 1, quantity: int = 50):
-    """Get products from Wake API"""
+async def get_products(response: Response, page: int = 1, quantity: int = 50):
+    """Get products from the local mirror or Wake API"""
+    quantity = min(quantity, 50)
+    products = await read_local(response, lambda: local_catalog.load_products(page=page, quantity=quantity), PRODUCT_SYNCS)
+    if products is not LOCAL_MISS:
+        return {"products": products, "count": len(products)}
     try:
         async with WakeAPIClient() as client:
             loader = ProductsLoader(client)
-            products = await loader.load_products(page=page, quantity=min(quantity, 50))
+            products = await loader.load_products(page=page, quantity=quantity)
             return {"products": products, "count": len(products)}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/catalog/products")
+async def get_catalog_products(response: Response, cursor: Optional[int] = None, limit: int = 500):
+    """Get products from the local mirror with keyset pagination (pass next_cursor back as cursor)"""
+    limit = max(1, min(limit, 1000))
+    try:
+        products = await run_sync(local_catalog.load_products_after, after_id=cursor, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    response.headers["X-Data-Source"] = "db"
+    next_cursor = products[-1]["produtoVarianteId"] if len(products) == limit else None
+    return {"products": products, "count": len(products), "next_cursor": next_cursor}
+
+@app.get("/catalog/products/export")
+async def export_catalog_products(batch_size: int = 500):
+    """Stream the whole local catalog as NDJSON (one product per line)"""
+    batch_size = max(1, min(batch_size, 1000))
+    def serialize():
+        for product in local_catalog.iter_products(batch_size=batch_size):
+            yield json.dumps(product, ensure_ascii=False) + "\n"
+    # Sync generators are iterated in the threadpool, so DB reads do not block the event loop
+    return StreamingResponse(serialize(), media_type="application/x-ndjson", headers={"X-Data-Source": "db"})
+
 @app.get("/products/{product_identifier}")
-async def get_product(product_identifier: str):
+async def get_product(response: Response, product_identifier: str):
     """Get a specific product by SKU or ID"""
+    product = await read_local(response, lambda: local_catalog.get_product(product_identifier), PRODUCT_SYNCS)
+    if product is not LOCAL_MISS:
+        return product
     try:
         async with WakeAPIClient() as client:
             loader = ProductsLoader(client)
             product = await loader.get_product(product_identifier)
-            if not product:
-                raise HTTPException(status_code=404, detail="Product not found")
-            return product
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    if not product:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return product
 
 @app.get("/categories")
-async def get_categories():
+async def get_categories(response: Response):
     """Get all categories"""
+    categories = await read_local(response, local_catalog.load_categories, CATEGORY_TREE_SYNCS)
+    if categories is not LOCAL_MISS:
+        return {"categories": categories, "count": len(categories)}
     try:
         async with WakeAPIClient() as client:
             loader = CategoriesLoader(client)
@@ -67,9 +146,27 @@ async def get_categories():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/categories/{category_id}/products")
+async def get_category_products(response: Response, category_id: int, page: int = 1, quantity: int = 50, include_subcategories: bool = True):
+    """Get the products of a category (and its subcategories) from the local mirror or Wake API"""
+    quantity = min(quantity, 50)
+    products = await read_local(response, lambda: local_catalog.load_category_products(category_id, page=page, quantity=quantity, include_subcategories=include_subcategories), CATEGORY_SYNCS)
+    if products is not LOCAL_MISS:
+        return {"products": products, "count": len(products)}
+    try:
+        async with WakeAPIClient() as client:
+            loader = ProductsLoader(client)
+            products = await loader.load_products(page=page, quantity=quantity, categories=[category_id])
+            return {"products": products, "count": len(products)}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @app.get("/distribution-centers")
-async def get_distribution_centers():
+async def get_distribution_centers(response: Response):
     """Get all distribution centers"""
+    centers = await read_local(response, local_catalog.load_distribution_centers, DISTRIBUTION_CENTER_SYNCS)
+    if centers is not LOCAL_MISS:
+        return {"distribution_centers": centers, "count": len(centers)}
     try:
         async with WakeAPIClient() as client:
             loader = StockLocationsLoader(client)
@@ -79,8 +176,11 @@ async def get_distribution_centers():
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/products/{product_identifier}/stock")
-async def get_product_stock(product_identifier: str):
+async def get_product_stock(response: Response, product_identifier: str):
     """Get stock information for a product"""
+    stock = await read_local(response, lambda: local_catalog.load_product_stock(product_identifier), STOCK_SYNCS)
+    if stock is not LOCAL_MISS:
+        return {"product_identifier": product_identifier, "stock": stock}
     try:
         async with WakeAPIClient() as client:
             loader = ProductsLoader(client)
@@ -90,8 +190,12 @@ async def get_product_stock(product_identifier: str):
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/products/{product_identifier}/prices")
-async def get_product_prices(product_identifier: str):
+async def get_product_prices(response: Response, product_identifier: str):
     """Get price information for a product"""
+    # Products missing locally or synced without prices (products_only) are priced live
+    prices = await read_local(response, lambda: local_catalog.load_product_prices(product_identifier), PRICE_SYNCS)
+    if prices is not LOCAL_MISS:
+        return {"product_identifier": product_identifier, "prices": prices}
     try:
         async with WakeAPIClient() as client:
             loader = ProductsLoader(client)
@@ -100,6 +204,24 @@ async def get_product_prices(product_identifier: str):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/products/{product_id}/variant-matrix")
+async def get_product_variant_matrix(product_id: int):
+    """Get a product's variants grouped by the attributes that vary (size, colour, ...) with stock and prices"""
+    try:
+        matrix = await run_sync(load_variant_matrix, product_id)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    if matrix is None:
+        raise HTTPException(status_code=404, detail="Product not found")
+    return matrix
+
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file
+    workers = int(os.environ.get("WEB_WORKERS", 1))
+    if workers > 1:
+        # Workers are separate processes: share the upstream budget and the response cache through SQLite
+        os.environ.setdefault("RATE_LIMIT_BACKEND", "sqlite")
+        os.environ.setdefault("RESPONSE_CACHE_BACKEND", "sqlite")
+        uvicorn.run("web_server:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
\ No newline at end of file